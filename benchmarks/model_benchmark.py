@@ -0,0 +1,224 @@
+#
+# This file is part of PyFOPPL, an implementation of a First Order Probabilistic Programming Language in Python.
+#
+# License: MIT (see LICENSE.txt)
+#
+# 19. Oct 2026
+#
+"""
+Benchmark suite of canonical FOPPL models across data sizes.
+
+The suite covers models as they are typically used: a Gaussian with N observations, a linear and a logistic
+regression, a Gaussian mixture with `if`-branches, a hidden Markov model written with `loop`, and a model with
+multivariate normals. For each model and data size, it measures:
+    - the time to compile the source to a graph and generate the model (with the times of the single phases as
+      collected by `foppl.statistics`),
+    - the size of the generated code,
+    - the peak memory allocated during compilation and generation (through `tracemalloc`),
+    - the throughput of `gen_prior_samples` and `gen_pdf` in calls per second.
+
+The generated model needs the distributions as `dist` (by default from `pyfo.distributions`, see `--dist`). If they
+cannot be imported, the throughputs are recorded as `null`, while all other measurements are still taken.
+
+The results are written as JSON, together with the version of Python, the platform and the current git commit (if
+any), so that the results of different versions can be compared. Run it from the root of the repository:
+
+    python benchmarks/model_benchmark.py [--sizes 10 30 100] [--models gaussian hmm] [--output results.json]
+"""
+import argparse
+import datetime
+import importlib
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from foppl.compiler import compile
+from foppl.model_generator import Model_Generator
+from foppl.statistics import CompileStatistics
+
+
+def _vector(values) -> str:
+    return '[' + ' '.join([repr(v) for v in values]) + ']'
+
+
+def _data(size: int, f) -> list:
+    # Deterministic data, so that the results of different runs (and versions) are comparable
+    return [round(f(i), 3) for i in range(size)]
+
+
+def gaussian(size: int) -> str:
+    observations = ' '.join(["(observe (normal mu 1) {})".format(y) for y in _data(size, lambda i: (i % 7) * 0.5)])
+    return "(let [mu (sample (normal 0 5))] {} mu)".format(observations)
+
+
+def linear_regression(size: int) -> str:
+    xs = _data(size, lambda i: i / size)
+    ys = _data(size, lambda i: 2 * i / size + 1 + (i % 3 - 1) * 0.1)
+    return ("(let [slope (sample (normal 0 10)) bias (sample (normal 0 10)) xs {} ys {}] "
+            "(map (fn [x y] (observe (normal (+ (* slope x) bias) 1) y)) xs ys) "
+            "[slope bias])").format(_vector(xs), _vector(ys))
+
+
+def logistic_regression(size: int) -> str:
+    xs = _data(size, lambda i: (i - size / 2) / size)
+    labels = [int(x > 0) for x in xs]
+    return ("(let [w (sample (normal 0 10)) b (sample (normal 0 10)) xs {} labels {}] "
+            "(map (fn [x label] (observe (bernoulli (/ 1 (+ 1 (exp (- (+ (* w x) b)))))) label)) xs labels) "
+            "[w b])").format(_vector(xs), _vector(labels))
+
+
+def gaussian_mixture(size: int) -> str:
+    ys = _data(size, lambda i: 2.0 if i % 2 == 0 else -2.0)
+    return ("(let [mu1 (sample (normal -1 10)) mu2 (sample (normal 1 10)) ys {}] "
+            "(map (fn [y] (let [z (sample (categorical [0.5 0.5]))] "
+            "(if (< z 1) (observe (normal mu1 1) y) (observe (normal mu2 1) y)))) ys) "
+            "[mu1 mu2])").format(_vector(ys))
+
+
+def hmm(size: int) -> str:
+    ys = _data(size, lambda i: 1.0 if (i // 4) % 2 == 0 else -1.0)
+    return ("(defn hmm-step [t z ys] "
+            "(let [z-next (sample (categorical (get [[0.9 0.1] [0.2 0.8]] z)))] "
+            "(observe (normal (get [-1 1] z-next) 1) (get ys t)) z-next)) "
+            "(let [z0 (sample (categorical [0.5 0.5]))] (loop {} z0 hmm-step {}))").format(size, _vector(ys))
+
+
+def mvn(size: int) -> str:
+    ys = [[round((i % 5) * 0.2, 3), round((i % 3) * -0.3, 3)] for i in range(size)]
+    observations = ' '.join(["(observe (mvn mu [[1 0.5] [0.5 1]]) {})".format(_vector(y)) for y in ys])
+    return "(let [mu (sample (mvn [0 0] [[10 0] [0 10]]))] {} mu)".format(observations)
+
+
+models = {
+    'gaussian': gaussian,
+    'linear_regression': linear_regression,
+    'logistic_regression': logistic_regression,
+    'gaussian_mixture': gaussian_mixture,
+    'hmm': hmm,
+    'mvn': mvn,
+}
+
+
+def _compile(source: str):
+    statistics = CompileStatistics()
+    graph, _ = compile(source, statistics)
+    code = Model_Generator(graph).generate_class()
+    return graph, code, statistics
+
+
+def _throughput(f, min_time: float) -> float:
+    # Calls `f` repeatedly for at least `min_time` seconds and returns the number of calls per second
+    count = 0
+    start = time.perf_counter()
+    while True:
+        f()
+        count += 1
+        elapsed = time.perf_counter() - start
+        if elapsed >= min_time:
+            return count / elapsed
+
+
+def run_benchmark(name: str, size: int, dist_module, min_time: float = 1.0) -> dict:
+    source = models[name](size)
+    start = time.perf_counter()
+    graph, code, statistics = _compile(source)
+    compile_time = time.perf_counter() - start
+
+    tracemalloc.start()
+    try:
+        _compile(source)
+        _, peak_memory = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    result = {
+        'model': name,
+        'size': size,
+        'source_size': len(source),
+        'compile_time': compile_time,
+        'phases': statistics.as_dict()['phases'],
+        'vertices': len(graph.vertices),
+        'arcs': len(graph.arcs),
+        'code_size': len(code),
+        'peak_memory': peak_memory,
+        'prior_samples_per_second': None,
+        'log_pdf_per_second': None,
+    }
+    if dist_module is not None:
+        namespace = {'dist': dist_module}
+        exec(code, namespace)
+        model = namespace['model']
+        state = model.gen_prior_samples()
+        result['prior_samples_per_second'] = _throughput(model.gen_prior_samples, min_time)
+        result['log_pdf_per_second'] = _throughput(lambda: model.gen_pdf(dict(state)), min_time)
+    return result
+
+
+def _import_dist(name: str):
+    try:
+        return importlib.import_module(name)
+    except ImportError:
+        return None
+
+
+def _git_commit():
+    try:
+        return subprocess.check_output(['git', 'rev-parse', 'HEAD'], cwd=os.path.dirname(os.path.abspath(__file__)),
+                                       stderr=subprocess.DEVNULL).decode().strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def _format_rate(rate):
+    return '-' if rate is None else '{:.0f}'.format(rate)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmarks canonical FOPPL models across data sizes.")
+    parser.add_argument('--models', nargs='+', choices=sorted(models), default=list(models))
+    parser.add_argument('--sizes', nargs='+', type=int, default=[10, 30, 100])
+    parser.add_argument('--dist', default='pyfo.distributions',
+                        help="the module providing the distributions to the generated models")
+    parser.add_argument('--min-time', type=float, default=1.0,
+                        help="the minimal time in seconds to measure each throughput")
+    parser.add_argument('--output', default='benchmark_results.json')
+    args = parser.parse_args(argv)
+
+    dist_module = _import_dist(args.dist)
+    if dist_module is None:
+        print("'{}' cannot be imported: throughputs are not measured".format(args.dist))
+
+    results = []
+    print("{:<20} {:>6} {:>12} {:>10} {:>12} {:>14} {:>14}".format(
+        'model', 'size', 'compile ms', 'code kB', 'peak kB', 'samples/s', 'log-pdf/s'))
+    for name in args.models:
+        for size in args.sizes:
+            result = run_benchmark(name, size, dist_module, args.min_time)
+            results.append(result)
+            print("{:<20} {:>6} {:>12.1f} {:>10.1f} {:>12.1f} {:>14} {:>14}".format(
+                name, size, result['compile_time'] * 1000, result['code_size'] / 1000,
+                result['peak_memory'] / 1000,
+                _format_rate(result['prior_samples_per_second']), _format_rate(result['log_pdf_per_second'])))
+
+    report = {
+        'created': datetime.datetime.now().isoformat(),
+        'commit': _git_commit(),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'dist': args.dist if dist_module is not None else None,
+        'results': results,
+    }
+    with open(args.output, 'w') as output:
+        json.dump(report, output, indent=2)
+    print("Results written to '{}'".format(args.output))
+
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,66 @@
+#
+# This file is part of PyFOPPL, an implementation of a First Order Probabilistic Programming Language in Python.
+#
+# License: MIT (see LICENSE.txt)
+#
+# 19. Oct 2026
+#
+"""
+Benchmark for the throughput of the reader and the parser on large programs.
+
+The benchmark generates synthetic programs of increasing size, which use special forms (`let`, `if`, `defn`),
+operators, comparisons, distributions and function calls, and measures reading the source into forms
+(`tokenize`), parsing the forms into an AST (`parse`), and both steps together. The throughput is reported in forms
+per second and kilobytes of source per second.
+
+Run it from the root of the repository:
+
+    python benchmarks/parse_benchmark.py [size ...]
+"""
+import os
+import sys
+import timeit
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from foppl.foppl_objects import Form, Vector
+from foppl.foppl_parser import parse
+from foppl.foppl_reader import tokenize
+
+
+def make_program(size: int) -> str:
+    functions = "(defn step [i x] (+ (* 0.9 x) (nth [1 2 3] (mod i 3))))"
+    bindings = ' '.join(["x{0} (sample (normal (step {0} (+ {0} (* 2 {0}))) 1)) "
+                         "p{0} (sample (beta 1 (first [2 3])))".format(i) for i in range(size)])
+    observations = ' '.join(["(if (and (> x{0} 0) (<= p{0} 0.5)) (observe (normal (- x{0} 1) 1) {0}.5) "
+                             "(observe (categorical [p{0} (- 1 p{0})]) 1))".format(i) for i in range(size)])
+    return "{} (let [{}] {})".format(functions, bindings, observations)
+
+
+def count_forms(form) -> int:
+    result = 0
+    stack = [form]
+    while len(stack) > 0:
+        item = stack.pop()
+        if isinstance(item, (Form, Vector)):
+            result += 1
+            stack.extend(item)
+    return result
+
+
+def main(sizes: list, repeat: int = 5):
+    print("{:>8} {:>10} {:>10} {:>12} {:>12} {:>12} {:>14}".format(
+        'size', 'forms', 'kB', 'tokenize ms', 'parse ms', 'total ms', 'forms/s'))
+    for size in sizes:
+        source = make_program(size)
+        forms = tokenize(source)
+        count = count_forms(forms)
+        t_tokenize = min(timeit.repeat(lambda: tokenize(source), number=1, repeat=repeat))
+        t_parse = min(timeit.repeat(lambda: parse(forms), number=1, repeat=repeat))
+        t_total = min(timeit.repeat(lambda: parse(source), number=1, repeat=repeat))
+        print("{:>8} {:>10} {:>10.1f} {:>12.3f} {:>12.3f} {:>12.3f} {:>14.0f}".format(
+            size, count, len(source) / 1000, t_tokenize * 1000, t_parse * 1000, t_total * 1000, count / t_total))
+
+
+if __name__ == '__main__':
+    main([int(arg) for arg in sys.argv[1:]] if len(sys.argv) > 1 else [100, 1000, 5000])
@@ -0,0 +1,131 @@
+#
+# This file is part of PyFOPPL, an implementation of a First Order Probabilistic Programming Language in Python.
+#
+# License: MIT (see LICENSE.txt)
+#
+# 19. Oct 2026
+#
+"""
+Generator of random (but valid) FOPPL programs with a tunable size and shape.
+
+A program is a sequence of `size` items. Each item either binds a new variable or is a statement in the body of the
+enclosing `let`. The kind of each item is drawn according to the weights of the generator:
+
+    `sample`    binds a new variable to `(sample (normal EXPR 1))`,
+    `call`      binds a new variable to the result of calling one of the functions defined with `defn`,
+    `loop`      binds a new variable to the result of a `loop` over a function of length `loop_length`,
+    `observe`   observes a normal distribution depending on the variables bound so far,
+    `if`        a tree of `if`-expressions of depth `if_depth`, with observations in its leaves.
+
+Each new binding opens a nested `let` with probability `nesting`, or is otherwise added to the bindings of the
+current `let`. With `nesting = 1`, the `let`s are nested as deeply as there are bindings. Expressions only refer to
+the most recently bound variables (the `window`), as is the case with most real programs.
+
+    ```python
+    source = ProgramGenerator(seed=1, nesting=0.5, weights={'if': 2}).generate(100)
+    graph, expr = compile(source)
+    ```
+"""
+import random
+
+
+class ProgramGenerator(object):
+
+    default_weights = {
+        'sample': 4,
+        'call': 1,
+        'loop': 1,
+        'observe': 3,
+        'if': 1,
+    }
+
+    def __init__(self, seed=None, *, nesting: float = 0.2, weights: dict = None, if_depth: int = 2,
+                 loop_length: int = 4, functions: int = 3, expr_depth: int = 2, window: int = 4):
+        self.random = random.Random(seed)
+        self.nesting = nesting
+        self.weights = dict(self.default_weights)
+        if weights is not None:
+            self.weights.update(weights)
+        self.if_depth = if_depth
+        self.loop_length = loop_length
+        self.functions = functions
+        self.expr_depth = expr_depth
+        self.window = window
+        self._names = []
+
+    def generate(self, size: int) -> str:
+        """
+        Returns the source of a new random program with `size` items.
+        """
+        self._names = ['v0']
+        kinds = [kind for kind in sorted(self.weights) if self.weights[kind] > 0]
+        weights = [self.weights[kind] for kind in kinds]
+        result = self._gen_functions()
+        result.append("(let [v0 (sample (normal 0 1))")
+        depth = 1
+        has_body = False
+        for kind in self.random.choices(kinds, weights, k=size):
+            if kind in ('sample', 'call', 'loop'):
+                name = 'v{}'.format(len(self._names))
+                value = getattr(self, '_gen_' + kind)()
+                self._names.append(name)
+                if has_body or self.random.random() < self.nesting:
+                    result.append("{}(let [{} {}".format(']' if not has_body else '', name, value))
+                    depth += 1
+                    has_body = False
+                else:
+                    result.append("{} {}".format(name, value))
+            else:
+                if not has_body:
+                    result.append("]")
+                    has_body = True
+                result.append(getattr(self, '_gen_' + kind)())
+        if not has_body:
+            result.append("]")
+        result.append(self._names[-1] + ')' * depth)
+        return ' '.join(result)
+
+    def _gen_functions(self):
+        # Each function `f<i>` samples a new value from its arguments, and each function `step<i>` is used by `loop`
+        # and observes the accumulated value in each iteration
+        result = []
+        for i in range(self.functions):
+            result.append("(defn f{0} [a b] (sample (normal (+ (* {1} a) b) 1)))".format(i, self._constant()))
+            result.append("(defn step{0} [i acc] (let [x (sample (normal (+ acc {1}) 1))] "
+                          "(observe (normal x 1) {2}) x))".format(i, self._constant(), self._constant()))
+        return result
+
+    def _constant(self):
+        return round(self.random.uniform(-2, 2), 2)
+
+    def _variable(self):
+        return self.random.choice(self._names[-self.window:])
+
+    def _gen_expr(self, depth: int = None):
+        if depth is None:
+            depth = self.expr_depth
+        r = self.random.random()
+        if depth <= 0 or r < 0.3:
+            return self._variable() if r < 0.2 or depth <= 0 else str(self._constant())
+        op = self.random.choice(['+', '-', '*'])
+        return "({} {} {})".format(op, self._gen_expr(depth - 1), self._gen_expr(depth - 1))
+
+    def _gen_sample(self):
+        return "(sample (normal {} 1))".format(self._gen_expr())
+
+    def _gen_call(self):
+        return "(f{} {} {})".format(self.random.randrange(self.functions), self._gen_expr(1), self._variable())
+
+    def _gen_loop(self):
+        return "(loop {} {} step{})".format(self.loop_length, self._variable(), self.random.randrange(self.functions))
+
+    def _gen_observe(self):
+        return "(observe (normal {} 1) {})".format(self._gen_expr(), self._constant())
+
+    def _gen_if(self, depth: int = None):
+        if depth is None:
+            depth = self.if_depth
+        if depth <= 0:
+            return self._gen_observe()
+        return "(if (> {} {}) {} {})".format(self._variable(), self._constant(),
+                                             self._gen_if(depth - 1), self._gen_if(depth - 1))
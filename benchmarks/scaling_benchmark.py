@@ -0,0 +1,284 @@
+#
+# This file is part of PyFOPPL, an implementation of a First Order Probabilistic Programming Language in Python.
+#
+# License: MIT (see LICENSE.txt)
+#
+# 19. Oct 2026
+#
+"""
+Stress test for the scalability of the compiler and the model generator.
+
+The harness compiles random programs (see `random_programs`) of various shapes and increasing sizes, and measures the
+time of each phase as collected by `foppl.statistics` (`tokenize`, `parse`, `compile`, `optimize`, `analyze`,
+`generate`). For each shape and phase, it fits the empirical complexity `time ~ size ** k` by least squares on a
+log-log scale. If the exponent `k` of any phase exceeds `--max-exponent` (or its entry in `baseline_exponents`), the
+phase has turned superlinear (or worse than it is known to be), and the harness exits with status 1.
+
+By default, the times are fitted against the number of vertices, which grows linearly with the program, except for
+`loop`s and functions, which are expanded. Use `--against program` to fit against the number of items in the program,
+or `--against graph` to fit against the size of the graph (vertices plus arcs) instead. The graph has an arc from each
+ancestor of a vertex (not only its parents), so that its size may grow quadratically by itself, and fits against it
+hide superlinear phases. Phases, which take less than `--min-time` seconds even for the largest size, are too fast to
+be measured reliably and are not checked.
+
+Some phases are known to be superlinear for some shapes. For these, `baseline_exponents` lists the exponents measured
+today, and the harness only fails if a phase gets worse than that (by more than `--tolerance`). The baselines apply
+to the default sizes and `--against vertices` only.
+
+The times are noisy, in particular for the small sizes. Each program is therefore compiled at least `--repeat` times
+and for at least `--min-duration` seconds, with the garbage collector disabled, and only the fastest run counts. The
+sizes are measured in rounds, so that a slower period of the machine does not only hit a single size. The baselines
+and the default tolerance have been calibrated with `--calibrate RUNS`, which repeats the whole measurement and prints
+the median and spread of each exponent, together with the baselines it suggests. Besides the times, the harness
+checks the counters of the compiler (`merges` and `optimizations`): they are exact and must grow linearly with the
+number of vertices, so that they catch regressions in the merging of graphs and in the optimizer without any noise.
+
+The shapes stress different parts of the compiler:
+    `deep_lets`   every binding opens a new `let`,
+    `wide_lets`   all bindings are in a single `let`,
+    `if_trees`    mostly trees of nested `if`-expressions,
+    `long_loops`  a few `loop`s, whose length grows with the size,
+    `defn_reuse`  mostly calls of a few functions,
+    `mixed`       all of the above.
+
+Run it from the root of the repository:
+
+    python benchmarks/scaling_benchmark.py [--shapes deep_lets if_trees] [--sizes 100 200 400 800] [--output f.json]
+"""
+import argparse
+import gc
+import json
+import math
+import os
+import statistics as stats
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from foppl.compiler import compile
+from foppl.model_generator import Model_Generator
+from foppl.statistics import CompileStatistics
+from random_programs import ProgramGenerator
+
+phases = ['tokenize', 'parse', 'compile', 'optimize', 'analyze', 'generate']
+
+# The counters of the compiler, which must grow linearly with the number of vertices. Unlike the times, they are exact,
+# so that, e.g., an optimizer that visits the same nodes again and again is detected without any noise.
+counters = ['merges', 'optimizations']
+
+# The median exponents of five runs of `--calibrate` (against the number of vertices, with the default sizes) for the
+# phases which do not scale linearly yet. The graph has an arc from each ancestor of a vertex, and the compiler copies
+# the graph with each merge (see `Graph.merge`), so that compiling programs with long chains of dependencies is far
+# from linear. A phase fails if its exponent exceeds the one listed here by more than `--tolerance`, i.e., if it has
+# become slower than it is today. The phases not listed here must scale linearly (up to `--max-exponent`).
+baseline_exponents = {
+    'deep_lets': {'compile': 1.65},
+    'wide_lets': {'compile': 1.7},
+    'if_trees': {'compile': 1.45, 'generate': 1.25},
+    'long_loops': {'compile': 2.8, 'optimize': 1.5, 'generate': 1.65},
+    'defn_reuse': {'compile': 3.2, 'optimize': 1.5, 'generate': 1.8},
+    'mixed': {'compile': 2.75, 'optimize': 1.4, 'generate': 1.8},
+}
+
+# The deviation of the exponents from their baselines accepted by default: twice the largest deviation from the median
+# seen in five runs of `--calibrate`
+TOLERANCE = 0.35
+
+# Each shape maps the size to the number of items in the program and the parameters of the generator
+shapes = {
+    'deep_lets': lambda size: (size, dict(nesting=1.0, weights={'call': 0, 'loop': 0, 'if': 0})),
+    'wide_lets': lambda size: (size, dict(nesting=0.0, weights={'call': 0, 'loop': 0, 'if': 0})),
+    'if_trees': lambda size: (size // 4, dict(if_depth=2, weights={'if': 8, 'call': 0, 'loop': 0})),
+    'long_loops': lambda size: (4, dict(loop_length=size // 4, weights={'sample': 0, 'observe': 0, 'call': 0,
+                                                                         'if': 0, 'loop': 1})),
+    'defn_reuse': lambda size: (size, dict(weights={'call': 8, 'loop': 0, 'if': 0})),
+    'mixed': lambda size: (size // 2, dict()),
+}
+
+
+def measure(source: str):
+    """
+    Compiles the source and generates the model once. Returns the time of each phase, the counters, the number of
+    vertices and the size of the graph (the number of vertices plus the number of arcs).
+    """
+    statistics = CompileStatistics()
+    # The cyclic garbage collector runs at times that depend on all earlier allocations, which adds more noise to the
+    # phases than anything else, and is therefore disabled while measuring (as `timeit` does)
+    gc.collect()
+    gc.disable()
+    try:
+        graph, _ = compile(source, statistics)
+        Model_Generator(graph).generate_class()
+    finally:
+        gc.enable()
+    times = {phase: statistics.phases.get(phase, 0.0) for phase in phases}
+    counts = {name: statistics.counters.get(name, 0) for name in counters}
+    return times, counts, len(graph.vertices), len(graph.vertices) + len(graph.arcs)
+
+
+def fit_exponent(sizes: list, times: list):
+    """
+    Fits `time = c * size ** k` by least squares on a log-log scale and returns `k` (or `None` if any time is zero).
+    """
+    if any([t <= 0 for t in times]):
+        return None
+    xs = [math.log(n) for n in sizes]
+    ys = [math.log(t) for t in times]
+    mean_x = sum(xs) / len(xs)
+    mean_y = sum(ys) / len(ys)
+    cov = sum([(x - mean_x) * (y - mean_y) for x, y in zip(xs, ys)])
+    var = sum([(x - mean_x) ** 2 for x in xs])
+    return cov / var
+
+
+def run_shape(shape: str, sizes: list, seed: int, repeat: int, min_duration: float):
+    """
+    Returns the minimal times of each phase, the values of the counters, the numbers of vertices and the sizes of the
+    graphs for the given shape and program sizes.
+
+    Each program is compiled at least `repeat` times, and then again until it has taken `min_duration` seconds in
+    total, so that small programs are compiled many times and their minimal times are not distorted by the noise of a
+    single run. The programs are compiled in rounds over all sizes (instead of one size after the other), so that a
+    period in which the machine is slower affects all sizes alike, instead of only the one measured at that time.
+    """
+    sources = []
+    for size in sizes:
+        items, params = shapes[shape](size)
+        sources.append(ProgramGenerator(seed, **params).generate(items))
+    best = [{} for _ in sizes]
+    elapsed = [0.0 for _ in sizes]
+    results = [None for _ in sizes]
+    rounds = 0
+    while rounds < repeat or any([e < min_duration for e in elapsed]):
+        for i, source in enumerate(sources):
+            if rounds >= repeat and elapsed[i] >= min_duration:
+                continue
+            start = time.perf_counter()
+            results[i] = measure(source)
+            elapsed[i] += time.perf_counter() - start
+            for phase in phases:
+                t = results[i][0][phase]
+                best[i][phase] = min(best[i].get(phase, t), t)
+        rounds += 1
+    times = {phase: [b[phase] for b in best] for phase in phases}
+    counts = {name: [r[1][name] for r in results] for name in counters}
+    return times, counts, [r[2] for r in results], [r[3] for r in results]
+
+
+def calibrate(args, x_name: str):
+    """
+    Runs all shapes `args.calibrate` times and prints the spread of the exponents, together with the baselines and the
+    tolerance to put into `baseline_exponents` and `--tolerance`.
+    """
+    exponents = {}
+    for run in range(args.calibrate):
+        print("Run {} of {}".format(run + 1, args.calibrate))
+        for shape in args.shapes:
+            times, _, vertices, graph_sizes = run_shape(shape, args.sizes, args.seed, args.repeat, args.min_duration)
+            x = {'vertices': vertices, 'program': args.sizes, 'graph': graph_sizes}[x_name]
+            for phase in phases:
+                k = fit_exponent(x, times[phase])
+                if k is not None and times[phase][-1] >= args.min_time:
+                    exponents.setdefault((shape, phase), []).append(k)
+
+    print("{:<12} {:<10} {:>7} {:>7} {:>7}".format('shape', 'phase', 'min', 'median', 'max'))
+    baselines = {}
+    spread = 0.0
+    for (shape, phase), ks in exponents.items():
+        median = stats.median(ks)
+        print("{:<12} {:<10} {:>7.2f} {:>7.2f} {:>7.2f}".format(shape, phase, min(ks), median, max(ks)))
+        # The tolerance only applies to the phases with a baseline, the others are checked against `--max-exponent`
+        if max(ks) > args.max_exponent:
+            baselines.setdefault(shape, {})[phase] = math.ceil(median * 20) / 20
+            spread = max(spread, max(ks) - median)
+    print("baseline_exponents = {")
+    for shape in baselines:
+        print("    {!r}: {!r},".format(shape, baselines[shape]))
+    print("}")
+    # Twice the largest deviation from the median seen in any phase, so that single outliers do not fail the check
+    print("--tolerance {:.2f}".format(math.ceil(spread * 2 * 20) / 20))
+    return 0
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Checks that the phases of the compiler scale linearly.")
+    parser.add_argument('--shapes', nargs='+', choices=sorted(shapes), default=list(shapes))
+    parser.add_argument('--sizes', nargs='+', type=int, default=[100, 200, 400, 800])
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--repeat', type=int, default=3,
+                        help="the minimal number of times each program is compiled (the fastest time counts)")
+    parser.add_argument('--min-duration', type=float, default=1.0,
+                        help="each program is compiled again until this many seconds have passed")
+    parser.add_argument('--max-exponent', type=float, default=1.4,
+                        help="the largest exponent k in `time ~ size ** k` accepted for the phases that scale linearly")
+    parser.add_argument('--tolerance', type=float, default=TOLERANCE,
+                        help="the increase of the exponent over `baseline_exponents` accepted for the other phases")
+    parser.add_argument('--min-time', type=float, default=0.01,
+                        help="phases faster than this (in seconds) for the largest size are not checked")
+    parser.add_argument('--against', choices=['vertices', 'program', 'graph'], default='vertices',
+                        help="fit the times against the number of vertices (default), the number of items in the "
+                             "program, or the size of the graph")
+    parser.add_argument('--calibrate', type=int, metavar='RUNS',
+                        help="runs the harness RUNS times and prints the baselines and the tolerance")
+    parser.add_argument('--output', help="writes the times and the fitted exponents as JSON to this file")
+    args = parser.parse_args(argv)
+
+    args.sizes = sorted(args.sizes)
+    if args.calibrate:
+        return calibrate(args, args.against)
+
+    sizes = args.sizes
+    # The baselines only hold for the number of vertices
+    baselines = baseline_exponents if args.against == 'vertices' else {}
+
+    def accepted(shape, phase):
+        if phase in baselines.get(shape, {}):
+            return round(baselines[shape][phase] + args.tolerance, 2)
+        return args.max_exponent
+
+    failures = []
+    report = {'sizes': sizes, 'seed': args.seed, 'against': args.against, 'shapes': {}}
+    print("{:<12} {:<13} {}  {:>6}".format('shape', 'phase', ' '.join(['{:>10}'.format(n) for n in sizes]), 'k'))
+    for shape in args.shapes:
+        times, counts, vertices, graph_sizes = run_shape(shape, sizes, args.seed, args.repeat, args.min_duration)
+        report['shapes'][shape] = {'vertices': vertices, 'graph_sizes': graph_sizes}
+        print("{:<12} {:<13} {}".format(shape, 'vertices', ' '.join(['{:>10}'.format(n) for n in vertices])))
+        print("{:<12} {:<13} {}".format(shape, 'graph', ' '.join(['{:>10}'.format(n) for n in graph_sizes])))
+        x = {'vertices': vertices, 'program': sizes, 'graph': graph_sizes}[args.against]
+        for phase in phases:
+            k = fit_exponent(x, times[phase])
+            checked = k is not None and times[phase][-1] >= args.min_time
+            failed = checked and k > accepted(shape, phase)
+            if failed:
+                failures.append((shape, phase, k, accepted(shape, phase)))
+            report['shapes'][shape][phase] = {'times': times[phase], 'exponent': k, 'failed': failed}
+            print("{:<12} {:<13} {}  {:>6} {}".format(
+                shape, phase, ' '.join(['{:>8.1f}ms'.format(t * 1000) for t in times[phase]]),
+                '-' if k is None else '{:.2f}'.format(k), '<- superlinear' if failed else ''))
+        # The counters are exact and always checked against the number of vertices
+        for name in counters:
+            k = fit_exponent(vertices, counts[name])
+            failed = k is not None and k > args.max_exponent
+            if failed:
+                failures.append((shape, name, k, args.max_exponent))
+            report['shapes'][shape][name] = {'counts': counts[name], 'exponent': k, 'failed': failed}
+            print("{:<12} {:<13} {}  {:>6} {}".format(
+                shape, name, ' '.join(['{:>10}'.format(n) for n in counts[name]]),
+                '-' if k is None else '{:.2f}'.format(k), '<- superlinear' if failed else ''))
+
+    if args.output:
+        with open(args.output, 'w') as output:
+            json.dump(report, output, indent=2)
+
+    if len(failures) > 0:
+        print("Superlinear phases:")
+        for shape, phase, k, limit in failures:
+            print("  {} / {}: {:.2f} (accepted: {})".format(shape, phase, k, limit))
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
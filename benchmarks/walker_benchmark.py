@@ -0,0 +1,118 @@
+#
+# This file is part of PyFOPPL, an implementation of a First Order Probabilistic Programming Language in Python.
+#
+# License: MIT (see LICENSE.txt)
+#
+# 19. Oct 2026
+#
+"""
+Micro-benchmark for walking the AST.
+
+The benchmark parses a synthetic program once and then walks the resulting AST with three kinds of walkers, which
+cover the three dispatch paths of `Node.walk`: `visit_*`-methods, `enter_*`/`leave_*`-pairs, and the fallback to
+`visit_node`. Finally, it measures the complete compilation of the program, where the compiler, the optimizer and the
+analyses walk the tree many times.
+
+Run it from the root of the repository:
+
+    python benchmarks/walker_benchmark.py [size]
+"""
+import os
+import sys
+import timeit
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from foppl.foppl_ast import *
+from foppl.foppl_parser import parse
+from foppl.compiler import compile
+
+
+def make_program(size: int) -> str:
+    bindings = ' '.join(["x{0} (sample (normal (+ {0} (* 2 {0})) 1))".format(i) for i in range(size)])
+    observations = ' '.join(["(if (> x{0} 0) (observe (normal (- x{0} 1) 1) {0}.5) "
+                             "(observe (gamma (sqrt (+ x{0} 5)) 1) 1))".format(i) for i in range(size)])
+    return "(let [{}] {})".format(bindings, observations)
+
+
+class VisitWalker(Walker):
+    """
+    Counts the nodes through explicit `visit_*`-methods.
+    """
+
+    def _visit(self, node):
+        return 1 + sum([child.walk(self) for child in node.get_children() if isinstance(child, Node)])
+
+    visit_binary = visit_body = visit_compare = visit_distribution = visit_functioncall = _visit
+    visit_if = visit_unary = visit_vector = _visit
+
+    def visit_let(self, node: AstLet):
+        return 1 + sum([value.walk(self) for (_, value) in node.bindings]) + node.body.walk(self)
+
+    def visit_observe(self, node: AstObserve):
+        return 1 + node.distribution.walk(self) + node.value.walk(self)
+
+    def visit_sample(self, node: AstSample):
+        return 1 + node.distribution.walk(self)
+
+    def visit_sqrt(self, node: AstSqrt):
+        return 1 + node.item.walk(self)
+
+    def visit_node(self, node: Node):
+        return 1
+
+
+class EnterLeaveWalker(Walker):
+    """
+    Computes the depth of the tree through `enter_*`/`leave_*`-pairs.
+    """
+
+    def __init__(self):
+        self.depth = 0
+        self.max_depth = 0
+
+    def _enter(self, node):
+        self.depth += 1
+        self.max_depth = max(self.depth, self.max_depth)
+
+    def _leave(self, node, results):
+        self.depth -= 1
+        return self.max_depth
+
+    enter_binary = enter_body = enter_compare = enter_if = enter_unary = _enter
+    leave_binary = leave_body = leave_compare = leave_if = leave_unary = _leave
+
+
+class FallbackWalker(Walker):
+    """
+    Relies entirely on `visit_node` and the default traversal of the children.
+    """
+
+    def __init__(self):
+        self.count = 0
+
+    def visit_node(self, node: Node):
+        self.count += 1
+        return node
+
+
+def main(size: int = 500, repeat: int = 5):
+    source = make_program(size)
+    ast = parse(source)
+    count = ast.walk(VisitWalker())
+    print("Program with {} statements, {} nodes reached by the visit-walker".format(2 * size, count))
+
+    benchmarks = [
+        ('visit_*', lambda: ast.walk(VisitWalker())),
+        ('enter_*/leave_*', lambda: ast.walk(EnterLeaveWalker())),
+        ('visit_node', lambda: ast.walk(FallbackWalker())),
+        ('compile', lambda: compile(parse(source))),
+    ]
+    for name, f in benchmarks:
+        number = 10 if name != 'compile' else 1
+        best = min(timeit.repeat(f, number=number, repeat=repeat)) / number
+        print("{:<16} {:10.3f} ms".format(name, best * 1000))
+
+
+if __name__ == '__main__':
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 500)
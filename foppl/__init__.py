@@ -29,6 +29,47 @@ class Options(object):
 
     `conditional_suffix`:
         A string suffix that is appended to conditional variables.
+
+    `hoist_constants`:
+        If this flag is set to `True`, distributions with constant parameters and other constant subexpressions
+        (which do not depend on any vertex) are computed only once, when the generated module is loaded, instead of
+        in every call of `gen_pdf`, `gen_prior_samples`, etc. As the module then creates distribution objects when it
+        is loaded, `dist` must be imported through `model_imports`.
+
+    `batch_factors`:
+        If this flag is set to `True`, observed values with the same distribution and parameter expressions of the
+        same shape are scored together by one vectorized (numpy) log-density in `gen_pdf`, instead of one `log_pdf`
+        per observation. As this bypasses the distribution objects, it should not be used if the state holds tensors.
+
+    `discrete_tables`:
+        If this flag is set to `True`, categorical distributions with a literal probability vector are replaced by
+        precomputed tables: a Walker alias table for sampling and a table of log-probabilities for scoring. The
+        samples are then plain integers.
+
+    `cache_covariances`:
+        If this flag is set to `True`, multivariate normal distributions with a literal covariance matrix are not
+        created as distribution objects. Instead, the Cholesky factor, its inverse and the log-determinant are
+        computed once when the model is loaded (using numpy), and used directly for sampling and scoring.
+
+    `marginalize_conjugates`:
+        If this flag is set to `True`, latent variables whose children are all observations with a conjugate
+        likelihood (Normal-Normal, Gamma-Poisson, Beta-Bernoulli, Dirichlet-Categorical) are integrated out
+        analytically in `gen_pdf`. The model then provides `gen_collapsed_vars` and `gen_conjugate_posteriors`.
+
+    `enumerate_discrete`:
+        If this flag is set to `True`, discrete latent variables with a finite support known at compile time are
+        summed out exactly by variable elimination. The model then provides `gen_enumerated_vars` and
+        `gen_marginal_pdf`. As the elimination order has to be planned for each model, this is off by default.
+
+    `profile_models`:
+        If this flag is set to `True`, the generated `gen_prior_samples`, `gen_weighted_prior_samples` and `gen_pdf`
+        count the executions and measure the cumulative time of each vertex or factor. The model then provides
+        `get_profile` and `reset_profile`. If the flag is `False`, no profiling code is generated at all.
+
+    `statistics_hooks`:
+        A list of functions, which are called with the `CompileStatistics` (see `foppl.statistics`) whenever a
+        model has been generated (`Model_Generator.generate_class`) or imported (`compile_module`), e.g., to export
+        the timings and counts to a metrics system.
     """
 
     eager_conditionals = True
@@ -49,3 +90,19 @@ class Options(object):
     ]
 
     conditional_suffix = '.data[0]'
+
+    hoist_constants = False
+
+    batch_factors = False
+
+    discrete_tables = False
+
+    cache_covariances = False
+
+    marginalize_conjugates = False
+
+    enumerate_discrete = False
+
+    profile_models = False
+
+    statistics_hooks = []
@@ -0,0 +1,17 @@
+#
+# This file is part of PyFOPPL, an implementation of a First Order Probabilistic Programming Language in Python.
+#
+# License: MIT (see LICENSE.txt)
+#
+# 19. Oct 2026
+#
+"""
+Compiles a directory tree of FOPPL-models in parallel (see `foppl.build`):
+
+    python -m foppl SOURCE [-o OUTPUT] [-j JOBS] [--force] [--option NAME=VALUE ...]
+"""
+import sys
+from .build import main
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,110 @@
+#
+# This file is part of PyFOPPL, an implementation of a First Order Probabilistic Programming Language in Python.
+#
+# License: MIT (see LICENSE.txt)
+#
+# 19. Oct 2026
+#
+"""
+Classification of the conditional functions `f` (as in `f >= 0`) for discontinuous HMC.
+
+With `Options.uniform_conditionals`, every comparison is normalized to `f >= 0`, and the boundary of the respective
+region is given by `f = 0`. Along a trajectory `x + t*d`, an affine function `f` crosses the boundary at exactly one
+time `t`, and a polynomial of degree `k` is a polynomial of degree `k` in `t`. Knowing the kind of each function
+allows the model to compute the crossing times exactly (affine, quadratic) or with a cheap bracketing on the
+interpolating polynomial instead of evaluating the function over and over again.
+"""
+import ast as py_ast
+from .gradients import parse_expr
+
+
+AFFINE = 'affine'
+POLYNOMIAL = 'polynomial'
+GENERAL = 'general'
+
+
+def _degree(node, latent: set, derived: set):
+    """
+    Returns the degree of the expression as a polynomial in the latent variables, or `None` if the expression is not
+    a polynomial.
+    """
+    if isinstance(node, py_ast.Constant):
+        return 0
+    elif isinstance(node, py_ast.Name):
+        if node.id in latent:
+            return 1
+        elif node.id in derived:
+            return None
+        else:
+            return 0
+    elif isinstance(node, py_ast.UnaryOp) and isinstance(node.op, (py_ast.USub, py_ast.UAdd)):
+        return _degree(node.operand, latent, derived)
+    elif isinstance(node, py_ast.BinOp):
+        left = _degree(node.left, latent, derived)
+        right = _degree(node.right, latent, derived)
+        if left is None or right is None:
+            return None
+        op = type(node.op)
+        if op in (py_ast.Add, py_ast.Sub):
+            return max(left, right)
+        elif op is py_ast.Mult:
+            return left + right
+        elif op is py_ast.Div:
+            return left if right == 0 else None
+        elif op is py_ast.Pow:
+            if left == 0 and right == 0:
+                return 0
+            exponent = node.right
+            if isinstance(exponent, py_ast.Constant) and type(exponent.value) in [int, float] and \
+                    exponent.value >= 0 and int(exponent.value) == exponent.value:
+                return left * int(exponent.value)
+            return None
+        else:
+            return 0 if left == 0 and right == 0 else None
+    else:
+        # Any other construct (function calls, subscripts, etc.) is fine as long as it does not depend on a latent
+        # variable or a derived vertex.
+        for child in py_ast.walk(node):
+            if isinstance(child, py_ast.Name) and (child.id in latent or child.id in derived):
+                return None
+        return 0
+
+
+def classify_function(graph, name: str):
+    """
+    Classifies the conditional function `name` of the graph as affine, polynomial or general in the continuous
+    latent variables. Observed values and discrete samples are constant along a trajectory; any other derived vertex
+    makes the function general.
+
+    :param graph:  The graph containing the vertex `name`.
+    :param name:   The name of the conditional function's vertex, e.g., `f20003`.
+    :return:       A tuple `(kind, degree)`, where the degree is `None` for general functions.
+    """
+    code = graph.conditional_densities.get(name, None)
+    if code is None:
+        return GENERAL, None
+    latent = graph.cont_vars
+    constants = set(graph.observed_values.keys()).union(graph.disc_vars)
+    derived = graph.vertices.difference(latent, constants)
+    try:
+        degree = _degree(parse_expr(code), latent, derived)
+    except SyntaxError:
+        degree = None
+    if degree is None:
+        return GENERAL, None
+    elif degree <= 1:
+        return AFFINE, degree
+    else:
+        return POLYNOMIAL, degree
+
+
+def get_function_kinds(graph) -> dict:
+    """
+    Returns a dictionary with the kind and degree of all conditional functions, for which a lambda-function exists.
+    """
+    result = {}
+    for name in graph.conditional_functions:
+        target = graph.conditional_functions[name]
+        if target.startswith("lambda "):
+            result[name] = classify_function(graph, name)
+    return result
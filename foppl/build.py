@@ -0,0 +1,240 @@
+#
+# This file is part of PyFOPPL, an implementation of a First Order Probabilistic Programming Language in Python.
+#
+# License: MIT (see LICENSE.txt)
+#
+# 19. Oct 2026
+#
+"""
+Compiling a directory tree of FOPPL-models (`.clj`-files) on a pool of processes.
+
+For each model `source/path/name.clj`, the build writes three files to `output/path/`:
+    `name.py`          the generated Python module with the model class,
+    `name.graph.json`  the graph of the model (see `Graph.as_dict`),
+    `name.stats.json`  the compile statistics (see `foppl.statistics`).
+
+The manifest `output/foppl-manifest.json` records a hash of each model, which comprises the source, the options and
+the source of the compiler itself. A model, whose hash has not changed since the last build and whose output files
+still exist, is skipped.
+
+The build is available from the command line as `python -m foppl`:
+    ```
+    python -m foppl models/ -o build/ -j 8 --option batch_factors=True
+    ```
+"""
+import argparse
+import ast
+import hashlib
+import json
+import multiprocessing
+import os
+import sys
+import time
+from . import Options
+
+MANIFEST_NAME = 'foppl-manifest.json'
+
+# The options are sent to the worker processes; the hooks are functions, which cannot be sent (nor hashed)
+_excluded_options = ['statistics_hooks']
+
+
+class BuildResult(object):
+    """
+    The names (paths relative to the source directory) of the models that were compiled and skipped, and the error
+    message for each model that failed to compile.
+    """
+
+    def __init__(self, compiled: list, skipped: list, failed: dict, elapsed: float):
+        self.compiled = compiled
+        self.skipped = skipped
+        self.failed = failed
+        self.elapsed = elapsed
+
+    def __repr__(self):
+        return "BuildResult(compiled={}, skipped={}, failed={}, elapsed={:.2f}s)".format(
+            len(self.compiled), len(self.skipped), len(self.failed), self.elapsed)
+
+
+def find_models(source_dir: str) -> list:
+    """
+    Returns the paths of all `.clj`-files in the directory tree, relative to the directory and sorted.
+    """
+    result = []
+    for root, dirs, files in os.walk(source_dir):
+        dirs.sort()
+        for name in sorted(files):
+            if name.endswith('.clj'):
+                result.append(os.path.relpath(os.path.join(root, name), source_dir))
+    return result
+
+
+def _get_options() -> dict:
+    return {key: value for (key, value) in vars(Options).items()
+            if not key.startswith('_') and key not in _excluded_options}
+
+
+def _compiler_hash() -> str:
+    # Any change to the compiler might change the generated code, so that the compiler's source is part of the hash
+    h = hashlib.sha256()
+    directory = os.path.dirname(os.path.abspath(__file__))
+    for name in sorted(os.listdir(directory)):
+        if name.endswith('.py'):
+            with open(os.path.join(directory, name), 'rb') as f:
+                h.update(name.encode('utf-8'))
+                h.update(f.read())
+    return h.hexdigest()
+
+
+def _model_hash(source: bytes, base_hash: str) -> str:
+    h = hashlib.sha256()
+    h.update(base_hash.encode('utf-8'))
+    h.update(source)
+    return h.hexdigest()
+
+
+def _output_paths(output_dir: str, name: str) -> list:
+    base = os.path.join(output_dir, os.path.splitext(name)[0])
+    return [base + '.py', base + '.graph.json', base + '.stats.json']
+
+
+def _init_worker(options: dict):
+    for key in options:
+        setattr(Options, key, options[key])
+
+
+def _compile_model(args):
+    from .compiler import compile
+    from .model_generator import Model_Generator
+    from .statistics import CompileStatistics
+    name, source_path, output_paths = args
+    try:
+        with open(source_path) as f:
+            source = f.read()
+        statistics = CompileStatistics()
+        graph, _ = compile(source, statistics)
+        code = Model_Generator(graph).generate_class()
+        os.makedirs(os.path.dirname(output_paths[0]) or '.', exist_ok=True)
+        module_path, graph_path, stats_path = output_paths
+        with open(module_path, 'w') as f:
+            f.write(code)
+        with open(graph_path, 'w') as f:
+            json.dump(graph.as_dict(), f, indent=1, sort_keys=True)
+        with open(stats_path, 'w') as f:
+            json.dump(statistics.as_dict(), f, indent=1)
+        return name, None
+    except Exception as e:
+        return name, "{}: {}".format(type(e).__name__, e)
+
+
+def _read_manifest(path: str) -> dict:
+    try:
+        with open(path) as f:
+            return json.load(f).get('models', {})
+    except (OSError, ValueError):
+        return {}
+
+
+def build(source_dir: str, output_dir: str, *, num_workers: int = None, force: bool = False,
+          verbose: bool = False) -> BuildResult:
+    """
+    Compiles all `.clj`-files in the directory tree `source_dir` and writes the generated modules, graphs and
+    statistics to the corresponding paths in `output_dir`, using the current settings of `Options`.
+
+    :param source_dir:   The root of the directory tree with the models.
+    :param output_dir:   The root of the output (created if necessary); it also holds the manifest.
+    :param num_workers:  The number of processes (default: number of CPUs). With `1`, no pool is created at all.
+    :param force:        If `True`, all models are compiled, even if they have not changed since the last build.
+    :param verbose:      If `True`, the name of each model is printed when it has been compiled.
+    :return:             A `BuildResult`.
+    """
+    start_time = time.perf_counter()
+    options = _get_options()
+    base_hash = _compiler_hash() + json.dumps(options, sort_keys=True, default=repr)
+    manifest_path = os.path.join(output_dir, MANIFEST_NAME)
+    old_manifest = {} if force else _read_manifest(manifest_path)
+
+    manifest = {}
+    tasks = []
+    skipped = []
+    for name in find_models(source_dir):
+        source_path = os.path.join(source_dir, name)
+        with open(source_path, 'rb') as f:
+            model_hash = _model_hash(f.read(), base_hash)
+        output_paths = _output_paths(output_dir, name)
+        if old_manifest.get(name) == model_hash and all([os.path.exists(path) for path in output_paths]):
+            skipped.append(name)
+            manifest[name] = model_hash
+        else:
+            tasks.append((name, source_path, output_paths))
+            manifest[name] = model_hash
+
+    if num_workers is None:
+        num_workers = multiprocessing.cpu_count()
+    num_workers = max(1, min(num_workers, len(tasks)))
+    if num_workers == 1:
+        results = map(_compile_model, tasks)
+        pool = None
+    else:
+        pool = multiprocessing.Pool(num_workers, initializer=_init_worker, initargs=(options,))
+        results = pool.imap_unordered(_compile_model, tasks)
+
+    compiled = []
+    failed = {}
+    try:
+        for name, error in results:
+            if error is None:
+                compiled.append(name)
+                if verbose:
+                    print("compiled {}".format(name))
+            else:
+                failed[name] = error
+                del manifest[name]
+                if verbose:
+                    print("FAILED {}: {}".format(name, error))
+    finally:
+        if pool is not None:
+            pool.close()
+            pool.join()
+
+    os.makedirs(output_dir, exist_ok=True)
+    with open(manifest_path, 'w') as f:
+        json.dump({'models': manifest}, f, indent=1, sort_keys=True)
+    return BuildResult(sorted(compiled), skipped, failed, time.perf_counter() - start_time)
+
+
+def _parse_option(text: str):
+    name, sep, value = text.partition('=')
+    name = name.strip()
+    if sep == '' or name.startswith('_') or not hasattr(Options, name) or name in _excluded_options:
+        raise argparse.ArgumentTypeError("'{}' is not an option of the form NAME=VALUE".format(text))
+    try:
+        return name, ast.literal_eval(value.strip())
+    except (ValueError, SyntaxError):
+        # Plain strings need not be quoted on the command line
+        return name, value.strip()
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(prog='python -m foppl',
+                                     description="Compiles a directory tree of FOPPL-models in parallel.")
+    parser.add_argument('source', help="the directory with the models (.clj-files)")
+    parser.add_argument('-o', '--output', default='build', help="the output directory (default: build)")
+    parser.add_argument('-j', '--jobs', type=int, default=None,
+                        help="the number of processes (default: number of CPUs)")
+    parser.add_argument('-f', '--force', action='store_true', help="compile all models, even if unchanged")
+    parser.add_argument('-v', '--verbose', action='store_true')
+    parser.add_argument('--option', type=_parse_option, action='append', default=[], metavar='NAME=VALUE',
+                        help="sets an option (see `foppl.Options`), e.g., `--option batch_factors=True`")
+    args = parser.parse_args(argv)
+
+    if not os.path.isdir(args.source):
+        parser.error("'{}' is not a directory".format(args.source))
+    for name, value in args.option:
+        setattr(Options, name, value)
+
+    result = build(args.source, args.output, num_workers=args.jobs, force=args.force, verbose=args.verbose)
+    print("{} compiled, {} unchanged, {} failed in {:.2f}s".format(
+        len(result.compiled), len(result.skipped), len(result.failed), result.elapsed))
+    for name in sorted(result.failed):
+        print("  {}: {}".format(name, result.failed[name]), file=sys.stderr)
+    return 1 if len(result.failed) > 0 else 0
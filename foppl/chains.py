@@ -0,0 +1,256 @@
+#
+# This file is part of PyFOPPL, an implementation of a First Order Probabilistic Programming Language in Python.
+#
+# License: MIT (see LICENSE.txt)
+#
+# 19. Oct 2026
+#
+"""
+Running independent MCMC chains on a pool of processes.
+
+Each worker process compiles the FOPPL-model once (in the pool's initializer) and then runs one chain after the
+other. The samples are not sent back through pipes, but written directly into a shared-memory buffer of shape
+`(num_chains, num_samples, row_width)`. The last axis holds the variables in the order of the model's variable list
+`gen_vars()`, where vector-valued variables (such as samples from a multivariate normal) take as many columns as their
+values have entries (see `TraceSchema`).
+
+The model is compiled with the options of the given `CompilationContext` (see `foppl.context`), or else with the
+current global `Options`. As the options are sent to the worker processes, the `statistics_hooks` are left out (they
+are usually functions, which cannot be pickled). If the generated code needs names that are not imported through
+`model_imports` (such as the module `dist` with the distributions), pass them as `namespace`.
+
+The sampler is a function `sampler(model, state, rng, **kwargs)`, which performs one transition from `state` and
+returns the new state, or the very same state-object if the move was rejected. As the sampler is sent to the worker
+processes, it must be defined at module level (so that it can be pickled). The default sampler is a random-walk
+Metropolis step on all continuous variables.
+
+Example:
+    ```python
+    from foppl.chains import run_chains
+    import pyfo.distributions as dist
+    result = run_chains(open('my_model.clj').read(), num_chains=32, num_samples=10000, namespace={'dist': dist})
+    print(result.variables, result.samples.mean(axis=(0, 1)))
+    ```
+"""
+import importlib
+import math
+import multiprocessing
+import random
+import types
+from .context import CompilationContext, get_option_names
+from .traces import TraceSchema
+from . import Options
+
+# Try to import `numpy` and the shared memory-support, which are both required for the chains
+try:
+    import numpy as np
+except ModuleNotFoundError:
+    np = None
+
+try:
+    from multiprocessing import shared_memory
+except ImportError:
+    shared_memory = None
+
+# The options are sent to the worker processes; the hooks are functions, which cannot be sent (and should not be called
+# by the workers anyway)
+_excluded_options = ['statistics_hooks']
+
+
+def random_walk_metropolis(model, state, rng, step_size: float = 0.5):
+    """
+    Performs one random-walk Metropolis step, proposing a Gaussian move for all continuous variables at once (for
+    vector-valued variables, for each entry). Discrete variables are left unchanged. The state must contain the
+    current log-density under the key `'__logp__'`.
+    """
+    proposal = dict(state)
+    for v in model.get_continuous_distributions():
+        value = state[v]
+        if np is not None and isinstance(value, np.ndarray):
+            proposal[v] = value + np.array([rng.gauss(0.0, step_size) for _ in range(value.size)]).reshape(value.shape)
+        elif hasattr(value, '__len__'):
+            proposal[v] = [x + rng.gauss(0.0, step_size) for x in value]
+        else:
+            proposal[v] = value + rng.gauss(0.0, step_size)
+    log_p = float(model.gen_pdf(proposal))
+    if math.log(1.0 - rng.random()) < log_p - state['__logp__']:
+        proposal['__logp__'] = log_p
+        return proposal
+    return state
+
+
+class ChainResult(object):
+    """
+    The samples of all chains as an array of shape `(num_chains, num_samples, row_width)`, together with the names of
+    the variables (in the order of the last axis), the column layout `[(name, start, width)]` and the acceptance rate
+    of each chain. Use `result[name]` to get the samples of a single variable, with an additional last axis for
+    vector-valued variables.
+    """
+
+    def __init__(self, variables: list, samples, acceptance: list, layout: list = None):
+        self.variables = variables
+        self.samples = samples
+        self.acceptance = acceptance
+        if layout is None:
+            layout = [(v, i, 1) for (i, v) in enumerate(variables)]
+        self.layout = layout
+
+    def __getitem__(self, name):
+        for (v, start, width) in self.layout:
+            if v == name:
+                if width == 1:
+                    return self.samples[:, :, start]
+                return self.samples[:, :, start:start+width]
+        raise KeyError(name)
+
+    def __repr__(self):
+        return "ChainResult(variables={}, shape={})".format(self.variables, self.samples.shape)
+
+
+# The model compiled by the worker's initializer
+_worker_model = None
+
+
+class _ModuleReference(object):
+    """
+    Modules cannot be pickled, and are therefore sent to the worker processes by their name, to be imported again.
+    """
+
+    def __init__(self, name: str):
+        self.name = name
+
+    def resolve(self):
+        return importlib.import_module(self.name)
+
+
+def _get_options(context) -> dict:
+    options = context.options if context is not None else Options
+    return {key: getattr(options, key) for key in get_option_names() if key not in _excluded_options}
+
+
+def _compile_model(source: str, context=None, namespace: dict = None):
+    """
+    Compiles the model and returns the model class and the graph. The generated code is executed with the names in
+    `namespace` as its globals.
+    """
+    from .compiler import compile
+    from .model_generator import Model_Generator
+    graph, _ = compile(source, context=context)
+    scope = {}
+    if namespace is not None:
+        for key in namespace:
+            value = namespace[key]
+            scope[key] = value.resolve() if isinstance(value, _ModuleReference) else value
+    exec(Model_Generator(graph, context=context).generate_class(), scope)
+    return scope['model'], graph
+
+
+def _get_layout(graph, variables: list) -> list:
+    """
+    Returns the columns `(name, start, width)` of the variables in a row of samples.
+    """
+    try:
+        schema = TraceSchema.from_graph(graph, variables)
+    except ValueError as e:
+        raise ValueError("cannot run chains for this model: {}".format(e)) from None
+    result = []
+    start = 0
+    for (name, _, width) in schema.columns:
+        result.append((name, start, width))
+        start += width
+    return result
+
+
+def _init_worker(source: str, options: dict, namespace: dict):
+    global _worker_model
+    context = CompilationContext(statistics_hooks=[], **options)
+    _worker_model, _ = _compile_model(source, context, namespace)
+
+
+def _run_chain(args):
+    chain, buffer_name, shape, layout, burn_in, thin, seed, sampler, sampler_args = args
+    model = _worker_model
+    rng = random.Random(seed)
+    random.seed(seed)
+    if np is not None:
+        np.random.seed(seed % (2**32))
+
+    buffer = shared_memory.SharedMemory(name=buffer_name)
+    try:
+        samples = np.ndarray(shape, dtype=np.float64, buffer=buffer.buf)[chain]
+        state = model.gen_prior_samples()
+        state['__logp__'] = float(model.gen_pdf(dict(state)))
+        accepted = 0
+        steps = 0
+        for i in range(burn_in + shape[1] * thin):
+            new_state = sampler(model, state, rng, **sampler_args)
+            if new_state is not state:
+                accepted += 1
+            state = new_state
+            steps += 1
+            if i >= burn_in and (i - burn_in) % thin == 0:
+                row = samples[(i - burn_in) // thin]
+                for (v, start, width) in layout:
+                    if width == 1:
+                        row[start] = float(state[v])
+                    else:
+                        row[start:start+width] = [float(x) for x in state[v]]
+        del samples
+    finally:
+        buffer.close()
+    return chain, accepted / steps if steps > 0 else 0.0
+
+
+def run_chains(source: str, num_chains: int, num_samples: int, *, sampler=random_walk_metropolis,
+               sampler_args: dict = None, burn_in: int = 0, thin: int = 1, num_workers: int = None, seed: int = None,
+               context=None, namespace: dict = None):
+    """
+    Runs `num_chains` independent chains of the FOPPL-model given as `source` on a pool of processes.
+
+    :param source:        The FOPPL source code of the model.
+    :param num_chains:    The number of independent chains.
+    :param num_samples:   The number of samples to record per chain (after burn-in and thinning).
+    :param sampler:       The transition function `sampler(model, state, rng, **sampler_args)`.
+    :param sampler_args:  Additional keyword arguments for the sampler, e.g., `{'step_size': 0.1}`.
+    :param burn_in:       The number of initial transitions per chain, which are not recorded.
+    :param thin:          Only every `thin`-th transition is recorded.
+    :param num_workers:   The number of processes (default: number of CPUs, but at most `num_chains`).
+    :param seed:          The seed for the first chain; chain `i` uses `seed + i`.
+    :param context:       The `CompilationContext` with the options for compiling the model (default: `Options`).
+    :param namespace:     Additional globals for the generated code, e.g., `{'dist': pyfo.distributions}`.
+    :return:              A `ChainResult`.
+    """
+    if np is None or shared_memory is None:
+        raise RuntimeError("running chains in parallel requires 'numpy' and 'multiprocessing.shared_memory'")
+    if sampler_args is None:
+        sampler_args = {}
+    if seed is None:
+        seed = random.randrange(2**31)
+    if num_workers is None:
+        num_workers = multiprocessing.cpu_count()
+    num_workers = max(1, min(num_workers, num_chains))
+    thin = max(1, thin)
+
+    model, graph = _compile_model(source, context, namespace)
+    variables = model.gen_vars()
+    layout = _get_layout(graph, variables)
+    row_width = sum([width for (_, _, width) in layout])
+    shape = (num_chains, num_samples, row_width)
+    size = max(1, num_chains * num_samples * row_width * 8)
+    options = _get_options(context)
+    if namespace is not None:
+        namespace = {key: _ModuleReference(value.__name__) if isinstance(value, types.ModuleType) else value
+                     for (key, value) in namespace.items()}
+
+    buffer = shared_memory.SharedMemory(create=True, size=size)
+    try:
+        tasks = [(i, buffer.name, shape, layout, burn_in, thin, seed + i, sampler, sampler_args)
+                 for i in range(num_chains)]
+        initargs = (source, options, namespace)
+        with multiprocessing.Pool(num_workers, initializer=_init_worker, initargs=initargs) as pool:
+            acceptance = dict(pool.imap_unordered(_run_chain, tasks))
+        samples = np.ndarray(shape, dtype=np.float64, buffer=buffer.buf).copy()
+    finally:
+        buffer.close()
+        buffer.unlink()
+    return ChainResult(variables, samples, [acceptance[i] for i in range(num_chains)], layout)
@@ -10,8 +10,12 @@ from .foppl_ast import *
 from .graphs import *
 from .foppl_objects import Symbol
 from .foppl_parser import parse
+from .foppl_reader import tokenize
+from .statistics import CompileStatistics, count_nodes
 from .foppl_reader import is_alpha, is_alpha_numeric
 from .optimizers import Optimizer
+from .intervals import RangeAnalysis
+from .type_inference import TypeInference, ValueType
 from .function_compiler import FunctionCompiler
 from .foppl_distributions import distribution_params
 from . import Options
@@ -30,6 +34,15 @@ def _is_identifier(symbol):
         return False
 
 
+# The operations for which the optimizer returns new nodes with optimized operands (see `Compiler.optimize`)
+_operations = (AstBinary, AstCompare, AstIf, AstUnary)
+
+
+def _own_graph(graph: Graph) -> Graph:
+    # `Graph.EMPTY` is shared by all compilations (and threads) and must not be modified
+    return Graph(set(), set()) if graph is Graph.EMPTY else graph
+
+
 class Scope(object):
     """
     The scope is basically a stack of dictionaries, implemented as a simply
@@ -37,7 +50,9 @@ class Scope(object):
     stored in distinct dictionaries, and hence also have distinct namespaces.
 
     If the value of a symbol is of type AstValue, we store this ast-node as
-    well. This is then used by the optimizer.
+    well. This is then used by the optimizer. Similarly, if the range of
+    a symbol's value is known, we store it for the range analysis, and the
+    type of a symbol's value for the type inference.
     """
 
     def __init__(self, prev=None):
@@ -45,30 +60,38 @@ class Scope(object):
         self.symbols = {}
         self.functions = {}
         self.values = {}
+        self.ranges = {}
+        self.types = {}
+
+    def _find_scope(self, name: str, table: str):
+        # Returns the innermost scope, which defines `name` in the given table (e.g., 'symbols'). We walk the
+        # chain of scopes in a loop, because deeply nested programs might have more scopes than the recursion limit.
+        scope = self
+        while scope is not None:
+            if name in getattr(scope, table):
+                return scope
+            scope = scope.prev
+        return None
 
     def find_function(self, name: str):
-        if name in self.functions:
-            return self.functions[name]
-        elif self.prev:
-            return self.prev.find_function(name)
-        else:
-            return None
+        scope = self._find_scope(name, 'functions')
+        return scope.functions[name] if scope is not None else None
 
     def find_symbol(self, name: str):
-        if name in self.symbols:
-            return self.symbols[name]
-        elif self.prev:
-            return self.prev.find_symbol(name)
-        else:
-            return None
+        scope = self._find_scope(name, 'symbols')
+        return scope.symbols[name] if scope is not None else None
 
     def find_value(self, name: str):
-        if name in self.values:
-            return self.values[name]
-        elif self.prev:
-            return self.prev.find_value(name)
-        else:
-            return None
+        scope = self._find_scope(name, 'values')
+        return scope.values[name] if scope is not None else None
+
+    def find_range(self, name: str):
+        scope = self._find_scope(name, 'symbols')
+        return scope.ranges.get(name, None) if scope is not None else None
+
+    def find_type(self, name: str):
+        scope = self._find_scope(name, 'symbols')
+        return scope.types.get(name, None) if scope is not None else None
 
     def add_function(self, name: str, value):
         self.functions[name] = value
@@ -81,6 +104,14 @@ class Scope(object):
         if name in self.symbols:
             self.values[name] = value
 
+    def add_range(self, name: str, value):
+        if name in self.symbols and value is not None:
+            self.ranges[name] = value
+
+    def add_type(self, name: str, value):
+        if name in self.symbols and value is not None:
+            self.types[name] = value
+
     @property
     def is_global_scope(self):
         return self.prev is None
@@ -103,7 +134,9 @@ class Compiler(Walker):
     condition (if any).
     """
 
-    def __init__(self):
+    def __init__(self, statistics: CompileStatistics = None, options=None):
+        # The options of the compilation context (see `foppl.context`), or the global `Options`:
+        self.options = options if options is not None else Options
         # Used to create 'unique' symbols in `gen_symbol`:
         self.__symbol_counter = 20000
         # The scope makes sure all symbols defined by `let` and `def` are available:
@@ -114,6 +147,16 @@ class Compiler(Walker):
         self.function_compiler = FunctionCompiler(self)
         # When inside a conditional expression (if), we keep track of the current conditions with this stack:
         self.conditions = []
+        # The range analysis allows the optimizer to decide some comparisons (and hence `if`s) statically:
+        self.range_analysis = RangeAnalysis(self)
+        # The ranges of the sampled vertices (as far as known), derived from their distributions:
+        self.vertex_ranges = {}
+        # The type inference tells us, e.g., if an index is already an integer:
+        self.type_inference = TypeInference(self)
+        # The nodes that have been optimized as part of an enclosing expression (see `optimize`):
+        self._optimized = {}
+        # If present, the compiler counts the optimizer invocations and expansions of functions here:
+        self.statistics = statistics
 
     def resolve_symbol(self, name: str):
         return self.scope.find_symbol(name)
@@ -145,9 +188,33 @@ class Compiler(Walker):
 
     def optimize(self, node: Node):
         if node and self.optimizer:
-            return node.walk(self.optimizer)
+            # The operands of an optimized operation are optimized already. We mark them so that they are not
+            # optimized again when the compiler gets to them, which would take quadratic time for deeply nested
+            # expressions. The optimizer always creates new nodes for these operations, so that the marks cannot
+            # apply to a node that is shared with another scope (e.g., in the body of a function).
+            if self._optimized.pop(id(node), None) is not node:
+                span = node.span
+                if self.statistics is not None:
+                    self.statistics.count('optimizations')
+                    with self.statistics.phase('optimize'):
+                        node = node.walk(self.optimizer)
+                else:
+                    node = node.walk(self.optimizer)
+                # The optimizer creates new nodes, which should still point to the original source
+                if isinstance(node, Node) and node.span is None:
+                    node.span = span
+            if isinstance(node, _operations):
+                for child in node.get_children():
+                    if isinstance(child, _operations):
+                        self._optimized[id(child)] = child
         return node
 
+    def _add_expansion(self, kind: str, name: str, symbol_count: int):
+        # Each new symbol stands for a new vertex, so the vertices created by the expansion are the symbols
+        # generated since `symbol_count`
+        if self.statistics is not None:
+            self.statistics.add_expansion(kind, name, self.__symbol_counter - symbol_count)
+
     def apply_function(self, function: AstFunction, args: list):
         """
         Applies a function to a series of arguments by simple substitution/replacement.
@@ -165,6 +232,9 @@ class Compiler(Walker):
         :param args:      All arguments as a list of AST-nodes.
         :return:          A tuple (graph, expr).
         """
+        return self.run(self._apply_function(function, args))
+
+    def _apply_function(self, function: AstFunction, args: list):
         assert isinstance(function, AstFunction)
         if len(function.params) != len(args):
             raise SyntaxError("wrong number of arguments for '{}'".format(function.name))
@@ -179,8 +249,10 @@ class Compiler(Walker):
                     if type(value) in [int, bool, str, float]:
                         self.scope.add_symbol(name, (Graph.EMPTY, AstValue(value)))
                     else:
-                        self.scope.add_symbol(name, value.walk(self))
-            result = function.body.walk(self)
+                        self.scope.add_symbol(name, (yield value))
+                        self.scope.add_range(name, self.range_analysis.walk(value))
+                        self.scope.add_type(name, self.type_inference.walk(value))
+            result = yield function.body
         finally:
             self.end_scope()
         return result
@@ -193,6 +265,9 @@ class Compiler(Walker):
         :param node:  The value or function to be bound.
         :return:      None
         """
+        self.run(self._define(name, node))
+
+    def _define(self, name, node):
         if isinstance(name, Symbol):
             name = name.name
 
@@ -200,13 +275,21 @@ class Compiler(Walker):
             self.scope.add_function(name, node)
         else:
             node = self.optimize(node)
-            value = node.walk(self)
+            value = yield node
             if _is_identifier(value[1]):
                 value[0].add_original_name(name, value[1])
             self.scope.add_symbol(name, value)
+            self.scope.add_range(name, self.range_analysis.walk(node))
+            self.scope.add_type(name, self.type_inference.walk(node))
             if isinstance(node, AstValue):
                 self.scope.add_value(name, node.value)
 
+    def _type_of(self, node: Node, graph: Graph, expr: str):
+        # If the node has been compiled to a vertex, its type is known, and we do not need to walk the node again
+        if expr in graph.vertex_types:
+            return graph.vertex_types[expr]
+        return self.type_inference.walk(node)
+
     def visit_node(self, node: Node):
         # We raise an exception as we want to handle all types of nodes explicitly.
         raise NotImplementedError("{}".format(type(node)))
@@ -214,18 +297,22 @@ class Compiler(Walker):
     def visit_binary(self, node: AstBinary):
         node = self.optimize(node)
         if isinstance(node, AstBinary):
-            l_g, l_e = node.left.walk(self)
-            r_g, r_e = node.right.walk(self)
-            result = "({} {} {})".format(l_e, node.op, r_e)
-            return l_g.merge(r_g), result
+            # Long chains such as `(+ a b c ...)` are compiled as one flat expression `(a + b + c ...)`
+            graph = Graph.EMPTY
+            exprs = []
+            for item in node.get_operands():
+                g, e = yield item
+                graph = graph.merge(g)
+                exprs.append(e)
+            return graph, "({})".format(" {} ".format(node.op).join(exprs))
         else:
-            return node.walk(self)
+            return (yield node)
 
     def visit_body(self, node: AstBody):
         result_graph = Graph.EMPTY
         result_expr = "None"
         for item in node.body:
-            g, e = item.walk(self)
+            g, e = yield item
             result_graph = result_graph.merge(g)
             result_expr = e
         return result_graph, result_expr
@@ -234,43 +321,47 @@ class Compiler(Walker):
         node = self.optimize(node)
         if isinstance(node, AstFunctionCall) and node.function == 'exp':
             if len(node.args) == 1:
-                graph, arg = self.optimize(node.args[0]).walk(self)
+                graph, arg = yield self.optimize(node.args[0])
                 return graph, "math.exp({})".format(arg)
             else:
                 raise SyntaxError("'exp' requires exactly one argument")
         else:
-            return node.walk(self)
+            return (yield node)
 
     def visit_call_get(self, node: AstFunctionCall):
         node = self.optimize(node)
         if isinstance(node, AstFunctionCall) and node.function == 'get':
             args = node.args
             if len(args) == 2:
-                seq_graph, seq_expr = args[0].walk(self)
-                idx_graph, idx_expr = args[1].walk(self)
+                seq_graph, seq_expr = yield args[0]
+                idx_graph, idx_expr = yield args[1]
                 if len(seq_expr) > 2 and seq_expr[0] == '[' and seq_expr[-1] == ']' and \
                         _is_identifier(seq_expr[1:-1]) and idx_expr in ['0', '-1']:
                     return seq_graph.merge(idx_graph), seq_expr[1:-1]
-                if all(['0' <= x <= '9' for x in idx_expr]) or idx_expr == '-1':
+                # Only compile-time integers can be used directly: the values of vertices come from the state, where
+                # they might be floats (or tensors), even if their type is inferred as integer
+                if all(['0' <= x <= '9' for x in idx_expr]) or idx_expr == '-1' or \
+                        (isinstance(args[1], AstValue) and type(args[1].value) is int):
                     return seq_graph.merge(idx_graph), "{}[{}]".format(seq_expr, idx_expr)
                 else:
                     return seq_graph.merge(idx_graph), "{}[int({})]".format(seq_expr, idx_expr)
             else:
                 raise SyntaxError("'get' expects exactly two arguments")
         else:
-            return node.walk(self)
+            return (yield node)
 
     def visit_call_map(self, node: AstFunctionCall):
         node = self.optimize(node)
         if not (isinstance(node, AstFunctionCall) and node.function == "map"):
-            return node.walk(self)
+            return (yield node)
 
         f = node.args[0]
         args = [self.optimize(arg) for arg in node.args[1:]]
         if all([isinstance(arg, AstValue) for arg in args]):
             args = [arg.value for arg in args]
         elif isinstance(f, AstSymbol):
-            graph, expr = AstVector(args).walk(self)
+            graph, expr = yield AstVector(args)
+            graph = _own_graph(graph)
             graph.add_used_function(f.name)
             return graph, "list(map({}, {}))".format(f.name, expr)
         else:
@@ -284,7 +375,11 @@ class Compiler(Walker):
                 args = mangled_args
             else:
                 args = [[arg] for arg in args[0]]
-            Vec = [self.apply_function(f, arg) for arg in args]
+            symbol_count = self.__symbol_counter
+            Vec = []
+            for arg in args:
+                Vec.append((yield from self._apply_function(f, arg)))
+            self._add_expansion('map', f.name, symbol_count)
             graph = merge(*[v[0] for v in Vec])
             expr = "[{}]".format(', '.join([v[1] for v in Vec]))
             return graph, expr
@@ -297,32 +392,34 @@ class Compiler(Walker):
         if isinstance(node, AstFunctionCall) and node.function == 'rest':
             args = node.args
             if len(args) == 1:
-                graph, expr = args[0].walk(self)
+                graph, expr = yield args[0]
                 return graph, "{}[1:]".format(expr)
             else:
                 raise SyntaxError("'rest' expects exactly one argument")
         else:
-            return node.walk(self)
+            return (yield node)
 
     def visit_compare(self, node: AstCompare):
         node = self.optimize(node)
         if isinstance(node, AstCompare):
-            l_g, l_e = node.left.walk(self)
-            r_g, r_e = node.right.walk(self)
+            l_g, l_e = yield node.left
+            r_g, r_e = yield node.right
             graph = l_g.merge(r_g)
-            expr = "({} {} {}){}".format(l_e, node.op, r_e, Options.conditional_suffix)
+            expr = "({} {} {}){}".format(l_e, node.op, r_e, self.options.conditional_suffix)
             if not graph.is_empty:
                 cond_name = self.gen_symbol('cond_')
                 cur_cond = self.current_condition()
                 if cur_cond:
                     graph = graph.merge(Graph({cur_cond}, {(cur_cond, cond_name)}))
 
-                if Options.uniform_conditionals and node.op == '>=' and \
+                if self.options.uniform_conditionals and node.op == '>=' and \
                         isinstance(node.right, AstValue) and node.right.value == 0:
                     f_name = self.gen_symbol('f')
                     graph = graph.merge(Graph({f_name}, {(v, f_name) for v in graph.vertices}, {f_name: l_e}))
                     graph = graph.merge(Graph({cond_name}, {(f_name, cond_name)},
-                                              {cond_name: "({} >= 0){}".format(f_name, Options.conditional_suffix)}))
+                                              {cond_name: "({} >= 0){}".format(f_name, self.options.conditional_suffix)}))
+                    graph.add_vertex_type(f_name, self.type_inference.walk(node.left))
+                    graph.add_vertex_span(f_name, node.span)
                     graph.add_conditional_function(cond_name, f_name)
                     if self.function_compiler:
                         try:
@@ -333,15 +430,17 @@ class Compiler(Walker):
                 else:
                     graph = graph.merge(Graph({cond_name}, {(v, cond_name) for v in graph.vertices},
                                               {cond_name: expr}))
+                graph.add_vertex_type(cond_name, ValueType('bool'))
+                graph.add_vertex_span(cond_name, node.span)
                 expr = cond_name
 
             return graph, expr
         else:
-            return node.walk(self)
+            return (yield node)
 
     def visit_def(self, node: AstDef):
         if self.scope.is_global_scope:
-            self.define(node.name, node.value)
+            yield from self._define(node.name, node.value)
             return Graph.EMPTY, "None"
         else:
             raise SyntaxError("'def' must be on the global level")
@@ -350,7 +449,7 @@ class Compiler(Walker):
         graph = Graph.EMPTY
         args = []
         for arg in node.args:
-            gr, expr = arg.walk(self)
+            gr, expr = yield arg
             graph = graph.merge(gr)
             args.append(expr)
         params = distribution_params[node.name].copy()
@@ -373,7 +472,7 @@ class Compiler(Walker):
             else:
                 size = (0, 0)
             node.size = size
-        return self.visit_distribution(node)
+        return (yield from self.visit_distribution(node))
 
     def visit_expr(self, node: AstExpr):
         return node.value
@@ -389,14 +488,18 @@ class Compiler(Walker):
         else:
             func_name = None
         if isinstance(func, AstFunction):
-            return self.apply_function(func, node.args)
+            symbol_count = self.__symbol_counter
+            result = yield from self._apply_function(func, node.args)
+            self._add_expansion('function', func_name if func_name else func.name, symbol_count)
+            return result
         elif func_name:
             exprs = []
             graph = Graph.EMPTY
             for a in node.args:
-                g, e = a.walk(self)
+                g, e = yield a
                 graph = graph.merge(g)
                 exprs.append(e)
+            graph = _own_graph(graph)
             graph.add_used_function(func_name)
             return graph, "{}({})".format(func_name, ", ".join(exprs))
         else:
@@ -408,7 +511,7 @@ class Compiler(Walker):
         # is still an if-node after optimization.
         node = self.optimize(node)
         if not isinstance(node, AstIf):
-            return node.walk(self)
+            return (yield node)
 
         # We create two symbol for the entire if-expression.
         name = self.gen_symbol('c')
@@ -416,7 +519,7 @@ class Compiler(Walker):
         # Compile the condition. If we are inside another conditional expression already, we link the new
         # condition to the current condition through a new edge in the graph, so that the new condition
         # depends on the current one.
-        cond_graph, cond_name = node.cond.walk(self)
+        cond_graph, cond_name = yield node.cond
 
         # Compile if- and else-body (if present). During this compilation step, we push the new condition onto
         # the condition stack, so that expressions and statements within the branches are made aware of being
@@ -424,17 +527,17 @@ class Compiler(Walker):
         _cond_name = cond_name[4:] if cond_name.startswith("not ") else cond_name
         if not cond_graph.is_empty and _is_identifier(_cond_name) and _cond_name.startswith("cond"):
             self.begin_condition(_cond_name)
-            if_graph, if_body = node.if_body.walk(self)
+            if_graph, if_body = yield node.if_body
             if node.else_body:
-                else_graph, else_body = node.else_body.walk(self)
+                else_graph, else_body = yield node.else_body
             else:
                 else_graph, else_body = Graph.EMPTY, "None"
             self.end_condition()
 
         else:
-            if_graph, if_body = node.if_body.walk(self)
+            if_graph, if_body = yield node.if_body
             if node.else_body:
-                else_graph, else_body = node.else_body.walk(self)
+                else_graph, else_body = yield node.else_body
             else:
                 else_graph, else_body = Graph.EMPTY, "None"
 
@@ -444,6 +547,11 @@ class Compiler(Walker):
         graph = graph.merge(if_graph.add_condition(cond_name))
         graph = graph.merge(else_graph.add_condition("not "+cond_name if _cond_name == cond_name else _cond_name))
         graph = graph.merge(Graph({name}, set((v, name) for v in graph.vertices), {name: expr}))
+        graph.add_vertex_span(name, node.span)
+        if node.else_body:
+            if_type = self._type_of(node.if_body, if_graph, if_body)
+            if if_type is not None:
+                graph.add_vertex_type(name, if_type.join(self._type_of(node.else_body, else_graph, else_body)))
         return graph, name
 
     def visit_let(self, node: AstLet):
@@ -452,8 +560,8 @@ class Compiler(Walker):
             for (name, value) in node.bindings:
                 if isinstance(name, Symbol):
                     name = name.name
-                self.define(name, value)
-            result = node.body.walk(self)
+                yield from self._define(name, value)
+            result = yield node.body
         finally:
             self.end_scope()
         return result
@@ -468,25 +576,31 @@ class Compiler(Walker):
             else:
                 raise SyntaxError("'loop' requires a function")
             iter_count = node.iter_count
+            symbol_count = self.__symbol_counter
             i = 0
-            args = [AstExpr(*a.walk(self)) for a in node.args]
-            result = node.arg.walk(self)
+            args = []
+            for a in node.args:
+                args.append(AstExpr(*(yield a)))
+            result = yield node.arg
             while i < iter_count:
-                result = self.apply_function(function, [AstValue(i), AstExpr(*result)] + args)
+                result = yield from self._apply_function(function, [AstValue(i), AstExpr(*result)] + args)
                 i += 1
+            self._add_expansion('loop', function.name, symbol_count)
             return result
         else:
-            return node.walk(self)
+            return (yield node)
 
     def visit_observe(self, node: AstObserve):
         dist = node.distribution
         name = self.gen_symbol('y')
         node.id = name
-        graph, expr = dist.walk(self)
-        if hasattr(dist, 'size'):
+        graph, expr = yield dist
+        if getattr(dist, 'size', None) is not None:
             graph.add_distribution_size(name, dist.size)
-        _, obs_expr = node.value.walk(self)
+        _, obs_expr = yield node.value
         graph = graph.merge(Graph({name}, set((v, name) for v in graph.vertices), {name: expr}, {name: obs_expr}))
+        graph.add_vertex_type(name, self.type_inference.walk(node))
+        graph.add_vertex_span(name, node.span)
         cond = self.current_condition()
         if cond:
             graph = graph.merge(Graph({cond}, {(cond, name)}))
@@ -496,10 +610,16 @@ class Compiler(Walker):
         dist = node.distribution
         name = self.gen_symbol('x')
         node.id = name
-        graph, expr = dist.walk(self)
-        if hasattr(dist, 'size'):
+        graph, expr = yield dist
+        if getattr(dist, 'size', None) is not None:
             graph.add_distribution_size(name, dist.size)
+        if isinstance(dist, AstDistribution):
+            vertex_range = self.range_analysis.distribution_range(dist)
+            if vertex_range is not None:
+                self.vertex_ranges[name] = vertex_range
         graph = graph.merge(Graph({name}, set((v, name) for v in graph.vertices), {name: expr}))
+        graph.add_vertex_type(name, self.type_inference.walk(node))
+        graph.add_vertex_span(name, node.span)
         cond = self.current_condition()
         if cond:
             graph = graph.merge(Graph({cond}, {(cond, name)}))
@@ -508,10 +628,10 @@ class Compiler(Walker):
     def visit_sqrt(self, node: AstSqrt):
         node = self.optimize(node)
         if isinstance(node, AstSqrt):
-            graph, expr = node.item.walk(self)
+            graph, expr = yield node.item
             return graph, "math.sqrt({})".format(expr)
         else:
-            return node.walk(self)
+            return (yield node)
 
     def visit_symbol(self, node: AstSymbol):
         result = self.scope.find_symbol(node.name)
@@ -523,10 +643,10 @@ class Compiler(Walker):
     def visit_unary(self, node: AstUnary):
         node = self.optimize(node)
         if isinstance(node, AstUnary):
-            graph, expr = node.item.walk(self)
+            graph, expr = yield node.item
             return graph, "{}{}".format(node.op, expr)
         else:
-            return node.walk(self)
+            return (yield node)
 
     def visit_value(self, node: AstValue):
         # We must use `repr` here instead of `str`, as `repr` returns a string with delimiters.
@@ -536,16 +656,46 @@ class Compiler(Walker):
         items = []
         graph = Graph.EMPTY
         for item in node.get_children():
-            g, expr = item.walk(self)
+            g, expr = yield item
             graph = graph.merge(g)
             items.append(expr)
         return graph, "[{}]".format(", ".join(items))
 
 
-def compile(source):
+def compile(source, statistics: CompileStatistics = None, context=None):
+    """
+    Compiles the source (a string, the forms returned by `tokenize` or an AST) and returns a tuple with the graph
+    and the Python expression for the result of the program.
+
+    The statistics of the compilation are attached to the graph as `graph.statistics`. If no statistics-object is
+    given, `compile` creates a new one, which the `Model_Generator` passes to the `statistics_hooks` once it has
+    generated the model (graphs that are never generated are not reported). Otherwise, the caller is responsible for
+    reporting the statistics (cf. `compile_module`).
+
+    The options are taken from the compilation context (see `foppl.context`) if given, or else from the global
+    `Options`.
+    """
+    options = context.options if context is not None else Options
+    if statistics is None:
+        statistics = CompileStatistics()
+        statistics.hooks = options.statistics_hooks
+    merge_count = get_merge_count()
     if isinstance(source, Node):
         ast = source
     else:
-        ast = parse(source)
-    compiler = Compiler()
-    return compiler.walk(ast)
+        if type(source) is str:
+            with statistics.phase('tokenize'):
+                source = tokenize(source)
+        with statistics.phase('parse'):
+            ast = parse(source, context)
+    statistics.set_count('nodes', count_nodes(ast))
+    compiler = Compiler(statistics, options)
+    with statistics.phase('compile'):
+        graph, expr = compiler.walk(ast)
+    if graph is Graph.EMPTY:
+        graph = Graph(set(), set())
+    graph.statistics = statistics
+    statistics.set_count('vertices', len(graph.vertices))
+    statistics.set_count('arcs', len(graph.arcs))
+    statistics.set_count('merges', get_merge_count() - merge_count)
+    return graph, expr
@@ -0,0 +1,192 @@
+#
+# This file is part of PyFOPPL, an implementation of a First Order Probabilistic Programming Language in Python.
+#
+# License: MIT (see LICENSE.txt)
+#
+# 19. Oct 2026
+#
+"""
+Detection of conjugate prior/likelihood pairs and their analytic marginalization.
+
+A latent vertex `z` can be integrated out if all of its children are observations with a conjugate likelihood, in
+which `z` appears directly as the respective parameter, e.g.:
+    ```
+    z = dist.Normal(mu=0.0, sigma=10.0)
+    y1 = dist.Normal(mu=z, sigma=2.0)     observed: 1.5
+    y2 = dist.Normal(mu=z, sigma=x20001)  observed: 0.7
+    ```
+The collapsed model does not contain `z` anymore. Instead, the observations are scored one after the other by their
+posterior predictive density `p(y_i | y_1, ..., y_(i-1))`, while the parameters of the posterior of `z` are updated
+after each observation. The product of the predictive densities is the marginal likelihood of all observations, and
+the final parameters describe the posterior distribution of `z` given the observations.
+
+The supported pairs are Normal-Normal (known variance), Gamma-Poisson, Beta-Bernoulli and Dirichlet-Categorical.
+"""
+import ast as py_ast
+from .gradients import parse_expr, split_distribution, strip_conditional_suffix, to_source
+
+
+class ConjugateFamily(object):
+    """
+    The code templates for one conjugate pair. The state of the posterior is held in local variables, the names of
+    which are derived from the latent variable `z` (e.g., `_alpha_z`). In the templates, `{x}` denotes the observed
+    value, and all other fields refer to parameters or the posterior state.
+
+    `prior`:       The name of the prior distribution.
+    `likelihood`:  The name of the distribution of the observations.
+    `parameter`:   The parameter of the likelihood, which must be the latent variable itself.
+    `init`:        The code to initialise the posterior state from the prior parameters.
+    `predictive`:  The log-density of the posterior predictive distribution of one observation.
+    `update`:      The code to update the posterior state with one observation.
+    `posterior`:   The code for the posterior distribution.
+    """
+
+    def __init__(self, prior, likelihood, parameter, state, init, predictive, update, posterior):
+        self.prior = prior
+        self.likelihood = likelihood
+        self.parameter = parameter
+        self.state = state
+        self.init = init
+        self.predictive = predictive
+        self.update = update
+        self.posterior = posterior
+
+    def __repr__(self):
+        return "ConjugateFamily({}-{})".format(self.prior, self.likelihood)
+
+    def format(self, template: list, z: str, **values):
+        names = {s: '_{}_{}'.format(s, z) for s in self.state}
+        names.update(values)
+        return [line.format(**names) for line in template]
+
+
+conjugate_families = [
+    ConjugateFamily(
+        'Normal', 'Normal', 'mu', ['mu', 'var', 'k'],
+        init=["{mu} = {p_mu}", "{var} = {p_sigma} ** 2"],
+        predictive="-0.5 * ({x} - {mu}) ** 2 / ({var} + {sigma} ** 2) - "
+                   "0.5 * math.log(2.0 * math.pi * ({var} + {sigma} ** 2))",
+        update=["{k} = {var} / ({var} + {sigma} ** 2)",
+                "{mu} = {mu} + {k} * ({x} - {mu})",
+                "{var} = (1.0 - {k}) * {var}"],
+        posterior="dist.Normal(mu={mu}, sigma=math.sqrt({var}))"
+    ),
+    ConjugateFamily(
+        'Gamma', 'Poisson', 'lam', ['alpha', 'beta'],
+        init=["{alpha} = {p_alpha}", "{beta} = {p_beta}"],
+        predictive="math.lgamma({alpha} + {x}) - math.lgamma({alpha}) - math.lgamma({x} + 1.0) + "
+                   "{alpha} * math.log({beta} / ({beta} + 1.0)) - {x} * math.log({beta} + 1.0)",
+        update=["{alpha} = {alpha} + {x}",
+                "{beta} = {beta} + 1.0"],
+        posterior="dist.Gamma(alpha={alpha}, beta={beta})"
+    ),
+    ConjugateFamily(
+        'Beta', 'Bernoulli', 'ps', ['alpha', 'beta'],
+        init=["{alpha} = {p_alpha}", "{beta} = {p_beta}"],
+        predictive="math.log(({alpha} if {x} else {beta}) / ({alpha} + {beta}))",
+        update=["{alpha}, {beta} = ({alpha} + 1.0, {beta}) if {x} else ({alpha}, {beta} + 1.0)"],
+        posterior="dist.Beta(alpha={alpha}, beta={beta})"
+    ),
+    ConjugateFamily(
+        'Dirichlet', 'Categorical', 'ps', ['alpha'],
+        init=["{alpha} = [float(_a) for _a in {p_alpha}]"],
+        predictive="math.log({alpha}[int({x})] / sum({alpha}))",
+        update=["{alpha}[int({x})] += 1.0"],
+        posterior="dist.Dirichlet(alpha={alpha})"
+    ),
+]
+
+
+def _names(node) -> set:
+    return {n.id for n in py_ast.walk(node) if isinstance(n, py_ast.Name)}
+
+
+class ConjugateGroup(object):
+    """
+    A latent variable together with all its observed children, which can be marginalized out analytically.
+
+    `latent`:      The name of the latent vertex.
+    `family`:      The `ConjugateFamily`.
+    `prior`:       The parameters of the prior as a dictionary of code strings.
+    `children`:    A dictionary mapping the observed children to their parameters (as a dictionary of code strings).
+    """
+
+    def __init__(self, latent: str, family: ConjugateFamily, prior: dict, children: dict):
+        self.latent = latent
+        self.family = family
+        self.prior = prior
+        self.children = children
+
+    def __repr__(self):
+        return "ConjugateGroup({}, {}, {})".format(self.latent, self.family, sorted(self.children.keys()))
+
+    def get_init_code(self) -> list:
+        values = {'p_' + p: self.prior[p] for p in self.prior}
+        return self.family.format(self.family.init, self.latent, **values)
+
+    def get_predictive_code(self, child: str, value: str) -> str:
+        return self.family.format([self.family.predictive], self.latent, x=value, **self.children[child])[0]
+
+    def get_update_code(self, child: str, value: str) -> list:
+        return self.family.format(self.family.update, self.latent, x=value, **self.children[child])
+
+    def get_posterior_code(self) -> str:
+        return self.family.format([self.family.posterior], self.latent)[0]
+
+
+def _find_family(prior: str, likelihood: str):
+    for family in conjugate_families:
+        if family.prior == prior and family.likelihood == likelihood:
+            return family
+    return None
+
+
+def find_conjugate_groups(graph, conditional_suffix: str) -> list:
+    """
+    Finds all latent vertices in the graph, which can be marginalized out analytically because all their children
+    are observations with a conjugate likelihood.
+
+    :param graph:               The graph to analyse.
+    :param conditional_suffix:  The suffix the graph has been compiled with.
+    :return:                    A list of `ConjugateGroup`-objects.
+    """
+    children = {}
+    for (u, v) in graph.arcs:
+        children.setdefault(u, set()).add(v)
+
+    if_vars = graph.if_vars
+    result = []
+    for z in graph.sorted_var_list:
+        if z not in graph.sampled_variables or z in if_vars or len(children.get(z, ())) == 0:
+            continue
+        try:
+            prior_name, prior = split_distribution(graph.get_code_for_variable(z))
+        except (NotImplementedError, SyntaxError):
+            continue
+        if any([z in _names(prior[p]) for p in prior]):
+            continue
+
+        group = {}
+        family = None
+        for y in children[z]:
+            if not graph.is_observed_variable(y) or y in graph.observed_conditions:
+                break
+            try:
+                name, params = split_distribution(strip_conditional_suffix(graph.get_code_for_variable(y), conditional_suffix))
+            except (NotImplementedError, SyntaxError):
+                break
+            f = _find_family(prior_name, name)
+            if f is None or (family is not None and f is not family) or f.parameter not in params:
+                break
+            param = params[f.parameter]
+            if not (isinstance(param, py_ast.Name) and param.id == z):
+                break
+            if any([z in _names(params[p]) for p in params if p != f.parameter]) or \
+                    z in _names(parse_expr(graph.observed_values[y])):
+                break
+            family = f
+            group[y] = {p: to_source(params[p]) for p in params if p != f.parameter}
+        else:
+            if family is not None:
+                result.append(ConjugateGroup(z, family, {p: to_source(prior[p]) for p in prior}, group))
+    return result
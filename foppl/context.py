@@ -0,0 +1,83 @@
+#
+# This file is part of PyFOPPL, an implementation of a First Order Probabilistic Programming Language in Python.
+#
+# License: MIT (see LICENSE.txt)
+#
+# 19. Oct 2026
+#
+"""
+Compilation contexts with their own options.
+
+By default, the parser, the compiler and the model generator read the global `Options`. A `CompilationContext`
+carries a copy of the options instead, together with its own parser, and is passed explicitly to `parse`, `compile`
+and `Model_Generator`. Models can thus be compiled with different options at the same time, e.g., on a thread pool:
+    ```python
+    fast = CompilationContext(batch_factors=True, hoist_constants=True)
+    plain = CompilationContext()
+    with ThreadPoolExecutor() as executor:
+        codes = list(executor.map(fast.compile_model, sources)) + list(executor.map(plain.compile_model, sources))
+    ```
+
+A context does not change during compilation, so that one context can be shared by any number of threads, as long as
+its options are not modified while compilations are running. Changes to the global `Options` after the context has
+been created do not affect the context.
+"""
+from .compiler import compile
+from .foppl_parser import Parser, parse
+from .model_generator import Model_Generator
+from . import Options
+
+
+def get_option_names() -> list:
+    """
+    Returns the names of all options (the public attributes of `Options`).
+    """
+    return [key for key in vars(Options) if not key.startswith('_')]
+
+
+class CompilationContext(object):
+    """
+    The options and caches for compiling models.
+
+    :param options:  The options to start with (an object with the attributes of `Options`), by default the current
+                     values of the global `Options`.
+    :param kwargs:   The options to be changed, e.g., `CompilationContext(batch_factors=True)`.
+    """
+
+    def __init__(self, options=None, **kwargs):
+        if options is None:
+            options = Options
+        # An instance of `Options`, so that its attributes shadow the global defaults (lists are copied, so that
+        # appending to `model_imports` or `statistics_hooks` does not change the defaults)
+        self.options = Options()
+        for key in get_option_names():
+            value = getattr(options, key)
+            setattr(self.options, key, list(value) if type(value) is list else value)
+        for key in kwargs:
+            if key.startswith('_') or not hasattr(Options, key):
+                raise TypeError("'{}' is not an option".format(key))
+            setattr(self.options, key, kwargs[key])
+        # The parser does not keep any state between parses and is shared by all compilations with this context
+        self.parser = Parser(self.options)
+
+    def __repr__(self):
+        changed = ["{}={!r}".format(key, getattr(self.options, key)) for key in get_option_names()
+                   if getattr(self.options, key) != getattr(Options, key)]
+        return "CompilationContext({})".format(', '.join(changed))
+
+    def parse(self, source):
+        return parse(source, self)
+
+    def compile(self, source, statistics=None):
+        """
+        Compiles the source with the options of this context and returns the graph and the result expression
+        (see `foppl.compiler.compile`).
+        """
+        return compile(source, statistics, self)
+
+    def compile_model(self, source, name: str = 'model') -> str:
+        """
+        Compiles the source and returns the Python source code of the model.
+        """
+        graph, _ = self.compile(source)
+        return Model_Generator(graph, name, self).generate_class()
@@ -0,0 +1,87 @@
+#
+# This file is part of PyFOPPL, an implementation of a First Order Probabilistic Programming Language in Python.
+#
+# License: MIT (see LICENSE.txt)
+#
+# 19. Oct 2026
+#
+"""
+Precomputed tables for categorical distributions with a literal probability vector.
+
+If the probabilities of a categorical distribution are known at compile time, there is no need to build and
+normalize the distribution on every call. Instead, we compute once:
+
+  - a table of the normalized log-probabilities, so that scoring a value is a simple lookup, and
+  - a Walker alias table (built with Vose's method), so that sampling takes constant time, independent of the
+    number of categories: pick a column `i` uniformly, and return `i` with probability `prob[i]`, or `alias[i]`
+    otherwise.
+"""
+import ast as py_ast
+import math
+from .gradients import split_distribution
+
+
+def log_probability_table(ps: list) -> list:
+    total = math.fsum(ps)
+    return [math.log(p / total) if p > 0 else -math.inf for p in ps]
+
+
+def format_values(values) -> str:
+    """
+    Returns the Python code for a list or tuple of floats, including infinite values.
+    """
+    if type(values) in [list, tuple]:
+        items = ', '.join([format_values(v) for v in values])
+        return "[{}]".format(items) if type(values) is list else "({},)".format(items)
+    elif type(values) is float and math.isinf(values):
+        return "math.inf" if values > 0 else "-math.inf"
+    return repr(values)
+
+
+def alias_table(ps: list):
+    """
+    Builds the Walker alias table for the (not necessarily normalized) probabilities `ps` and returns it as a tuple
+    of two lists `(prob, alias)`.
+    """
+    n = len(ps)
+    total = math.fsum(ps)
+    scaled = [p * n / total for p in ps]
+    prob = [1.0] * n
+    alias = list(range(n))
+    small = [i for i in range(n) if scaled[i] < 1.0]
+    large = [i for i in range(n) if scaled[i] >= 1.0]
+    while len(small) > 0 and len(large) > 0:
+        s = small.pop()
+        l = large.pop()
+        prob[s] = scaled[s]
+        alias[s] = l
+        scaled[l] = (scaled[l] + scaled[s]) - 1.0
+        if scaled[l] < 1.0:
+            small.append(l)
+        else:
+            large.append(l)
+    # Due to rounding, some columns might be left over, which are (almost) full
+    for i in small + large:
+        prob[i] = 1.0
+    return prob, alias
+
+
+def find_constant_categoricals(graph) -> dict:
+    """
+    Returns a dictionary mapping all categorical vertices with a literal, one-dimensional probability vector to
+    the list of their probabilities.
+    """
+    result = {}
+    for v in graph.sorted_var_list:
+        size = graph.distribution_sizes.get(v, None)
+        if size is None or size[0] == 0 or size[1] != 0:
+            continue
+        try:
+            name, params = split_distribution(graph.get_code_for_variable(v))
+            ps = py_ast.literal_eval(params['ps'])
+        except (NotImplementedError, SyntaxError, ValueError, KeyError):
+            continue
+        if name == 'Categorical' and type(ps) is list and len(ps) > 0 and \
+                all([type(p) in [int, float] and p >= 0 for p in ps]) and sum(ps) > 0:
+            result[v] = [float(p) for p in ps]
+    return result
@@ -0,0 +1,157 @@
+#
+# This file is part of PyFOPPL, an implementation of a First Order Probabilistic Programming Language in Python.
+#
+# License: MIT (see LICENSE.txt)
+#
+# 19. Oct 2026
+#
+"""
+Exact marginalization of discrete latent variables with a small, finite support by enumeration.
+
+Each distribution-vertex of the graph contributes one factor `log p(v | parents)` to the log-joint. The 'scope' of a
+factor is the set of enumerated variables it depends on, either directly or through conditions, the observed value
+and other derived vertices. Instead of summing the joint density over all combinations of the enumerated variables
+(which is exponential in their number), the variables are eliminated one at a time: all factors mentioning the
+variable are combined and the variable is summed out (using log-sum-exp), which yields a new factor over the
+remaining variables (variable elimination). The elimination order is chosen greedily so that the intermediate tables
+stay small.
+"""
+import ast as py_ast
+from .gradients import parse_expr, split_distribution, strip_conditional_suffix
+
+
+"""
+The maximal number of entries of any table during variable elimination. If the best elimination order found
+requires larger tables, the marginal density is not generated.
+"""
+max_table_size = 10**5
+
+
+def _names(code: str, conditional_suffix: str) -> set:
+    try:
+        node = parse_expr(strip_conditional_suffix(code, conditional_suffix))
+    except SyntaxError:
+        return set()
+    return {n.id for n in py_ast.walk(node) if isinstance(n, py_ast.Name)}
+
+
+def get_support(graph, name: str):
+    """
+    Returns the list of values a discrete latent variable can take, or `None` if the support is not finite or
+    not known at compile time.
+    """
+    try:
+        dist_name, params = split_distribution(graph.get_code_for_variable(name))
+    except (NotImplementedError, SyntaxError):
+        return None
+    if dist_name == 'Bernoulli':
+        return [0, 1]
+    elif dist_name == 'Categorical':
+        size = graph.distribution_sizes.get(name, None)
+        if size is not None and size[0] > 0 and size[1] == 0:
+            return list(range(size[0]))
+        ps = params.get('ps', None)
+        if isinstance(ps, py_ast.List) and not any([isinstance(e, py_ast.List) for e in ps.elts]):
+            return list(range(len(ps.elts)))
+    return None
+
+
+class EnumerationPlan(object):
+    """
+    The plan for the exact marginalization of the enumerated variables.
+
+    `supports`:  A dictionary mapping each enumerated variable to the list of its values.
+    `scopes`:    A dictionary mapping each vertex to the set of enumerated variables its value depends on (the
+                 enumerated variable itself is not included).
+    `factors`:   A list of tuples `(vertex, scope)` for all distribution-vertices, in the order of `sorted_var_list`.
+    `derived`:   A dictionary mapping each vertex to the set of derived vertices (such as conditions), which depend
+                 on enumerated variables and must be recomputed for every assignment in order to evaluate the vertex.
+    `order`:     The elimination order of the enumerated variables.
+    """
+
+    def __init__(self, supports: dict, scopes: dict, factors: list, derived: dict, order: list):
+        self.supports = supports
+        self.scopes = scopes
+        self.factors = factors
+        self.derived = derived
+        self.order = order
+
+    def __repr__(self):
+        return "EnumerationPlan({}, order={})".format(self.supports, self.order)
+
+
+def elimination_order(scopes: list, supports: dict, ordering: list):
+    """
+    Chooses the elimination order greedily: at each step, the variable which creates the smallest new table is
+    eliminated next (ties are broken by `ordering`). Returns the order together with the size of the largest table.
+
+    :param scopes:    The scopes of all factors as a list of sets.
+    :param supports:  The supports of the variables.
+    :param ordering:  All variables in their preferred order.
+    """
+    scopes = [set(s) for s in scopes if len(s) > 0]
+    remaining = list(ordering)
+    order = []
+    largest = 1
+    while len(remaining) > 0:
+        best = None
+        for var in remaining:
+            scope = set.union(set(), *[s for s in scopes if var in s])
+            size = 1
+            for u in scope:
+                size *= len(supports[u])
+            if best is None or size < best[0]:
+                best = (size, var, scope)
+        size, var, scope = best
+        largest = max(largest, size)
+        remaining.remove(var)
+        order.append(var)
+        scopes = [s for s in scopes if var not in s] + [scope - {var}]
+    return order, largest
+
+
+def plan_enumeration(graph, conditional_suffix: str):
+    """
+    Finds the discrete latent variables of the graph with finite support, and creates a plan for their exact
+    marginalization. Returns `None` if there are no such variables or the tables would get too large.
+
+    The `conditional_suffix` is the one the graph has been compiled with.
+    """
+    supports = {}
+    for v in graph.sorted_var_list:
+        if v in graph.disc_vars and not graph.is_observed_variable(v):
+            support = get_support(graph, v)
+            if support is not None:
+                supports[v] = support
+    if len(supports) == 0:
+        return None
+
+    scopes = {}
+    derived = {}
+    factors = []
+    for v in graph.sorted_var_list:
+        code = graph.get_code_for_variable(v)
+        deps = _names(code, conditional_suffix)
+        if v in graph.observed_conditions:
+            deps.update(_names(graph.observed_conditions[v], conditional_suffix))
+        # The observed value might itself depend on enumerated variables, e.g., `(observe d k)`
+        if graph.is_observed_variable(v):
+            deps.update(_names(str(graph.observed_values[v]), conditional_suffix))
+        scope = set()
+        derived[v] = set()
+        for u in deps:
+            if u in supports:
+                scope.add(u)
+            elif u in scopes and len(scopes[u]) > 0:
+                scope.update(scopes[u])
+                derived[v].update(derived[u].union({u}))
+        if code.startswith('dist.'):
+            factors.append((v, scope.union({v}) if v in supports else scope))
+            scopes[v] = set()
+        else:
+            scopes[v] = scope
+
+    order, largest = elimination_order([s for (_, s) in factors], supports, list(supports.keys()))
+    if largest > max_table_size:
+        return None
+    return EnumerationPlan(supports, scopes, factors, derived, order)
@@ -0,0 +1,162 @@
+#
+# This file is part of PyFOPPL, an implementation of a First Order Probabilistic Programming Language in Python.
+#
+# License: MIT (see LICENSE.txt)
+#
+# 19. Oct 2026
+#
+"""
+Grouping of structurally identical observations into batched factors.
+
+After unrolling loops and `map`s, a model often contains many observed vertices `y` with the same distribution and
+parameter expressions of the same shape, e.g., `dist.Normal(mu=(x20001 * 0.5), sigma=1.0)` and
+`dist.Normal(mu=(x20001 * 1.5), sigma=1.0)`. Instead of scoring each of them with a separate `log_pdf`-call, the
+generator can evaluate one vectorized (numpy) log-density per group over stacked parameters and observations. Where
+the expressions of a group differ only in their literal constants, the constants are collected in an array, which is
+computed once when the model is created.
+
+Only observations that are not inside a conditional branch and on which no other vertex depends are batched.
+"""
+import ast as py_ast
+from .gradients import parse_expr, split_distribution, to_source, _binary_symbols
+
+
+"""
+Vectorized log-densities of the supported distributions. The observations are given as `{x}` and the parameters
+by their names. The result is an array with one log-density per observation.
+"""
+vectorized_log_densities = {
+    'Bernoulli':   "np.where({x}, np.log({ps}), np.log(1.0 - {ps}))",
+    'Cauchy':      "-np.log(np.pi * {gamma} * (1.0 + (({x} - {mu}) / {gamma}) ** 2))",
+    'Exponential': "np.where({x} >= 0, np.log({lam}) - {lam} * {x}, -np.inf)",
+    'LogNormal':   "-0.5 * ((np.log({x}) - {mu}) / {sigma}) ** 2 - np.log({sigma} * {x}) - 0.9189385332046727",
+    'Normal':      "-0.5 * (({x} - {mu}) / {sigma}) ** 2 - np.log({sigma}) - 0.9189385332046727",
+}
+
+_vectorized_functions = {'exp', 'log', 'sqrt'}
+
+
+def _number(node):
+    """
+    Returns the value of a numeric literal (including negative numbers), or `None`.
+    """
+    if isinstance(node, py_ast.UnaryOp) and isinstance(node.op, (py_ast.USub, py_ast.UAdd)):
+        value = _number(node.operand)
+        if value is not None and isinstance(node.op, py_ast.USub):
+            return -value
+        return value
+    elif isinstance(node, py_ast.Constant) and type(node.value) in [int, float, bool]:
+        return node.value
+    return None
+
+
+def _shape(node):
+    """
+    Returns a hashable description of the 'shape' of an expression, where all leaves (names and constants) are
+    replaced by a placeholder. Expressions of the same shape can be vectorized leaf by leaf.
+    """
+    if _number(node) is not None:
+        return '#'
+    elif isinstance(node, py_ast.BinOp):
+        return type(node.op).__name__, _shape(node.left), _shape(node.right)
+    elif isinstance(node, py_ast.UnaryOp) and isinstance(node.op, (py_ast.USub, py_ast.UAdd)):
+        return type(node.op).__name__, _shape(node.operand)
+    elif isinstance(node, py_ast.Call) and isinstance(node.func, py_ast.Attribute) and \
+            isinstance(node.func.value, py_ast.Name) and node.func.value.id == 'math' and \
+            node.func.attr in _vectorized_functions and len(node.args) == 1 and len(node.keywords) == 0:
+        return node.func.attr, _shape(node.args[0])
+    else:
+        return '#'
+
+
+class FactorBatch(object):
+    """
+    A group of observed vertices with the same distribution and parameter shapes.
+
+    `vertices`:    The names of the observed vertices in the batch.
+    `code`:        The Python expression for the sum of the log-densities of the batch.
+    `constants`:   A list of tuples `(name, code)` for the arrays, which need to be computed only once.
+    """
+
+    def __init__(self, index: int, dist_name: str, vertices: list):
+        self.index = index
+        self.dist_name = dist_name
+        self.vertices = vertices
+        self.constants = []
+        self.code = None
+
+    def __repr__(self):
+        return "FactorBatch({}, {})".format(self.dist_name, self.vertices)
+
+    def _new_constant(self, values: list):
+        name = "_batch{}_c{}".format(self.index, len(self.constants))
+        self.constants.append((name, "np.array({})".format(repr(values))))
+        return name
+
+    def _vectorize(self, nodes: list):
+        sources = [to_source(node) for node in nodes]
+        if all([s == sources[0] for s in sources]):
+            return sources[0]
+        node = nodes[0]
+        shape = _shape(node)
+        if shape != '#' and all([_shape(n) == shape for n in nodes[1:]]):
+            if isinstance(node, py_ast.BinOp):
+                return "({} {} {})".format(self._vectorize([n.left for n in nodes]),
+                                           _binary_symbols[type(node.op)],
+                                           self._vectorize([n.right for n in nodes]))
+            elif isinstance(node, py_ast.UnaryOp):
+                return "({}{})".format('-' if isinstance(node.op, py_ast.USub) else '+',
+                                       self._vectorize([n.operand for n in nodes]))
+            elif isinstance(node, py_ast.Call):
+                return "np.{}({})".format(node.func.attr, self._vectorize([n.args[0] for n in nodes]))
+        numbers = [_number(n) for n in nodes]
+        if all([n is not None for n in numbers]):
+            return self._new_constant(numbers)
+        return "np.array([{}])".format(', '.join(sources))
+
+    def build(self, params: list, values: list):
+        """
+        Creates the code for the batch from the parameters (a list of dictionaries with AST-nodes) and the
+        observed values (a list of AST-nodes) of all vertices in the batch.
+        """
+        args = {'x': self._vectorize(values)}
+        for p in params[0]:
+            args[p] = self._vectorize([param[p] for param in params])
+        self.code = "np.sum({})".format(vectorized_log_densities[self.dist_name].format(**args))
+        return self
+
+
+def batch_observed_factors(graph, min_size: int = 2, exclude=()) -> list:
+    """
+    Groups the observed vertices of the graph into batches of structurally identical factors.
+
+    :param graph:     The graph with the observed vertices.
+    :param min_size:  The minimal number of vertices in a batch.
+    :param exclude:   Observed vertices, which must not be batched (e.g., because they are scored otherwise).
+    :return:          A list of `FactorBatch`-objects.
+    """
+    parents = {u for (u, _) in graph.arcs}
+    groups = {}
+    for v in graph.sorted_var_list:
+        if not graph.is_observed_variable(v) or v in parents or v in graph.observed_conditions or v in exclude:
+            continue
+        try:
+            dist_name, params = split_distribution(graph.get_code_for_variable(v))
+            value = parse_expr(graph.observed_values[v])
+        except (NotImplementedError, SyntaxError):
+            continue
+        if dist_name not in vectorized_log_densities or isinstance(value, (py_ast.List, py_ast.Tuple)):
+            continue
+        key = (dist_name, tuple(sorted([(p, _shape(params[p])) for p in params])))
+        if key in groups:
+            groups[key].append((v, params, value))
+        else:
+            groups[key] = [(v, params, value)]
+
+    result = []
+    for key in groups:
+        members = groups[key]
+        if len(members) >= min_size:
+            batch = FactorBatch(len(result), key[0], [m[0] for m in members])
+            result.append(batch.build([m[1] for m in members], [m[2] for m in members]))
+    return result
@@ -6,6 +6,7 @@
 # 21. Dec 2017, Tobias Kohn
 # 17. Jan 2018, Tobias Kohn
 #
+from types import GeneratorType
 from .graphs import *
 from .foppl_objects import Symbol
 
@@ -19,39 +20,159 @@ def _has_second_argument(f):
         return False
 
 
+def trampoline(generator, expand, finish=None):
+    """
+    Runs a generator, which stands for a recursive computation, with an explicit stack instead of recursion.
+
+    Each item the generator yields is passed to `expand`. If the result of `expand` is a generator again, it is
+    pushed onto the stack and run first, before its return value is sent back to the yielding generator. Otherwise,
+    the result of `expand` is sent back directly. Exceptions are thrown into the yielding generator, so that
+    `try`-`finally` works as with plain recursion.
+
+    If present, `finish(item, value)` is called with each item whose generator has returned the value, and its
+    result is sent back instead of the value.
+    """
+    stack = [generator]
+    items = [None]
+    value = None
+    error = None
+    while True:
+        try:
+            if error is None:
+                item = stack[-1].send(value)
+            else:
+                item = stack[-1].throw(error)
+                error = None
+        except StopIteration as e:
+            stack.pop()
+            item = items.pop()
+            if len(stack) == 0:
+                return e.value
+            value = e.value
+            error = None
+            if finish is not None:
+                try:
+                    value = finish(item, value)
+                except BaseException as e:
+                    error = e
+            continue
+        except BaseException as e:
+            stack.pop()
+            items.pop()
+            if len(stack) == 0:
+                raise
+            error = e
+            continue
+        try:
+            value = expand(item)
+        except BaseException as e:
+            error = e
+            continue
+        if type(value) is GeneratorType:
+            stack.append(value)
+            items.append(item)
+            value = None
+
+
+# The handlers are resolved once for each pair of walker class and node class (or method name, respectively) and
+# then cached. A handler is a function `handler(walker, node)`.
+#
+# A handler (i.e. a `visit_*`-method) might be a generator: instead of calling `child.walk(self)` it then yields
+# `child` and receives the result of walking it. `Node.walk` runs such generators with an explicit stack, so that the
+# depth of the AST is not limited by Python's recursion limit.
+_dispatch_cache = {}
+_method_cache = {}
+
+
+def _find_method(walker_class, method_name: str):
+    key = (walker_class, method_name)
+    try:
+        return _method_cache[key]
+    except KeyError:
+        result = _method_cache[key] = getattr(walker_class, method_name, None)
+        return result
+
+
+def _get_handler(walker_class, node_class):
+    name = node_class.__name__.lower()
+    if name.startswith('ast'):
+        name = name[3:]
+    if name.endswith('_Node'):
+        name = name[:-5]
+    enter_method = getattr(walker_class, 'enter_' + name, None)
+    leave_method = getattr(walker_class, 'leave_' + name, None)
+    if enter_method is not None and leave_method is not None:
+        has_results = _has_second_argument(leave_method)
+
+        def walk_children(walker, node, children):
+            results = []
+            for child in children:
+                results.append((yield child))
+            if has_results:
+                return leave_method(walker, node, results)
+            else:
+                return leave_method(walker, node)
+
+        def handler(walker, node):
+            enter_method(walker, node)
+            children = node.get_children()
+            if len(children) > 0:
+                return walk_children(walker, node, children)
+            elif has_results:
+                return leave_method(walker, node, [])
+            else:
+                return leave_method(walker, node)
+        return handler
+
+    visit_method = getattr(walker_class, 'visit_' + name, None)
+    if visit_method is not None:
+        return visit_method
+
+    def walk_children(result, children):
+        for child in children:
+            yield child
+        return result
+
+    def handler(walker, node):
+        result = walker.visit_node(node)
+        children = [c for c in node.get_children() if isinstance(c, Node)]
+        if len(children) > 0:
+            return walk_children(result, children)
+        return result
+    return handler
+
+
 class Node(object):
+    """
+    The nodes use `__slots__` to keep the AST small. The optional attributes `id`, `tag` and `span` are `None`
+    unless set. The span is the tuple `(first_line, last_line)` of the node's position in the source.
+    """
+
+    __slots__ = ['id', 'tag', 'span']
 
-    id = None
-    tag = None
+    def __getattr__(self, name):
+        # Only called if the attribute is missing, i.e. for unset slots
+        if name in ['id', 'tag', 'span']:
+            return None
+        raise AttributeError("'{}' object has no attribute '{}'".format(self.__class__.__name__, name))
 
     def get_children(self):
         return []
 
-    def walk(self, walker):
-        name = self.__class__.__name__.lower()
-        if name.startswith('ast'):
-            name = name[3:]
-        if name.endswith('_Node'):
-            name = name[:-5]
-        if hasattr(walker, 'enter_' + name) and hasattr(walker, 'leave_' + name):
-            enter_method = getattr(walker, 'enter_' + name)
-            leave_method = getattr(walker, 'leave_' + name)
-            enter_method(self)
-            results = [child.walk(walker) for child in self.get_children()]
-            if _has_second_argument(leave_method):
-                return leave_method(self, results)
-            else:
-                return leave_method(self)
-        elif hasattr(walker, 'visit_' + name):
-            visit_method = getattr(walker, 'visit_' + name)
-            return visit_method(self)
-        else:
-            result = walker.visit_node(self)
-            for c in self.get_children():
-                if isinstance(c, Node):
-                    c.walk(walker)
+    def get_handler(self, walker):
+        key = (walker.__class__, self.__class__)
+        try:
+            return _dispatch_cache[key]
+        except KeyError:
+            result = _dispatch_cache[key] = _get_handler(walker.__class__, self.__class__)
             return result
 
+    def walk(self, walker):
+        result = self.get_handler(walker)(walker, self)
+        if type(result) is GeneratorType:
+            return walker.run(result)
+        return result
+
 
 class Walker(object):
 
@@ -67,10 +188,22 @@ class Walker(object):
     def walk_all(self, items: list):
         return [item.walk(self) for item in items]
 
+    def run(self, generator):
+        """
+        Runs a generator, which yields the nodes to be walked by this walker, and returns its result (cf. the
+        generator-based `visit_*`-methods).
+        """
+        return trampoline(generator, lambda node: node.get_handler(self)(self, node))
+
 ###################################################################################################
 
+_left_associative = ['+', '-', '*', '/', 'and', 'or']
+
+
 class AstBinary(Node):
 
+    __slots__ = ['op', 'left', 'right']
+
     def __init__(self, op: str, left: Node, right: Node):
         if isinstance(op, Symbol):
             op = op.name
@@ -81,12 +214,29 @@ class AstBinary(Node):
     def get_children(self):
         return [self.left, self.right]
 
+    def get_operands(self):
+        """
+        Returns the operands of a chain of left-associative operations with the same operator, i.e. `[a, b, c]` for
+        `((a + b) + c)`, so that long sums or products can be processed without descending into each level.
+        """
+        result = [self.right]
+        left = self.left
+        if self.op in _left_associative:
+            while type(left) is AstBinary and left.op == self.op:
+                result.append(left.right)
+                left = left.left
+        result.append(left)
+        result.reverse()
+        return result
+
     def __repr__(self):
         return "({} {} {})".format(repr(self.left), self.op, repr(self.right))
 
 
 class AstBody(Node):
 
+    __slots__ = ['body']
+
     def __init__(self, body):
         self.body = body
 
@@ -99,6 +249,8 @@ class AstBody(Node):
 
 class AstCompare(Node):
 
+    __slots__ = ['op', 'left', 'right']
+
     def __init__(self, op: str, left: Node, right: Node):
         if isinstance(op, Symbol):
             op = op.name
@@ -115,6 +267,8 @@ class AstCompare(Node):
 
 class AstDef(Node):
 
+    __slots__ = ['name', 'value']
+
     def __init__(self, name, value):
         self.name = name
         self.value = value
@@ -128,9 +282,12 @@ class AstDef(Node):
 
 class AstDistribution(Node):
 
+    __slots__ = ['name', 'args', 'is_continuous', 'is_discrete', 'size']
+
     def __init__(self, name: str, args):
         self.name = name
         self.args = args
+        self.size = None
         self.is_continuous = name.lower() in continuous_distributions
         self.is_discrete = name.lower() in discrete_distributions
         if self.is_continuous or self.is_discrete and name[0].islower():
@@ -139,12 +296,11 @@ class AstDistribution(Node):
     def get_children(self):
         return self.args
 
-    def walk(self, walker):
-        name = self.name.lower()
-        method_name = "visit_distribution_" + name
-        if hasattr(walker, method_name):
-            return getattr(walker, method_name)(self)
-        return super(AstDistribution, self).walk(walker)
+    def get_handler(self, walker):
+        method = _find_method(walker.__class__, "visit_distribution_" + self.name.lower())
+        if method is not None:
+            return method
+        return super(AstDistribution, self).get_handler(walker)
 
     def __repr__(self):
         return "dist.{}({})".format(self.name, ', '.join([repr(arg) for arg in self.args]))
@@ -156,6 +312,8 @@ class AstExpr(Node):
     compiled expression and its associated graph.
     """
 
+    __slots__ = ['graph', 'expr']
+
     def __init__(self, graph: Graph, expr: str):
         self.graph = graph
         self.expr = expr
@@ -170,6 +328,8 @@ class AstExpr(Node):
 
 class AstFor(Node):
 
+    __slots__ = ['target', 'sequence', 'body']
+
     def __init__(self, target, sequence, body: Node):
         self.target = target
         self.sequence = sequence
@@ -181,6 +341,8 @@ class AstFor(Node):
 
 class AstFunction(Node):
 
+    __slots__ = ['name', 'params', 'body']
+
     def __init__(self, name, params, body: Node):
         self.name = name
         self.params = params
@@ -192,6 +354,8 @@ class AstFunction(Node):
 
 class AstFunctionCall(Node):
 
+    __slots__ = ['function', 'args']
+
     def __init__(self, function, args):
         if isinstance(function, Symbol):
             function = function.name
@@ -201,13 +365,13 @@ class AstFunctionCall(Node):
     def get_children(self):
         return self.args
 
-    def walk(self, walker):
+    def get_handler(self, walker):
         name = self.function
         if type(name) is str:
-            method_name = "visit_call_" + name
-            if hasattr(walker, method_name):
-                return getattr(walker, method_name)(self)
-        return super(AstFunctionCall, self).walk(walker)
+            method = _find_method(walker.__class__, "visit_call_" + name)
+            if method is not None:
+                return method
+        return super(AstFunctionCall, self).get_handler(walker)
 
     def __repr__(self):
         return "{}({})".format(self.function, ', '.join([repr(arg) for arg in self.args]))
@@ -215,6 +379,8 @@ class AstFunctionCall(Node):
 
 class AstIf(Node):
 
+    __slots__ = ['cond', 'if_body', 'else_body']
+
     def __init__(self, cond: AstCompare, if_body, else_body):
         self.cond = cond
         self.if_body = if_body
@@ -232,6 +398,8 @@ class AstIf(Node):
 
 class AstLet(Node):
 
+    __slots__ = ['bindings', 'body']
+
     def __init__(self, bindings, body):
         self.bindings = bindings
         self.body = body
@@ -245,6 +413,8 @@ class AstLet(Node):
 
 class AstLoop(Node):
 
+    __slots__ = ['iter_count', 'arg', 'function', 'args']
+
     def __init__(self, iter_count: int, arg: Node, function: Node, args: list):
         self.iter_count = iter_count
         self.arg = arg
@@ -260,6 +430,8 @@ class AstLoop(Node):
 
 class AstObserve(Node):
 
+    __slots__ = ['distribution', 'value']
+
     def __init__(self, distribution: AstDistribution, value):
         self.distribution = distribution
         self.value = value
@@ -270,6 +442,8 @@ class AstObserve(Node):
 
 class AstSample(Node):
 
+    __slots__ = ['distribution']
+
     def __init__(self, distribution: AstDistribution):
         self.distribution = distribution
 
@@ -279,6 +453,8 @@ class AstSample(Node):
 
 class AstSqrt(Node):
 
+    __slots__ = ['item']
+
     def __init__(self, item: Node):
         self.item = item
 
@@ -288,6 +464,8 @@ class AstSqrt(Node):
 
 class AstSymbol(Node):
 
+    __slots__ = ['name']
+
     def __init__(self, name: str):
         self.name = name
 
@@ -297,6 +475,8 @@ class AstSymbol(Node):
 
 class AstUnary(Node):
 
+    __slots__ = ['op', 'item']
+
     def __init__(self, op: str, item: Node):
         if isinstance(op, Symbol):
             op = op.name
@@ -312,6 +492,8 @@ class AstUnary(Node):
 
 class AstValue(Node):
 
+    __slots__ = ['value']
+
     def __init__(self, value):
         self.value = value
 
@@ -321,6 +503,8 @@ class AstValue(Node):
 
 class AstVector(Node):
 
+    __slots__ = ['items']
+
     def __init__(self, items):
         self.items = items
 
@@ -6,41 +6,83 @@
 # 29. Nov 2017, Tobias Kohn
 # 03. Jan 2018, Tobias Kohn
 #
+from itertools import islice
+
+
 class Sequence(object):
+    """
+    A sequence is a view on the part `items[start:stop]` of a list. Slicing a sequence (e.g., `form.tail`) returns
+    a new view on the same list instead of copying the elements. The list must therefore not be modified once a
+    sequence has been created for it.
+
+    The reader sets the `span` of a sequence to the tuple `(first_line, last_line)` of its position in the source.
+    """
+
+    __slots__ = ['_items', '_start', '_stop', 'span']
+
+    def __init__(self, data):
+        self._items = data
+        self._start = 0
+        self._stop = len(data)
+        self.span = None
+
+    @classmethod
+    def _view(cls, items, start, stop):
+        result = cls.__new__(cls)
+        result._items = items
+        result._start = start
+        result._stop = stop
+        result.span = None
+        return result
 
     def __repr__(self):
         return repr(self.data)
 
     def __getitem__(self, item):
-        return self.data[item]
+        if type(item) is int:
+            length = self._stop - self._start
+            if -length <= item < length:
+                return self._items[self._start + item if item >= 0 else self._stop + item]
+            raise IndexError("sequence index out of range")
+        r = range(self._start, self._stop)[item]
+        if r.step == 1:
+            return self._view(self._items, r.start, max(r.start, r.stop))
+        return self.__class__([self._items[i] for i in r])
 
     def __iter__(self):
-        return iter(self.data)
+        if self._start == 0 and self._stop == len(self._items):
+            return iter(self._items)
+        return islice(self._items, self._start, self._stop)
 
     def __len__(self):
-        return len(self.data)
+        return self._stop - self._start
+
+    @property
+    def data(self):
+        if self._start == 0 and self._stop == len(self._items):
+            return self._items
+        return self._items[self._start:self._stop]
 
     @property
     def head(self):
-        return self.data[0]
+        if self._start < self._stop:
+            return self._items[self._start]
+        raise IndexError("head of empty sequence")
 
     @property
     def tail(self):
-        return self.data[1:]
+        return self[1:]
 
 
 class Form(Sequence):
 
-    def __init__(self, data):
-        self.data = data
+    __slots__ = []
 
-    def __getitem__(self, item):
-        if isinstance(item, slice):
-            return Form(self.data[item])
-        else:
-            return self.data[item]
 
 class Value(object):
+
+    __slots__ = ['value']
+
     def __init__(self, value):
         self.value = value
 
@@ -56,54 +98,45 @@ class Value(object):
 
 class Vector(Sequence):
 
-    def __init__(self, data):
-        self.data = data
+    __slots__ = []
 
     def __repr__(self):
-        return "[{}]".format(', '.join([repr(item) for item in self.data]))
+        return "[{}]".format(', '.join([repr(item) for item in self]))
 
 
 class Symbol(object):
+    """
+    Symbols are interned: there is exactly one instance for each name, so that creating a symbol that already
+    exists is a single dictionary lookup.
+    """
+
+    __slots__ = ['name', '_hash']
 
     _symbols = {}
 
-    def __new__(cls, name, *args, **kwargs):
-        if name in Symbol._symbols.keys():
-            return Symbol._symbols[name]
+    def __new__(cls, name):
+        result = Symbol._symbols.get(name, None)
+        if result is not None:
+            return result
         if type(name) is Symbol:
             return name
-        return super(Symbol, cls).__new__(cls)
-
-    def __init__(self, name: str):
         assert(type(name) is str)
-        self.name = name
-        if name not in Symbol._symbols.keys():
-            Symbol._symbols[name] = self
-
-        # These special forms here are actually defined below but IDEs are happier if we define
-        # some form here.
-        self.DEF = "def"
-        self.DEREF = "deref"
-        self.IF = "if"
-        self.DO = "do"
-        self.LET = "let"
-        self.QUOTE = "quote"
-        self.VAR = "var"
-        self.FN = "fn"
-        self.LOOP = "loop"
-        self.RECUR = "recur"
-        self.THROW = "throw"
-        self.TRY = "try"
-        self.MONITOR_ENTER = "monitor-enter"
-        self.MONITOR_EXIT = "monitor-exit"
-        self.VAR = "var"
-        self.VECTOR = "vector"
+        result = super(Symbol, cls).__new__(cls)
+        result.name = name
+        result._hash = hash(("$SYMBOL", name))
+        # If another thread has interned the same name in the meantime, we use that instance instead
+        return Symbol._symbols.setdefault(name, result)
+
+    def __reduce__(self):
+        # Unpickling and copying go through `__new__` and thus return the interned symbol. The hash must not be
+        # pickled: string hashes differ between processes, and the interned symbol keeps the hash of this process.
+        return Symbol, (self.name,)
 
     def __repr__(self):
         return self.name
 
     def __hash__(self):
-        return hash(("$SYMBOL", self.name))
+        return self._hash
 
     def __eq__(self, other):
         if isinstance(other, Symbol):
@@ -6,6 +6,7 @@
 # 21. Dec 2017, Tobias Kohn
 # 17. Jan 2018, Tobias Kohn
 #
+from types import GeneratorType
 from .foppl_ast import *
 from .foppl_reader import *
 from .foppl_distributions import distribution_map
@@ -18,6 +19,12 @@ def _register(name):
     return _name_
 
 
+_unary_ops = [Symbol.PLUS, Symbol.MINUS]
+
+# The index of the item returned by `first`, `second` and `last`, respectively
+_item_index = {'first': 0, 'second': 1, 'last': -1}
+
+
 def get_name(obj):
     if isinstance(obj, Symbol):
         return obj.name
@@ -27,9 +34,33 @@ def get_name(obj):
 
 
 class ExprParser(object):
+    """
+    Parses all forms that are not special forms (such as `let` or `if`): operators, distributions and function calls.
+
+    The forms are dispatched through the table `handlers`, which maps the symbol in the head of the form to the
+    method parsing it. All other symbols denote function calls.
+    """
 
     def __init__(self):
         self.parent = None
+        self.handlers = {}
+        for op in [Symbol.PLUS, Symbol.MINUS, Symbol.MULTIPLY, Symbol.DIVIDE, Symbol.AND, Symbol.OR, Symbol.XOR]:
+            self.handlers[op] = self.parse_arithmetic
+        for op in [Symbol.EQ, Symbol.LT, Symbol.LE, Symbol.GT, Symbol.GE]:
+            self.handlers[op] = self.parse_compare
+        for name in distribution_map:
+            self.handlers[Symbol(name)] = self.parse_distribution
+        for name in _item_index:
+            self.handlers[Symbol(name)] = self.parse_item
+        self.handlers[Symbol.NOT] = self.parse_not
+        self.handlers[Symbol.VECTOR] = self.parse_vector
+        self.handlers[Symbol('sample')] = self.parse_sample
+        self.handlers[Symbol('observe')] = self.parse_observe
+        self.handlers[Symbol('nth')] = self.parse_nth
+        self.handlers[Symbol('apply')] = self.parse_apply
+        # We need special treatment for the normal-distribution as in FOPPL, we provide sigma-squared as second
+        # parameter instead of sigma itself.
+        self.handlers[Symbol('normal')] = self.parse_normal
 
     def _parse(self, form):
         return self.parent.parse(form)
@@ -40,98 +71,116 @@ class ExprParser(object):
     def end_scope(self):
         return self.parent.end_scope()
 
+    def _parse_args(self, form: Form):
+        args = []
+        for arg in form.tail:
+            args.append((yield arg))
+        return args
+
     def parse(self, form: Form):
         f = form.head
+        if type(f) is Symbol:
+            return self.handlers.get(f, self.parse_call)(form)
 
-        if f in [Symbol.PLUS, Symbol.MINUS, Symbol.NOT] and len(form) == 2:
-            return AstUnary(f, self._parse(form[1]))
-
-        elif f in [Symbol.PLUS, Symbol.MINUS, Symbol.MULTIPLY, Symbol.DIVIDE, Symbol.AND, Symbol.OR, Symbol.XOR]:
-            items = [self._parse(item) for item in form.tail]
-            result = items[0]
-            for item in items[1:]:
-                result = AstBinary(f, result, item)
-            return result
-
-        elif f in [Symbol.EQ, Symbol.LT, Symbol.LE, Symbol.GT, Symbol.GE]:
-            if len(form) != 3:
-                raise SyntaxError("Too many or too few arguments for comparison '{}'".format(repr(f)))
-            left = self._parse(form[1])
-            right = self._parse(form[2])
-
-            if Options.uniform_conditionals:
-                # We convert all comparisons (except for equality) to the pattern `X >= 0`
-                if f == Symbol.LE:
-                    f = Symbol.GE
-                    left, right = right, left
+        elif type(f) is Form and len(form) == 1:
+            return self.parse_nested(form)
 
-                elif f in [Symbol.GT, Symbol.LT]:
-                    if f == Symbol.GT:
-                        left, right = right, left
-                    if not (isinstance(right, AstValue) and right.value == 0):
-                        left = AstBinary('-', left, right)
-                        right = AstValue(0)
-                    return AstUnary('not', AstCompare(Symbol.GE, left, right))
-
-            if not (isinstance(right, AstValue) and right.value == 0):
-                left = AstBinary('-', left, right)
-                right = AstValue(0)
-            return AstCompare(f, left, right)
-
-        elif isinstance(f, Symbol):
-            args = [self._parse(arg) for arg in form.tail]
-            if f.name == "sample":
-                if len(args) != 1:
-                    raise SyntaxError("'sample' requires exactly one argument")
-                return AstSample(args[0])
-
-            elif f.name == "observe":
-                if len(args) != 2:
-                    raise SyntaxError("'observe' requires exactly two arguments")
-                return AstObserve(args[0], args[1])
-
-            elif f.name == "vector":
-                return self._parse(Vector(form.data[1:]))
-
-            elif f.name in ["first", "second", "last"]:
-                if len(args) == 1:
-                    if f.name == "first":
-                        args.append(AstValue(0))
-                    elif f.name == "second":
-                        args.append(AstValue(1))
-                    elif f.name == "last":
-                        args.append(AstValue(-1))
-                    return AstFunctionCall("get", args)
-                else:
-                    raise SyntaxError("'{}' expects exactly one argument".format(f.name))
+        elif type(f) is Form:
+            raise SyntaxError("There might be too many parentheses here: '{}'".format(form))
 
-            elif f.name == "nth":
-                return AstFunctionCall("get", args)
+        else:
+            raise NotImplementedError(form)
 
-            elif f.name == "apply":
-                return AstFunctionCall(self._parse(form[1]), self._parse(form[2:]))
+    def parse_nested(self, form: Form):
+        return (yield form.head)
 
-            # We need special treatment for the normal-distribution as in FOPPL, we provide sigma-squared as second
-            # parameter instead of sigma itself.
-            elif f.name == "normal":
-                if len(args) >= 2:
-                    args[1] = AstSqrt(args[1])
-                return AstDistribution(distribution_map[f.name], args)
+    def parse_arithmetic(self, form: Form):
+        f = form.head
+        if len(form) == 2 and f in _unary_ops:
+            return AstUnary(f, (yield form[1]))
+        items = yield from self._parse_args(form)
+        result = items[0]
+        for item in items[1:]:
+            result = AstBinary(f, result, item)
+        return result
+
+    def parse_not(self, form: Form):
+        if len(form) == 2:
+            return AstUnary(Symbol.NOT, (yield form[1]))
+        return (yield from self.parse_call(form))
+
+    def parse_compare(self, form: Form):
+        f = form.head
+        if len(form) != 3:
+            raise SyntaxError("Too many or too few arguments for comparison '{}'".format(repr(f)))
+        left = yield form[1]
+        right = yield form[2]
+
+        if self.parent.options.uniform_conditionals:
+            # We convert all comparisons (except for equality) to the pattern `X >= 0`
+            if f == Symbol.LE:
+                f = Symbol.GE
+                left, right = right, left
+
+            elif f in [Symbol.GT, Symbol.LT]:
+                if f == Symbol.GT:
+                    left, right = right, left
+                if not (isinstance(right, AstValue) and right.value == 0):
+                    left = AstBinary('-', left, right)
+                    right = AstValue(0)
+                compare = AstCompare(Symbol.GE, left, right)
+                compare.span = form.span
+                return AstUnary('not', compare)
+
+        if not (isinstance(right, AstValue) and right.value == 0):
+            left = AstBinary('-', left, right)
+            right = AstValue(0)
+        return AstCompare(f, left, right)
+
+    def parse_sample(self, form: Form):
+        args = yield from self._parse_args(form)
+        if len(args) != 1:
+            raise SyntaxError("'sample' requires exactly one argument")
+        return AstSample(args[0])
+
+    def parse_observe(self, form: Form):
+        args = yield from self._parse_args(form)
+        if len(args) != 2:
+            raise SyntaxError("'observe' requires exactly two arguments")
+        return AstObserve(args[0], args[1])
+
+    def parse_vector(self, form: Form):
+        return (yield Vector(form.data[1:]))
+
+    def parse_item(self, form: Form):
+        args = yield from self._parse_args(form)
+        if len(args) == 1:
+            args.append(AstValue(_item_index[form.head.name]))
+            return AstFunctionCall("get", args)
+        else:
+            raise SyntaxError("'{}' expects exactly one argument".format(form.head.name))
 
-            elif f.name in distribution_map:
-                return AstDistribution(distribution_map[f.name], args)
+    def parse_nth(self, form: Form):
+        args = yield from self._parse_args(form)
+        return AstFunctionCall("get", args)
 
-            else:
-                return AstFunctionCall(f.name, args)
+    def parse_apply(self, form: Form):
+        function = yield form[1]
+        return AstFunctionCall(function, (yield form[2:]))
 
-        if type(f) is Form and len(form) == 1:
-            return self._parse(f)
+    def parse_normal(self, form: Form):
+        args = yield from self._parse_args(form)
+        if len(args) >= 2:
+            args[1] = AstSqrt(args[1])
+        return AstDistribution(distribution_map[form.head.name], args)
 
-        elif type(f) is Form:
-            raise SyntaxError("There might be too many parentheses here: '{}'".format(form))
+    def parse_distribution(self, form: Form):
+        args = yield from self._parse_args(form)
+        return AstDistribution(distribution_map[form.head.name], args)
 
-        else:
-            raise NotImplementedError(form)
+    def parse_call(self, form: Form):
+        args = yield from self._parse_args(form)
+        return AstFunctionCall(form.head.name, args)
 
     def resolve_symbol(self, symbol):
         return None
@@ -143,7 +192,10 @@ class FunctionParser(ExprParser):
         return params # [get_name(obj) for obj in params]
 
     def _parse_body(self, params, body):
-        body = [self._parse(item) for item in body]
+        items = []
+        for item in body:
+            items.append((yield item))
+        body = items
         if len(body) == 1:
             body = body[0]
         else:
@@ -152,7 +204,7 @@ class FunctionParser(ExprParser):
 
     def _parse_function(self, name, params, body):
         params = self._parse_params(params)
-        body = self._parse_body(params, body)
+        body = yield from self._parse_body(params, body)
         return AstFunction(name, params, body)
 
 
@@ -165,7 +217,7 @@ class Parser(object):
             if len(form) != 3 or type(form[1]) is not Symbol:
                 raise SyntaxError('def requires a name and a value')
             name = str(form[1])
-            source = self._parse(form[2])
+            source = yield form[2]
             return AstDef(name, source)
 
     @_register(Symbol.DEFN)
@@ -173,21 +225,23 @@ class Parser(object):
 
         def parse(self, form: Form):
             name = str(form[1])
-            function = self._parse_function(name, form[2], form[3:])
+            function = yield from self._parse_function(name, form[2], form[3:])
             return AstDef(name, function)
 
     @_register(Symbol.DO)
     class DoExpr(ExprParser):
 
         def parse(self, form: Form):
-            items = [self._parse(f) for f in form.tail]
+            items = []
+            for f in form.tail:
+                items.append((yield f))
             return AstBody(items)
 
     @_register(Symbol.FN)
     class FnExpr(FunctionParser):
 
         def parse(self, form: Form):
-            return self._parse_function('<lambda>', form[1], form[2:])
+            return (yield from self._parse_function('<lambda>', form[1], form[2:]))
 
     @_register(Symbol.FOR)
     class ForExpr(FunctionParser):
@@ -199,10 +253,10 @@ class Parser(object):
     class IfExpr(ExprParser):
 
         def parse(self, form: Form):
-            cond = self._parse(form[1])
-            if_body = self._parse(form[2])
+            cond = yield form[1]
+            if_body = yield form[2]
             if len(form) == 4:
-                else_body = self._parse(form[3])
+                else_body = yield form[3]
             else:
                 else_body = None
             return AstIf(cond, if_body, else_body)
@@ -211,11 +265,11 @@ class Parser(object):
     class IfNotExpr(ExprParser):
 
         def parse(self, form: Form):
-            cond = self._parse(form[1])
-            if_body = self._parse(form[2])
+            cond = yield form[1]
+            if_body = yield form[2]
             if len(form) == 4:
                 else_body = if_body
-                if_body = self._parse(form[3])
+                if_body = yield form[3]
             else:
                 else_body = None
                 cond = AstUnary(Symbol.NOT, cond)
@@ -238,20 +292,22 @@ class Parser(object):
                     overall_name = '_'.join(part_names)
                     overall_name = "__" + overall_name
                     names.append(overall_name)
-                    assignments.append((overall_name, self._parse(source)))
+                    assignments.append((overall_name, (yield source)))
                     overall_name = AstSymbol(overall_name)
                     for j in range(len(part_names)):
                         names.append(part_names[j])
                         assignments.append((part_names[j], AstFunctionCall('get', [overall_name, AstValue(j)])))
                 else:
                     names.append(get_name(name))
-                    assignments.append((name, self._parse(source)))
+                    assignments.append((name, (yield source)))
                 i += 2
             return names, assignments
 
         def parse(self, form: Form):
-            _, assignments = self._parse_bindings(form[1])
-            items = [self._parse(f) for f in form[2:]]
+            _, assignments = yield from self._parse_bindings(form[1])
+            items = []
+            for f in form[2:]:
+                items.append((yield f))
             if len(items) == 1:
                 items = items[0]
             else:
@@ -269,14 +325,16 @@ class Parser(object):
 
         def parse(self, form: Form):
             if len(form) >= 4:
-                iter_count = self._parse(form[1])
+                iter_count = yield form[1]
                 if isinstance(iter_count, AstValue):
                     iter_count = iter_count.value
                 else:
                     raise SyntaxError("you must provide a literal value for the number of iterations")
-                arg = self._parse(form[2])
-                function = self._parse(form[3])
-                args = [self._parse(a) for a in form[4:]]
+                arg = yield form[2]
+                function = yield form[3]
+                args = []
+                for a in form[4:]:
+                    args.append((yield a))
                 if not isinstance(function, AstFunction) and not isinstance(function, AstSymbol):
                     raise SyntaxError("the third argument must be a function")
 
@@ -284,19 +342,30 @@ class Parser(object):
             else:
                 raise SyntaxError("loop requires a vector and a function")
 
-    def __init__(self):
-        self._parsers = {}
-        for d in self.__class__.__dict__:
-            if not d.startswith('_'):
-                item = self.__class__.__dict__[d]
-                if type(item) is type:
-                    self._parsers[item.name] = item()
-        for p in self._parsers:
-            self._parsers[p].parent = self
+    def __init__(self, options=None):
+        # The options (such as `uniform_conditionals`) of the compilation context, or the global `Options`
+        self.options = options if options is not None else Options
         self.expr_parser = ExprParser()
         self.expr_parser.parent = self
+        self._parsers = {}
+        for cls in self._special_forms:
+            self._parsers[cls.name] = cls()
+            self._parsers[cls.name].parent = self
+        # The dispatch table maps the symbol in the head of a form to the method parsing it, both for special forms
+        # (such as `let`) and for operators, distributions, etc.
+        self.forms = dict(self.expr_parser.handlers)
+        for name in self._parsers:
+            self.forms[name] = self._parsers[name].parse
 
     def parse(self, form: Form):
+        # Nested forms are parsed with an explicit stack rather than through recursion (see `trampoline`): the
+        # parsers yield the sub-forms to be parsed and get the resulting AST-nodes sent back.
+        result = self._parse_step(form)
+        if type(result) is GeneratorType:
+            result = trampoline(result, self._parse_step, self._set_span)
+        return self._set_span(form, result)
+
+    def _parse_step(self, form):
         if form is None:
             return AstValue(None)
 
@@ -304,9 +373,10 @@ class Parser(object):
 
         if form_type is Form:
             head = form.head
-            if head in self._parsers:
-                return self._parsers[head].parse(form)
-            return self.expr_parser.parse(form)
+            if type(head) is Symbol:
+                result = self.forms.get(head, self.expr_parser.parse_call)(form)
+            else:
+                result = self.expr_parser.parse(form)
 
         elif form_type in [str, int, float, bool]:
             return AstValue(form)
@@ -315,22 +385,49 @@ class Parser(object):
             return AstSymbol(form.name)
 
         elif form_type in [Vector]:
-            values = [self.parse(item) for item in form]
-            if all([isinstance(item, AstValue) for item in values]):
-                return AstValue([item.value for item in values])
-            else:
-                return AstVector(values)
+            result = self._parse_vector(form)
+
+        else:
+            return None
 
+        if type(result) is GeneratorType:
+            return result
+        return self._set_span(form, result)
+
+    @staticmethod
+    def _set_span(form, node):
+        # The nodes inherit the position in the source from their forms
+        if isinstance(node, Node) and node.span is None:
+            node.span = getattr(form, 'span', None)
+        return node
+
+    def _parse_vector(self, form: Vector):
+        values = []
+        for item in form:
+            values.append((yield item))
+        if all([isinstance(item, AstValue) for item in values]):
+            return AstValue([item.value for item in values])
         else:
-            pass
+            return AstVector(values)
+
+
+# The parsers for the special forms are the nested classes of `Parser` registered with a name
+Parser._special_forms = [item for item in Parser.__dict__.values() if type(item) is type and hasattr(item, 'name')]
+
+# The parser does not keep any state between parses, so that a single instance can be shared (by all compilations
+# with the global `Options`)
+_parser = Parser()
 
 
-def parse(source):
+def parse(source, context=None):
+    """
+    Parses the source (a string or the forms returned by `tokenize`) and returns the AST. Without a compilation
+    context (see `foppl.context`), the parser uses the global `Options`.
+    """
     if type(source) is str:
         source = tokenize(source)
 
     if isinstance(source, Form):
-        parser = Parser()
-        return parser.parse(source)
+        return (_parser if context is None else context.parser).parse(source)
 
     raise ValueError("Canot parse input of type '{}'".format(type(source)))
@@ -6,6 +6,7 @@
 # 29. Nov 2017, Tobias Kohn
 # 07. Jan 2018, Tobias Kohn
 #
+from bisect import bisect_right
 from .foppl_objects import *
 
 def is_alpha(c):
@@ -56,6 +57,8 @@ class CharacterStream(object):
     def __init__(self, source):
         self._source = source
         self._offset = 0
+        # The offsets at which the lines start, built when a line number is first needed
+        self._line_starts = None
 
     def peek(self, index = 0):
         offset = self._offset + index
@@ -74,12 +77,26 @@ class CharacterStream(object):
         else:
             return None
 
+    @property
+    def offset(self):
+        return self._offset
+
     def current_line(self):
-        result = 1
-        for i in range(self._offset):
-            if self._source[i] == '\n':
-                result += 1
-        return result
+        return self.line_at(self._offset)
+
+    def line_at(self, offset: int):
+        """
+        Returns the (1-based) number of the line containing the character at the given offset.
+        """
+        if self._line_starts is None:
+            src = self._source
+            starts = [0]
+            i = src.find('\n')
+            while i >= 0:
+                starts.append(i + 1)
+                i = src.find('\n', i + 1)
+            self._line_starts = starts
+        return bisect_right(self._line_starts, offset)
 
     def read(self, count):
         offset = self._offset
@@ -264,6 +281,13 @@ class CharacterStream(object):
         return self.peek()
 
 
+# The reader keeps a stack of open frames `(kind, items, start)`. The kind of a frame is either an opening bracket (with
+# the items read so far), a symbol such as `quote`, which is wrapped around the next item, or `None` for an item, which
+# is to be discarded (`#_`). The start is the offset of the frame in the source, used for the span of the form.
+_brackets = ['(', '[', '#(']
+_pending = object()
+
+
 class Reader(object):
 
     def __init__(self, source):
@@ -271,14 +295,62 @@ class Reader(object):
             self._source = source
         else:
             self._source = CharacterStream(source)
+        self.__arg_count = 0
 
     def __iter__(self):
         return self
 
     def __next__(self):
+        # Nested expressions are read with an explicit stack rather than through recursion, so that the nesting
+        # depth of the source code is not limited by Python's recursion limit.
+        src = self._source
+        stack = []
+        while True:
+            c = src.skip_space()
+            if c in [None, ')', ']', '}'] and len(stack) > 0 and stack[-1][0] in _brackets:
+                end = src.offset
+                if c is not None:
+                    src.next()
+                kind, items, start = stack.pop()
+                value = self._close(kind, items)
+                value.span = (src.line_at(start), src.line_at(end))
+            else:
+                value = self._read_item(stack, c)
+
+            while value is not _pending:
+                if len(stack) == 0:
+                    return value
+                kind, items, start = stack[-1]
+                if kind in _brackets:
+                    items.append(value)
+                    value = _pending
+                else:
+                    stack.pop()
+                    if kind is not None:
+                        value = Form([kind, value])
+                        value.span = (src.line_at(start), src.current_line())
+                    else:
+                        value = _pending
+
+    def _close(self, kind, items):
+        if kind == '(':
+            return Form(items)
+        elif kind == '[':
+            return Vector(items)
+        else:
+            if self.__arg_count == -1:
+                args = Vector(['%'])
+            else:
+                args = Vector([Symbol('%' + str(i+1)) for i in range(self.__arg_count)])
+            self.__arg_count = 0
+            return Form([Symbol.FN, args, Form(items)])
+
+    def _read_item(self, stack, c):
+        """
+        Reads the next atomic item, starting with the character `c`, and returns it. For compound items, a new frame
+        is pushed onto the stack and the special value `_pending` is returned.
+        """
         src = self._source
-        src.skip_space()
-        c = src.peek()
 
         if c is None:
             raise StopIteration()
@@ -292,73 +364,46 @@ class Reader(object):
         elif is_digit(c) or (c in ['+', '-'] and is_digit(src.peek(1))):
             return src.read_number()
 
-        elif c in ['(', '[', '{']:
-            first_char = src.next()
-            result = []
-            while src.skip_space() not in [None, ')', ']', '}']:
-                result.append(self.__next__())
-
-            if src.peek() in [')', ']', '}']:
-                src.next()
+        elif c in ['(', '[']:
+            start = src.offset
+            stack.append((src.next(), [], start))
+            return _pending
 
-            if first_char == '(':
-                return Form(result)
-            elif first_char == '[':
-                return Vector(result)
-            elif first_char == '{':
-                raise NotImplementedError()
-                # return Map(result)
+        elif c == '{':
+            raise NotImplementedError()
+            # return Map(result)
 
         elif c == '\'':
-            return Form([Symbol.QUOTE, self.__next__()])
+            stack.append((Symbol.QUOTE, None, src.offset))
+            src.next()
+            return _pending
 
         elif c == '@':
-            return Form([Symbol.DEREF, self.__next__()])
+            stack.append((Symbol.DEREF, None, src.offset))
+            src.next()
+            return _pending
 
         elif c == '#':
             c = src.peek(1)
             if c == '{':
-                src.skip(2)
-                result = []
-                while src.peek() not in [None, '}']:
-                    result.append(self.__next__())
-
-                if src.peek() == '}':
-                    src.next()
-                    raise NotImplementedError()
-                    # return Set(result)
+                raise NotImplementedError()
+                # return Set(result)
 
             elif c == '\'':
+                stack.append((Symbol.VAR, None, src.offset))
                 src.skip(2)
-                return Form([Symbol.VAR, self.__next__()])
+                return _pending
 
             elif c == '_':
+                stack.append((None, None, src.offset))
                 src.skip(2)
-                self.__next__()
-                return self.__next__()
+                return _pending
 
             elif c == '(':
+                stack.append(('#(', [], src.offset))
                 src.skip(2)
-                self.__reading_fn = True
-                try:
-                    self.__arg_count = 0
-                    result = []
-                    while src.peek() not in [None, ')']:
-                        result.append(self.__next__())
-                finally:
-                    self.__reading_fn = False
-
-                if src.peek() == ')':
-                    src.next()
-                    if self.__arg_count == -1:
-                        args = Vector(['%'])
-                    else:
-                        args = Vector([Symbol('%' + str(i+1)) for i in range(self.__arg_count)])
-                        self.__arg_count = 0
-                    return Form([Symbol.FN, args, Form(result)])
-
-            elif c == '"':
-                pass
+                self.__arg_count = 0
+                return _pending
 
             raise NotImplementedError()
 
@@ -379,7 +424,7 @@ class Reader(object):
                     self.__arg_count = -1
                 return Symbol("%")
 
-        elif c is not None:
+        else:
             result = src.read_symbol()
             if type(result) is str:
                 if result[0] == ':':
@@ -389,13 +434,16 @@ class Reader(object):
                 else:
                     return Symbol(result)
 
+            elif isinstance(result, Value):
+                return result.value
+
             elif type(result) is tuple:
                 return result[0]
 
         raise StopIteration()
 
     def current_line_number(self):
-        self._source.current_line()
+        return self._source.current_line()
 
 
 def tokenize(input):
@@ -50,35 +50,36 @@ class FunctionCompiler(Walker):
     def visit_binary(self, node: AstBinary):
         node = self._optimize(node)
         if isinstance(node, AstBinary):
-            left = node.left.walk(self)
-            right = node.right.walk(self)
-            return "({} {} {})".format(left, node.op, right)
+            items = []
+            for item in node.get_operands():
+                items.append((yield item))
+            return "({})".format(" {} ".format(node.op).join(items))
         else:
-            return node.walk(self)
+            return (yield node)
 
     def visit_call_exp(self, node: AstFunctionCall):
-        arg = self._optimize(node.args[0]).walk(self)
+        arg = yield self._optimize(node.args[0])
         return "math.exp({})".format(arg)
 
     def visit_call_get(self, node: AstFunctionCall):
         args = node.args
-        seq_expr = args[0].walk(self)
-        idx_expr = args[1].walk(self)
+        seq_expr = yield args[0]
+        idx_expr = yield args[1]
         if all(['0' <= x <= '9' for x in idx_expr]):
             return "{}[{}]".format(seq_expr, idx_expr)
         else:
             return "{}[int({})]".format(seq_expr, idx_expr)
 
     def visit_call_rest(self, node: AstFunctionCall):
-        expr = node.args[0].walk(self)
+        expr = yield node.args[0]
         return "{}[1:]".format(expr)
 
     def visit_sqrt(self, node: AstSqrt):
         node = self._optimize(node)
         if isinstance(node, AstSqrt):
-            return "sqrt({})".format(node.item.visit(self))
+            return "sqrt({})".format((yield node.item))
         else:
-            return node.walk(self)
+            return (yield node)
 
     def visit_symbol(self, node: AstSymbol):
         if self.compiler:
@@ -92,9 +93,9 @@ class FunctionCompiler(Walker):
     def visit_unary(self, node: AstUnary):
         node = self._optimize(node)
         if isinstance(node, AstUnary):
-            return "{}{}".format(node.op, node.item.walk(self))
+            return "{}{}".format(node.op, (yield node.item))
         else:
-            return node.walk(self)
+            return (yield node)
 
     def visit_value(self, node: AstValue):
         return repr(node.value)
@@ -102,7 +103,9 @@ class FunctionCompiler(Walker):
     def visit_vector(self, node: AstVector):
         node = self._optimize(node)
         if isinstance(node, AstVector):
-            items = [item.walk(self) for item in node.items]
+            items = []
+            for item in node.items:
+                items.append((yield item))
             return "[{}]".format(', '.join(items))
         else:
-            return node.walk(self)
\ No newline at end of file
+            return (yield node)
\ No newline at end of file
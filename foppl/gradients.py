@@ -0,0 +1,466 @@
+#
+# This file is part of PyFOPPL, an implementation of a First Order Probabilistic Programming Language in Python.
+#
+# License: MIT (see LICENSE.txt)
+#
+# 19. Oct 2026
+#
+"""
+Source-to-source reverse-mode differentiation of the log-joint of a graphical model.
+
+The graph stores the code for each vertex as a Python expression (string). The `GradientGenerator` parses these
+expressions, flattens them into a sequence of simple assignments (a 'tape'), and then emits the adjoint statements
+for the tape in reverse order. The result is the body of a method `gen_pdf_grad(state)`, which returns the log-joint
+together with a dictionary mapping each continuous variable to the partial derivative of the log-joint.
+
+Only the arithmetic operators, `math.exp`, `math.log`, `math.sqrt` and conditional expressions (`a if c else b`) are
+differentiated. The densities of the built-in distributions listed in `density_rules` are expanded into closed-form
+expressions. If the log-joint depends on a continuous variable through any other construct, a `NotImplementedError`
+is raised and no gradient can be generated.
+"""
+import ast as py_ast
+
+
+_LOG_SQRT_2PI = 0.9189385332046727
+_LOG_PI = 1.1447298858494002
+
+
+def _normal(x, p, t):
+    z = t + 'z'
+    pre = ["{} = ({} - {}) / {}".format(z, x, p['mu'], p['sigma'])]
+    logp = "-0.5 * {z} * {z} - math.log({s}) - {c}".format(z=z, s=p['sigma'], c=_LOG_SQRT_2PI)
+    grad = {
+        'value': "-{} / {}".format(z, p['sigma']),
+        'mu':    "{} / {}".format(z, p['sigma']),
+        'sigma': "({z} * {z} - 1.0) / {s}".format(z=z, s=p['sigma']),
+    }
+    return pre, logp, grad, None
+
+def _log_normal(x, p, t):
+    z = t + 'z'
+    pre = ["{} = (math.log({}) - {}) / {}".format(z, x, p['mu'], p['sigma'])]
+    logp = "-0.5 * {z} * {z} - math.log({s}) - math.log({x}) - {c}".format(z=z, s=p['sigma'], x=x, c=_LOG_SQRT_2PI)
+    grad = {
+        'value': "-(1.0 + {z} / {s}) / {x}".format(z=z, s=p['sigma'], x=x),
+        'mu':    "{} / {}".format(z, p['sigma']),
+        'sigma': "({z} * {z} - 1.0) / {s}".format(z=z, s=p['sigma']),
+    }
+    return pre, logp, grad, "{} > 0".format(x)
+
+def _exponential(x, p, t):
+    logp = "math.log({lam}) - {lam} * {x}".format(lam=p['lam'], x=x)
+    grad = {
+        'value': "-{}".format(p['lam']),
+        'lam':   "1.0 / {} - {}".format(p['lam'], x),
+    }
+    return [], logp, grad, "{} >= 0".format(x)
+
+def _gamma(x, p, t):
+    a, b = p['alpha'], p['beta']
+    logp = "{a} * math.log({b}) + ({a} - 1.0) * math.log({x}) - {b} * {x} - math.lgamma({a})".format(a=a, b=b, x=x)
+    grad = {
+        'value': "({} - 1.0) / {} - {}".format(a, x, b),
+        'alpha': "math.log({}) + math.log({}) - digamma({})".format(b, x, a),
+        'beta':  "{} / {} - {}".format(a, b, x),
+    }
+    return [], logp, grad, "{} > 0".format(x)
+
+def _beta(x, p, t):
+    a, b = p['alpha'], p['beta']
+    logp = "({a} - 1.0) * math.log({x}) + ({b} - 1.0) * math.log(1.0 - {x}) - math.lgamma({a}) - math.lgamma({b}) + " \
+           "math.lgamma({a} + {b})".format(a=a, b=b, x=x)
+    grad = {
+        'value': "({a} - 1.0) / {x} - ({b} - 1.0) / (1.0 - {x})".format(a=a, b=b, x=x),
+        'alpha': "math.log({x}) - digamma({a}) + digamma({a} + {b})".format(a=a, b=b, x=x),
+        'beta':  "math.log(1.0 - {x}) - digamma({b}) + digamma({a} + {b})".format(a=a, b=b, x=x),
+    }
+    return [], logp, grad, "0 < {} < 1".format(x)
+
+def _uniform(x, p, t):
+    a, b = p['a'], p['b']
+    logp = "-math.log({} - {})".format(b, a)
+    grad = {
+        'value': "0.0",
+        'a':     "1.0 / ({} - {})".format(b, a),
+        'b':     "-1.0 / ({} - {})".format(b, a),
+    }
+    return [], logp, grad, "{} <= {} <= {}".format(a, x, b)
+
+def _cauchy(x, p, t, offset=None):
+    z, w = t + 'z', t + 'w'
+    pre = ["{} = ({} - {}) / {}".format(z, x, p['mu'], p['gamma']),
+           "{} = 1.0 + {} * {}".format(w, z, z)]
+    logp = "-math.log({g}) - math.log({w}) - {c}".format(g=p['gamma'], w=w, c=_LOG_PI)
+    if offset:
+        logp += " + {}".format(offset)
+    grad = {
+        'value': "-2.0 * {} / ({} * {})".format(z, p['gamma'], w),
+        'mu':    "2.0 * {} / ({} * {})".format(z, p['gamma'], w),
+        'gamma': "(2.0 * {z} * {z} / {w} - 1.0) / {g}".format(z=z, w=w, g=p['gamma']),
+    }
+    return pre, logp, grad, None
+
+def _half_cauchy(x, p, t):
+    pre, logp, grad, _ = _cauchy(x, p, t, offset=repr(0.6931471805599453))
+    return pre, logp, grad, "{} >= {}".format(x, p['mu'])
+
+def _poisson(x, p, t):
+    logp = "{x} * math.log({lam}) - {lam} - math.lgamma({x} + 1)".format(x=x, lam=p['lam'])
+    grad = {
+        'lam': "{} / {} - 1.0".format(x, p['lam']),
+    }
+    return [], logp, grad, None
+
+def _bernoulli(x, p, t):
+    logp = "math.log({ps}) if {x} else math.log(1.0 - {ps})".format(x=x, ps=p['ps'])
+    grad = {
+        'ps': "1.0 / {ps} if {x} else -1.0 / (1.0 - {ps})".format(x=x, ps=p['ps']),
+    }
+    return [], logp, grad, None
+
+
+"""
+For each supported distribution, the rule takes the value and the parameters (as Python atoms) together with a prefix
+for temporary names, and returns a tuple `(pre, logp, grad, support)`: a list of assignments to compute first, the
+expression for the log-density, a dictionary with the partial derivatives with respect to the value (`'value'`) and
+each parameter, and an optional condition for the support of the distribution.
+"""
+density_rules = {
+    'Bernoulli':   _bernoulli,
+    'Beta':        _beta,
+    'Cauchy':      _cauchy,
+    'Exponential': _exponential,
+    'Gamma':       _gamma,
+    'HalfCauchy':  _half_cauchy,
+    'LogNormal':   _log_normal,
+    'Normal':      _normal,
+    'Poisson':     _poisson,
+    'Uniform':     _uniform,
+}
+
+
+_binary_symbols = {
+    py_ast.Add: '+', py_ast.Sub: '-', py_ast.Mult: '*', py_ast.Div: '/', py_ast.FloorDiv: '//', py_ast.Mod: '%',
+    py_ast.Pow: '**', py_ast.BitAnd: '&', py_ast.BitOr: '|', py_ast.BitXor: '^',
+}
+
+_compare_symbols = {
+    py_ast.Eq: '==', py_ast.NotEq: '!=', py_ast.Lt: '<', py_ast.LtE: '<=', py_ast.Gt: '>', py_ast.GtE: '>=',
+    py_ast.Is: 'is', py_ast.IsNot: 'is not', py_ast.In: 'in', py_ast.NotIn: 'not in',
+}
+
+_unary_symbols = {
+    py_ast.USub: '-', py_ast.UAdd: '+', py_ast.Not: 'not ', py_ast.Invert: '~',
+}
+
+
+def to_source(node) -> str:
+    """
+    Turns a Python expression-AST back into source code. All compound expressions are put in parentheses.
+    """
+    if isinstance(node, py_ast.Constant):
+        return repr(node.value)
+    elif isinstance(node, py_ast.Name):
+        return node.id
+    elif isinstance(node, py_ast.Attribute):
+        return "{}.{}".format(to_source(node.value), node.attr)
+    elif isinstance(node, py_ast.BinOp):
+        return "({} {} {})".format(to_source(node.left), _binary_symbols[type(node.op)], to_source(node.right))
+    elif isinstance(node, py_ast.UnaryOp):
+        return "({}{})".format(_unary_symbols[type(node.op)], to_source(node.operand))
+    elif isinstance(node, py_ast.BoolOp):
+        op = ' and ' if isinstance(node.op, py_ast.And) else ' or '
+        return "({})".format(op.join([to_source(v) for v in node.values]))
+    elif isinstance(node, py_ast.Compare):
+        items = [to_source(node.left)]
+        for op, right in zip(node.ops, node.comparators):
+            items.append(_compare_symbols[type(op)])
+            items.append(to_source(right))
+        return "({})".format(' '.join(items))
+    elif isinstance(node, py_ast.Call):
+        args = [to_source(a) for a in node.args]
+        args += ["{}={}".format(k.arg, to_source(k.value)) for k in node.keywords]
+        return "{}({})".format(to_source(node.func), ', '.join(args))
+    elif isinstance(node, py_ast.IfExp):
+        return "({} if {} else {})".format(to_source(node.body), to_source(node.test), to_source(node.orelse))
+    elif isinstance(node, py_ast.List):
+        return "[{}]".format(', '.join([to_source(e) for e in node.elts]))
+    elif isinstance(node, py_ast.Tuple):
+        return "({},)".format(', '.join([to_source(e) for e in node.elts]))
+    elif isinstance(node, py_ast.Subscript):
+        return "{}[{}]".format(to_source(node.value), to_source(node.slice))
+    elif isinstance(node, py_ast.Slice):
+        lower = to_source(node.lower) if node.lower else ''
+        upper = to_source(node.upper) if node.upper else ''
+        if node.step:
+            return "{}:{}:{}".format(lower, upper, to_source(node.step))
+        return "{}:{}".format(lower, upper)
+    else:
+        raise NotImplementedError("cannot convert '{}' to source".format(type(node).__name__))
+
+
+def parse_expr(code: str):
+    return py_ast.parse(code.strip(), mode='eval').body
+
+
+def strip_conditional_suffix(code: str, suffix: str) -> str:
+    """
+    Conditions are compiled with the `conditional_suffix` attached (e.g., `(f >= 0).data[0]`), which is only
+    meaningful if the state holds tensors. We remove the suffix where we work with plain floats. The suffix must be
+    the one the graph has been compiled with, i.e. the one in the options of the compilation context.
+    """
+    if suffix and code.endswith(suffix):
+        return code[:-len(suffix)]
+    return code
+
+
+def split_distribution(code: str):
+    """
+    Splits the code for a distribution such as `dist.Normal(mu=x, sigma=1.0)` into the name of the distribution and
+    a dictionary with the parameters as AST-nodes.
+    """
+    node = parse_expr(code)
+    if isinstance(node, py_ast.Call) and isinstance(node.func, py_ast.Attribute) and \
+            isinstance(node.func.value, py_ast.Name) and node.func.value.id == 'dist' and len(node.args) == 0:
+        return node.func.attr, {k.arg: k.value for k in node.keywords}
+    raise NotImplementedError("not a distribution: '{}'".format(code))
+
+
+class GradientGenerator(object):
+    """
+    The gradient generator builds the code for the log-joint and its gradient with respect to the continuous
+    variables of the graph. During the forward pass, every differentiable sub-expression is assigned to a temporary
+    variable `_tN`; for each such assignment, we record the statements that propagate the adjoint `_g_tN` back to the
+    operands. These statements are emitted in reverse order after the forward pass.
+
+    Values that do not depend on any continuous variable are 'inactive': they are evaluated as in `gen_pdf` and do not
+    get an adjoint.
+    """
+
+    def __init__(self, graph, conditional_suffix: str):
+        self.graph = graph
+        self.conditional_suffix = conditional_suffix
+        self.active = set()
+        self.forward = []
+        self.backward = []
+        self.required_functions = set()
+        self._counter = 0
+
+    def _new_temp(self):
+        self._counter += 1
+        return "_t{}".format(self._counter)
+
+    def _add_adjoint(self, target: str, expr: str, unit: list):
+        unit.append("_g_{} += {}".format(target, expr))
+
+    def is_active(self, node) -> bool:
+        if isinstance(node, py_ast.Name):
+            return node.id in self.active
+        elif isinstance(node, (py_ast.Compare, py_ast.BoolOp)):
+            return False
+        elif isinstance(node, py_ast.UnaryOp) and isinstance(node.op, py_ast.Not):
+            return False
+        elif isinstance(node, py_ast.IfExp):
+            return self.is_active(node.body) or self.is_active(node.orelse)
+        else:
+            return any([self.is_active(child) for child in py_ast.iter_child_nodes(node)])
+
+    def emit(self, node) -> str:
+        """
+        Emits the forward computation of the given expression-node and returns an atom (a name or a literal), which
+        holds the value of the expression.
+        """
+        if not self.is_active(node):
+            if isinstance(node, (py_ast.Constant, py_ast.Name)):
+                return to_source(node)
+            target = self._new_temp()
+            self.forward.append("{} = {}".format(target, to_source(node)))
+            return target
+
+        if isinstance(node, py_ast.Name):
+            return node.id
+
+        unit = []
+        target = self._new_temp()
+        g = "_g_" + target
+
+        if isinstance(node, py_ast.BinOp):
+            left = self.emit(node.left)
+            right = self.emit(node.right)
+            l_active = self.is_active(node.left)
+            r_active = self.is_active(node.right)
+            op = type(node.op)
+            if op is py_ast.Add:
+                self.forward.append("{} = {} + {}".format(target, left, right))
+                if l_active: self._add_adjoint(left, g, unit)
+                if r_active: self._add_adjoint(right, g, unit)
+            elif op is py_ast.Sub:
+                self.forward.append("{} = {} - {}".format(target, left, right))
+                if l_active: self._add_adjoint(left, g, unit)
+                if r_active: self._add_adjoint(right, "-" + g, unit)
+            elif op is py_ast.Mult:
+                self.forward.append("{} = {} * {}".format(target, left, right))
+                if l_active: self._add_adjoint(left, "{} * {}".format(g, right), unit)
+                if r_active: self._add_adjoint(right, "{} * {}".format(g, left), unit)
+            elif op is py_ast.Div:
+                self.forward.append("{} = {} / {}".format(target, left, right))
+                if l_active: self._add_adjoint(left, "{} / {}".format(g, right), unit)
+                if r_active: self._add_adjoint(right, "-{} * {} / {}".format(g, target, right), unit)
+            elif op is py_ast.Pow:
+                self.forward.append("{} = {} ** {}".format(target, left, right))
+                if l_active:
+                    self._add_adjoint(left, "{} * {} * {} ** ({} - 1)".format(g, right, left, right), unit)
+                if r_active:
+                    self._add_adjoint(right, "{} * {} * math.log({})".format(g, target, left), unit)
+            else:
+                raise NotImplementedError("cannot differentiate operator '{}'".format(op.__name__))
+
+        elif isinstance(node, py_ast.UnaryOp) and isinstance(node.op, (py_ast.USub, py_ast.UAdd)):
+            item = self.emit(node.operand)
+            if isinstance(node.op, py_ast.USub):
+                self.forward.append("{} = -{}".format(target, item))
+                self._add_adjoint(item, "-" + g, unit)
+            else:
+                self.forward.append("{} = {}".format(target, item))
+                self._add_adjoint(item, g, unit)
+
+        elif isinstance(node, py_ast.Call) and isinstance(node.func, py_ast.Attribute) and \
+                isinstance(node.func.value, py_ast.Name) and node.func.value.id == 'math' and \
+                len(node.args) == 1 and len(node.keywords) == 0:
+            func = node.func.attr
+            item = self.emit(node.args[0])
+            if func == 'exp':
+                self.forward.append("{} = math.exp({})".format(target, item))
+                self._add_adjoint(item, "{} * {}".format(g, target), unit)
+            elif func == 'sqrt':
+                self.forward.append("{} = math.sqrt({})".format(target, item))
+                self._add_adjoint(item, "0.5 * {} / {}".format(g, target), unit)
+            elif func == 'log':
+                self.forward.append("{} = math.log({})".format(target, item))
+                self._add_adjoint(item, "{} / {}".format(g, item), unit)
+            else:
+                raise NotImplementedError("cannot differentiate 'math.{}'".format(func))
+
+        elif isinstance(node, py_ast.IfExp):
+            test = self._new_temp()
+            self.forward.append("{} = {}".format(test, to_source(node.test)))
+            body = self.emit(node.body)
+            orelse = self.emit(node.orelse)
+            self.forward.append("{} = {} if {} else {}".format(target, body, test, orelse))
+            body_unit, else_unit = [], []
+            if self.is_active(node.body):
+                self._add_adjoint(body, g, body_unit)
+            if self.is_active(node.orelse):
+                self._add_adjoint(orelse, g, else_unit)
+            unit.append("if {}:".format(test))
+            unit += ['\t' + line for line in body_unit] if body_unit else ['\tpass']
+            if else_unit:
+                unit.append("else:")
+                unit += ['\t' + line for line in else_unit]
+
+        else:
+            raise NotImplementedError("cannot differentiate '{}'".format(to_source(node)))
+
+        self.active.add(target)
+        self.backward.append(unit)
+        return target
+
+    def _emit_factor(self, index: int, name: str, code: str, value: str, value_active: bool):
+        """
+        Emits the log-density for the vertex `name` with distribution `code`, evaluated at `value`.
+        Returns the name of the variable holding the log-density.
+        """
+        graph = self.graph
+        lp = "_lp{}".format(index)
+        dist_name, params = split_distribution(code)
+        cond = graph.observed_conditions.get(name, None)
+        active_params = [p for p in params if self.is_active(params[p])]
+
+        if dist_name not in density_rules:
+            if value_active or len(active_params) > 0:
+                raise NotImplementedError("cannot differentiate the density of '{}'".format(dist_name))
+            self.forward.append("dist_{} = {}".format(name, code))
+            s = "{} = dist_{}.log_pdf({})".format(lp, name, value)
+            if cond:
+                s += " if {} else 0".format(cond)
+            self.forward.append(s)
+            return lp
+
+        atoms = {p: self.emit(params[p]) for p in params}
+        pre, logp, grad, support = density_rules[dist_name](value, atoms, "_d{}".format(index))
+        if 'digamma(' in ' '.join([grad[p] for p in active_params]):
+            self.required_functions.add('digamma')
+
+        if value_active and 'value' not in grad:
+            raise NotImplementedError("cannot differentiate the density of '{}' with respect to the value".format(
+                dist_name))
+        unit = []
+        targets = ([('value', value)] if value_active else []) + [(p, atoms[p]) for p in active_params]
+        for (p, atom) in targets:
+            self._add_adjoint(atom, grad[p], unit)
+
+        if cond or support:
+            guard = ' and '.join(["({})".format(c) for c in [cond, support] if c])
+            self.forward.append("if {}:".format(guard))
+            self.forward += ['\t' + line for line in pre]
+            self.forward.append("\t{} = {}".format(lp, logp))
+            if cond and support:
+                self.forward += ["elif {}:".format(cond), "\t{} = -math.inf".format(lp)]
+            self.forward += ["else:", "\t{} = {}".format(lp, '-math.inf' if support and not cond else '0')]
+            if len(unit) > 0:
+                unit = ["if {}:".format(guard)] + ['\t' + line for line in unit]
+        else:
+            self.forward += pre
+            self.forward.append("{} = {}".format(lp, logp))
+
+        if len(unit) > 0:
+            self.backward.append(unit)
+        return lp
+
+    def generate(self) -> list:
+        """
+        Generates the body of `gen_pdf_grad(state)` as a list of lines.
+
+        :return:  A list of strings, each being one line of code.
+        :raises:  NotImplementedError if the log-joint is not differentiable by this generator.
+        """
+        graph = self.graph
+        p_vars = []
+        for v in graph.sorted_var_list:
+            code = graph.get_code_for_variable(v)
+            if code.startswith('dist.'):
+                self.forward.append("{v} = state['{v}']".format(v=v))
+                if graph.is_observed_variable(v):
+                    # The observed value might depend on continuous variables, e.g., `(observe (normal 1 1) x)`
+                    node = parse_expr(graph.observed_values[v])
+                    value = self.emit(node)
+                    value_active = self.is_active(node)
+                else:
+                    value = v
+                    value_active = v in graph.cont_vars
+                    if value_active:
+                        self.active.add(v)
+                p_vars.append(self._emit_factor(len(p_vars), v, code, value, value_active))
+            else:
+                if v in graph.cond_vars:
+                    code = strip_conditional_suffix(code, self.conditional_suffix)
+                node = parse_expr(code)
+                if self.is_active(node):
+                    atom = self.emit(node)
+                    self.forward.append("{} = {}".format(v, atom))
+                    self.active.add(v)
+                    unit = []
+                    self._add_adjoint(atom, "_g_" + v, unit)
+                    self.backward.append(unit)
+                else:
+                    self.forward.append("{} = {}".format(v, to_source(node)))
+
+        result = list(self.forward)
+        result.append("logp = {}".format(" + ".join(p_vars) if len(p_vars) > 0 else "0.0"))
+        for a in sorted(self.active.union(graph.cont_vars)):
+            result.append("_g_{} = 0.0".format(a))
+        for unit in reversed(self.backward):
+            result += unit
+        grad = ", ".join(["'{v}': _g_{v}".format(v=v) for v in sorted(graph.cont_vars)])
+        result.append("return logp, {{{}}}".format(grad))
+        return result
@@ -6,6 +6,7 @@
 # 20. Dec 2017, Tobias Kohn
 # 19. Jan 2018, Tobias Kohn
 #
+import threading
 from .foppl_distributions import continuous_distributions, discrete_distributions
 
 # Try to import `networkx` and `matplotlib` so we can draw the graphs
@@ -45,6 +46,8 @@ class Graph(object):
     - `used_functions` is set that records all functions used inside the code, which have not been recognized by
       the compiler. These functions need to be provided by other means to the model/Python code.
     - `distribution_sizes` keeps a record of the "size" various distributions in the code have.
+    - `vertex_types` maps vertices to their types (`ValueType`), as far as they are known at compile time.
+    - `vertex_spans` maps vertices to the lines `(first, last)` in the original source they stem from.
 
     Graphs are thought to be immutable objects. Use a `GraphBuilder` to create and modify new graphs. There are some
     exceptions, though: the compiler might have to add a specific value or mapping to a newly created graph. That is
@@ -82,7 +85,8 @@ class Graph(object):
         ```
     """
 
-    def __init__(self, vertices: set, arcs: set, cond_densities: dict = None, obs_values: dict = None):
+    def __init__(self, vertices: set, arcs: set, cond_densities: dict = None, obs_values: dict = None, *,
+                 classify: bool = True):
         if cond_densities is None:
             cond_densities = {}
         if obs_values is None:
@@ -94,21 +98,30 @@ class Graph(object):
         self.observed_conditions = {}
         self.original_names = {}
         self.conditional_functions = {}
-        observed = self.observed_values.keys()
-        f = lambda x: (x[5:x.index('(')] if x.startswith('dist') and '(' in x else x)
-        self.cont_vars = set(n for n in vertices
-                                if n in cond_densities
-                                if n not in observed
-                                if f(cond_densities[n]) in continuous_distributions)
-        self.disc_vars = set(n for n in vertices
-                                if n in cond_densities
-                                if n not in observed
-                                if f(cond_densities[n]) in discrete_distributions)
-        self.cond_vars = set(n for n in vertices
-                                if n in cond_densities
-                                if n.startswith('cond'))
+        if classify:
+            observed = self.observed_values.keys()
+            f = lambda x: (x[5:x.index('(')] if x.startswith('dist') and '(' in x else x)
+            self.cont_vars = set(n for n in vertices
+                                    if n in cond_densities
+                                    if n not in observed
+                                    if f(cond_densities[n]) in continuous_distributions)
+            self.disc_vars = set(n for n in vertices
+                                    if n in cond_densities
+                                    if n not in observed
+                                    if f(cond_densities[n]) in discrete_distributions)
+            self.cond_vars = set(n for n in vertices
+                                    if n in cond_densities
+                                    if n.startswith('cond'))
+        else:
+            # The caller (i.e. `merge`) sets the classification of the vertices itself
+            self.cont_vars = self.disc_vars = self.cond_vars = None
         self.used_functions = set()
         self.distribution_sizes = {}
+        self.vertex_types = {}
+        self.vertex_spans = {}
+        # The statistics of the compilation (see `foppl.statistics`), attached to the final graph by `compile`
+        self.statistics = None
+        self._sorted_var_list = None
         self.EMPTY = None
 
     def __repr__(self):
@@ -129,6 +142,47 @@ class Graph(object):
         """
         return len(self.vertices) == 0 and len(self.arcs) == 0
 
+    def as_dict(self) -> dict:
+        """
+        Returns the graph as a (JSON-serializable) dictionary, which `Graph.from_dict` turns back into a graph.
+        """
+        return {
+            'vertices': sorted(self.vertices),
+            'arcs': sorted([list(arc) for arc in self.arcs]),
+            'conditional_densities': self.conditional_densities,
+            'observed_values': self.observed_values,
+            'observed_conditions': self.observed_conditions,
+            'original_names': self.original_names,
+            'conditional_functions': self.conditional_functions,
+            'used_functions': sorted(self.used_functions),
+            'distribution_sizes': self.distribution_sizes,
+            'cont_vars': sorted(self.cont_vars),
+            'disc_vars': sorted(self.disc_vars),
+            'cond_vars': sorted(self.cond_vars),
+            'vertex_types': {name: [t.kind, list(t.shape), t.item] for (name, t) in self.vertex_types.items()},
+            'vertex_spans': {name: list(span) for (name, span) in self.vertex_spans.items()},
+        }
+
+    @classmethod
+    def from_dict(cls, data: dict):
+        from .type_inference import ValueType
+        G = cls(set(data['vertices']), set(tuple(arc) for arc in data['arcs']),
+                dict(data['conditional_densities']), dict(data['observed_values']), classify=False)
+        G.cont_vars = set(data['cont_vars'])
+        G.disc_vars = set(data['disc_vars'])
+        G.cond_vars = set(data['cond_vars'])
+        G.observed_conditions = dict(data['observed_conditions'])
+        G.original_names = dict(data['original_names'])
+        G.conditional_functions = dict(data['conditional_functions'])
+        G.used_functions = set(data['used_functions'])
+        # JSON turns the tuples of the sizes into lists
+        G.distribution_sizes = {name: tuple(size) if isinstance(size, list) else size
+                                for (name, size) in data['distribution_sizes'].items()}
+        G.vertex_types = {name: ValueType(kind, tuple(shape), item)
+                          for (name, (kind, shape, item)) in data['vertex_types'].items()}
+        G.vertex_spans = {name: tuple(span) for (name, span) in data['vertex_spans'].items()}
+        return G
+
     def merge(self, other):
         """
         Merges this graph with another graph and returns the result. The original graphs are not modified, but
@@ -137,11 +191,12 @@ class Graph(object):
         :param other: The second graph to merge with the current one.
         :return:      A new graph-object.
         """
+        _merges.count = getattr(_merges, 'count', 0) + 1
         V = set.union(self.vertices, other.vertices)
         A = set.union(self.arcs, other.arcs)
         C = {**self.conditional_densities, **other.conditional_densities}
         O = {**self.observed_values, **other.observed_values}
-        G = Graph(V, A, C, O)
+        G = Graph(V, A, C, O, classify=False)
         G.cont_vars = set.union(self.cont_vars, other.cont_vars)
         G.disc_vars = set.union(self.disc_vars, other.disc_vars)
         G.cond_vars = set.union(self.cond_vars, other.cond_vars)
@@ -150,6 +205,8 @@ class Graph(object):
         G.conditional_functions = {**self.conditional_functions, **other.conditional_functions}
         G.used_functions = set.union(self.used_functions, other.used_functions)
         G.distribution_sizes = {**self.distribution_sizes, **other.distribution_sizes}
+        G.vertex_types = {**self.vertex_types, **other.vertex_types}
+        G.vertex_spans = {**self.vertex_spans, **other.vertex_spans}
         return G
 
     def add_condition_for_observation(self, obs: str, cond: str):
@@ -167,6 +224,14 @@ class Graph(object):
     def add_distribution_size(self, name, size):
         self.distribution_sizes[name] = size
 
+    def add_vertex_type(self, name, value_type):
+        if value_type is not None:
+            self.vertex_types[name] = value_type
+
+    def add_vertex_span(self, name, span):
+        if span is not None:
+            self.vertex_spans[name] = span
+
     def add_original_name(self, original_name, new_name):
         self.original_names[new_name] = original_name
 
@@ -227,18 +292,21 @@ class Graph(object):
             return set()
 
     def get_all_parents_of_node(self, var_name):
-        edges = self.sorted_edges_by_child
+        return self._get_all_parents(var_name, self.sorted_edges_by_child)
+
+    @staticmethod
+    def _get_all_parents(var_name, edges):
         if var_name in edges:
-            result = list(edges[var_name])
-            i = 0
-            while i < len(result):
-                node = result[i]
+            result = set(edges[var_name])
+            stack = list(result)
+            while len(stack) > 0:
+                node = stack.pop()
                 if node in edges:
                     for e in edges[node]:
                         if e not in result:
-                            result.append(e)
-                i += 1
-            return set(result)
+                            result.add(e)
+                            stack.append(e)
+            return result
         else:
             return set()
 
@@ -247,39 +315,45 @@ class Graph(object):
         """
         The list of all variables, sorted so that each vertex in the sequence only depends on vertices occurring
         earlier in the sequence.
-        """
-        edges = self.sorted_edges_by_child.copy()
-        changed = True
-        while changed:
-            changed = False
-            for u in edges:
-                w = edges[u]
-                for v in edges[u]:
-                    if not edges[v].issubset(w):
-                        w = w.union(edges[v])
-                        changed = True
-                edges[u] = w
 
-        result = []
-        f = lambda s: int(''.join([x for x in s if '0' <= x <= '9']))
-        while len(edges) > 0:
-            batch = []
-            keys = list(edges.keys())
-            for u in keys:
-                if len(edges[u]) == 0:
-                    del edges[u]
-                    batch.append(u)
-            result += sorted(batch, key=f)
-            batch = set(batch)
-            for u in edges:
-                edges[u] = edges[u].difference(batch)
-        return result
+        The vertices are sorted by their depth (the length of the longest path from a vertex without parents), and
+        vertices of the same depth by the number in their name. As the graph does not change, the list is computed
+        only once.
+        """
+        if self._sorted_var_list is None:
+            parents = self.sorted_edges_by_child
+            children = {u: [] for u in parents}
+            missing = {}
+            for u in parents:
+                missing[u] = len(parents[u])
+                for v in parents[u]:
+                    if v in children:
+                        children[v].append(u)
+                    else:
+                        children[v] = [u]
+                        missing[v] = 0
+            # Kahn's algorithm: a vertex is ready once all its parents are done
+            depth = {u: 0 for u in missing if missing[u] == 0}
+            ready = list(depth)
+            while len(ready) > 0:
+                v = ready.pop()
+                for u in children[v]:
+                    depth[u] = max(depth.get(u, 0), depth[v] + 1)
+                    missing[u] -= 1
+                    if missing[u] == 0:
+                        ready.append(u)
+            if len(depth) < len(missing):
+                raise ValueError("the graph contains a cycle")
+            f = lambda s: int(''.join([x for x in s if '0' <= x <= '9']))
+            self._sorted_var_list = sorted(depth, key=lambda u: (depth[u], f(u)))
+        return list(self._sorted_var_list)
 
     @property
     def if_vars(self):
         result = set()
+        edges = self.sorted_edges_by_child
         for cond in self.cond_vars:
-            ancestors = self.get_all_parents_of_node(cond)
+            ancestors = self._get_all_parents(cond, edges)
             ancestors = ancestors.difference(self.disc_vars)
             result = result.union(ancestors)
         return result
@@ -296,9 +370,11 @@ class Graph(object):
         else:
             return "{}"
 
-    def get_continuous_distributions(self):
+    def get_continuous_distributions(self, exclude=()):
         result = []
         for name in self.cont_vars:
+            if name in exclude:
+                continue
             code = self.get_code_for_variable(name)
             if code.startswith("dist."):
                 code = code[5:]
@@ -311,9 +387,11 @@ class Graph(object):
         else:
             return "{}"
 
-    def get_discrete_distributions(self):
+    def get_discrete_distributions(self, exclude=()):
         result = []
         for name in self.disc_vars:
+            if name in exclude:
+                continue
             code = self.get_code_for_variable(name)
             if code.startswith("dist."):
                 code = code[5:]
@@ -335,6 +413,24 @@ class Graph(object):
         else:
             return "{}"
 
+    def get_vertex_types(self):
+        if len(self.vertex_types) > 0:
+            result = []
+            for name in sorted(self.vertex_types):
+                result.append("'{}': {}".format(name, repr(self.vertex_types[name].to_tuple())))
+            return "{{\n  {}\n}}".format(',\n  '.join(result))
+        else:
+            return "{}"
+
+    def get_vertex_spans(self):
+        if len(self.vertex_spans) > 0:
+            result = []
+            for name in sorted(self.vertex_spans):
+                result.append("'{}': {}".format(name, repr(tuple(self.vertex_spans[name]))))
+            return "{{\n  {}\n}}".format(',\n  '.join(result))
+        else:
+            return "{}"
+
     def draw_graph(self):
         if nx and plt:
             G = nx.DiGraph()
@@ -408,3 +504,11 @@ def merge(*graphs):
     return result
 
 Graph.EMPTY = Graph(set(), set())
+
+# The number of merges so far in each thread, used for the compile statistics (see `foppl.statistics`). As every
+# compilation runs in a single thread, the count is not disturbed by compilations in other threads.
+_merges = threading.local()
+
+
+def get_merge_count() -> int:
+    return getattr(_merges, 'count', 0)
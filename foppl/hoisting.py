@@ -0,0 +1,135 @@
+#
+# This file is part of PyFOPPL, an implementation of a First Order Probabilistic Programming Language in Python.
+#
+# License: MIT (see LICENSE.txt)
+#
+# 19. Oct 2026
+#
+"""
+Hoisting of constant distribution objects and constant subexpressions out of the generated methods.
+
+An expression is constant if it does not refer to any vertex of the graph, e.g., `math.sqrt(5.0)` or a complete
+distribution such as `dist.Normal(mu=1.0, sigma=math.sqrt(5.0))`. The largest such expressions are computed only once
+and stored in module-level variables `_const0`, `_const1`, etc. The methods `gen_pdf`, `gen_prior_samples`, etc. then
+only refer to these variables. The constants are computed when the module is loaded, so that the names they refer to
+(such as `dist`) must be imported through `Options.model_imports`.
+
+Only calls of functions known to be pure are hoisted: the constructors of the distributions (`dist.Normal` etc.), the
+functions in `math`, and some numeric builtins. Anything else, such as `dist.Normal(...).sample()` or a call of a
+function we do not know, might return a different value on each call and is left in place.
+
+Subexpressions in the branches of a conditional expression are not hoisted, because they might not be defined if the
+branch is not taken (e.g., `math.log(0.0)`). Plain literals, names and lists are not hoisted: there is nothing to
+compute for them, and sharing a list between calls could leak modifications from one call to the next.
+"""
+import ast as py_ast
+from .foppl_distributions import distribution_params
+from .gradients import parse_expr, to_source
+
+
+def get_names(code: str) -> set:
+    """
+    Returns the set of all names in the given Python code (statement or expression).
+    """
+    try:
+        node = py_ast.parse(code.strip())
+    except SyntaxError:
+        return set()
+    return {n.id for n in py_ast.walk(node) if isinstance(n, py_ast.Name)}
+
+
+_hoistable_nodes = (py_ast.BinOp, py_ast.BoolOp, py_ast.Call, py_ast.Compare, py_ast.IfExp, py_ast.Subscript,
+                    py_ast.UnaryOp)
+
+_pure_builtins = {'abs', 'bool', 'float', 'int', 'len', 'max', 'min', 'pow', 'round', 'sum'}
+
+
+def is_pure_call(node: py_ast.Call) -> bool:
+    """
+    Returns `True` if the function called is known to be pure, i.e. always returns the same value for the same
+    arguments and has no side effects.
+    """
+    func = node.func
+    if isinstance(func, py_ast.Name):
+        return func.id in _pure_builtins
+    elif isinstance(func, py_ast.Attribute) and isinstance(func.value, py_ast.Name):
+        if func.value.id == 'math':
+            return True
+        elif func.value.id == 'dist':
+            return func.attr in distribution_params
+    return False
+
+
+class ConstantHoister(object):
+    """
+    Replaces constant subexpressions in the code of the vertices by module-level variables. The list `values` holds
+    the tuples `(name, code)` for all hoisted expressions, where equal expressions share the same variable.
+    """
+
+    def __init__(self, graph, prefix: str = '_const'):
+        self.graph = graph
+        self.prefix = prefix
+        self.values = []
+        self._names = {}
+
+    def is_constant(self, node) -> bool:
+        for n in py_ast.walk(node):
+            if isinstance(n, py_ast.Name) and n.id in self.graph.vertices:
+                return False
+            elif isinstance(n, (py_ast.Lambda, py_ast.ListComp, py_ast.GeneratorExp, py_ast.NamedExpr)):
+                return False
+            elif isinstance(n, py_ast.Call) and not is_pure_call(n):
+                return False
+        return True
+
+    def _is_literal(self, node) -> bool:
+        # Negative numbers are parsed as unary operations, but there is nothing to compute
+        return isinstance(node, py_ast.UnaryOp) and isinstance(node.operand, py_ast.Constant)
+
+    def _new_name(self, code: str) -> str:
+        if code not in self._names:
+            name = '{}{}'.format(self.prefix, len(self.values))
+            self._names[code] = name
+            self.values.append((name, code))
+        return self._names[code]
+
+    def _hoist(self, node):
+        """
+        Returns the new node together with a flag, whether anything has been hoisted.
+        """
+        if isinstance(node, _hoistable_nodes) and not self._is_literal(node) and self.is_constant(node):
+            return py_ast.Name(id=self._new_name(to_source(node)), ctx=py_ast.Load()), True
+        changed = False
+        # The branches of conditional expressions are evaluated lazily and must not be computed in advance
+        if isinstance(node, py_ast.IfExp):
+            node.test, changed = self._hoist(node.test)
+            return node, changed
+        elif isinstance(node, py_ast.BoolOp):
+            node.values[0], changed = self._hoist(node.values[0])
+            return node, changed
+        for field, value in py_ast.iter_fields(node):
+            if isinstance(value, py_ast.AST):
+                new_value, c = self._hoist(value)
+                setattr(node, field, new_value)
+                changed = changed or c
+            elif isinstance(value, list):
+                for i, item in enumerate(value):
+                    if isinstance(item, py_ast.AST):
+                        value[i], c = self._hoist(item)
+                        changed = changed or c
+        return node, changed
+
+    def hoist(self, code: str) -> str:
+        """
+        Returns the code with all constant subexpressions replaced by module-level variables, or the original code
+        if there is nothing to hoist (or the code cannot be handled).
+        """
+        names, values = dict(self._names), list(self.values)
+        try:
+            node = parse_expr(code)
+            node, changed = self._hoist(node)
+            if changed:
+                return to_source(node)
+        except (SyntaxError, NotImplementedError):
+            self._names, self.values = names, values
+        return code
@@ -7,21 +7,33 @@
 # 04. Jan 2018, Bradley Gram-Hansen
 #
 from importlib.abc import Loader as _Loader, MetaPathFinder as _MetaPathFinder
+from . import Options
 from .compiler import compile
 from .model_generator import Model_Generator
+from .statistics import CompileStatistics
+import builtins
+import linecache
 import sys
 
 _PATH = sys.path[0]
 
-def compile_module(module, input_text):
-    graph, expr = compile(input_text)
-    model_gen = Model_Generator(graph)
+def compile_module(module, input_text, context=None):
+    statistics = CompileStatistics()
+    graph, expr = compile(input_text, statistics, context)
+    model_gen = Model_Generator(graph, context=context)
     code = model_gen.generate_class()
-    exec(code, module.__dict__)
+    # We register the generated code with `linecache`, so that tracebacks and profiles can show its lines; use
+    # `model.get_source_line` to map them back to the lines of the FOPPL-source
+    filename = '<foppl {}>'.format(module.__name__)
+    linecache.cache[filename] = (len(code), None, code.splitlines(keepends=True), filename)
+    with statistics.phase('exec'):
+        exec(builtins.compile(code, filename, 'exec'), module.__dict__)
     module.graph = graph
     module.code = code
+    module.statistics = statistics
     if module.model:
         module.model.graph = graph
+    statistics.report((context.options if context is not None else Options).statistics_hooks)
     return module
 
 class Clojure_Loader(_Loader):
@@ -31,7 +43,7 @@ class Clojure_Loader(_Loader):
 
     def exec_module(self, module):
         with open(module.__name__) as input_file:
-            input_text = '\n'.join(input_file.readlines())
+            input_text = input_file.read()
             compile_module(module, input_text)
 
 class Clojure_Finder(_MetaPathFinder):
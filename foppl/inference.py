@@ -0,0 +1,239 @@
+#
+# This file is part of PyFOPPL, an implementation of a First Order Probabilistic Programming Language in Python.
+#
+# License: MIT (see LICENSE.txt)
+#
+# 19. Oct 2026
+#
+"""
+Importance sampling with the prior as proposal (likelihood weighting) over generated models.
+
+The model-class provides `gen_weighted_prior_samples()`, which samples all latent variables from the prior and
+returns the state together with the log-density of the observed values. The `ImportanceSampler` draws the samples in
+batches of fixed size and folds each batch into running sums. The sums are kept relative to the largest log-weight
+seen so far, so that the memory stays bounded and the weights do not underflow, independent of the number of
+particles. Only the log-weights are kept for all particles (8 bytes each, unless `keep_weights` is `False`), so that
+the result can provide the normalized weights.
+
+The generated model samples one particle at a time: each particle costs one call of `gen_weighted_prior_samples`
+(and of each function to estimate) in plain Python. Only the arithmetic on the weights and the weighted sums over a
+batch are vectorized (with numpy, if available).
+
+Example:
+    ```python
+    sampler = ImportanceSampler(my_model.model, batch_size=10000)
+    result = sampler.run(10**6, functions={'x': 'x20001', 'x_sq': lambda state: state['x20001'] ** 2})
+    print(result.estimates['x'], result.ess)
+    ```
+"""
+import array
+import math
+
+# Try to import `numpy` so that we can vectorize the computations over a batch
+try:
+    import numpy as np
+except ModuleNotFoundError:
+    np = None
+
+
+def _log_sum_exp(values):
+    m = max(values)
+    if m == -math.inf:
+        return -math.inf
+    return m + math.log(math.fsum([math.exp(v - m) for v in values]))
+
+
+def _scale(value, factor):
+    # The values of vector-valued functions are lists (or numpy arrays, which can be scaled directly)
+    if type(value) is list:
+        return [_scale(item, factor) for item in value]
+    return value * factor
+
+
+def _add(a, b):
+    if type(a) is list:
+        return [_add(x, y) for (x, y) in zip(a, b)]
+    return a + b
+
+
+def _weighted_sum(w: list, values: list):
+    """
+    Returns the sum of `w[i] * values[i]`, where the values are either all numbers, or all (nested) sequences of the
+    same shape. In the latter case, the result is a (nested) list.
+    """
+    if hasattr(values[0], '__len__'):
+        return [_weighted_sum(w, [v[j] for v in values]) for j in range(len(values[0]))]
+    return math.fsum([x * float(v) for (x, v) in zip(w, values)])
+
+
+class ImportanceResult(object):
+    """
+    The result of importance sampling.
+
+    `num_samples`:   The number of samples (particles) drawn.
+    `log_evidence`:  The estimate of the log marginal likelihood `log p(y)`.
+    `ess`:           The effective sample size `(sum w)^2 / sum w^2`.
+    `estimates`:     The weighted estimates (posterior expectations) for each of the functions.
+    `samples`:       If the samples were kept, the list of all states, otherwise `None`.
+    `log_weights`:   The (unnormalized) log-weights of all samples as an array of floats, or `None` if they were not
+                     kept.
+
+    The estimates of vector-valued functions are numpy arrays (or lists, if numpy is not available).
+    """
+
+    def __init__(self, num_samples, log_evidence, ess, estimates, samples=None, log_weights=None):
+        self.num_samples = num_samples
+        self.log_evidence = log_evidence
+        self.ess = ess
+        self.estimates = estimates
+        self.samples = samples
+        self.log_weights = log_weights
+
+    def __repr__(self):
+        return "ImportanceResult(num_samples={}, log_evidence={}, ess={}, estimates={})".format(
+            self.num_samples, self.log_evidence, self.ess, self.estimates)
+
+    @property
+    def weights(self):
+        """
+        The normalized weights of all samples (a numpy array, or a list if numpy is not available), or `None` if the
+        log-weights were not kept.
+        """
+        if self.log_weights is None or len(self.log_weights) == 0:
+            return None
+        if np is not None:
+            log_weights = np.asarray(self.log_weights, dtype=float)
+            m = np.max(log_weights)
+            if m == -math.inf:
+                return np.full(len(log_weights), math.nan)
+            w = np.exp(log_weights - m)
+            return w / np.sum(w)
+        total = _log_sum_exp(self.log_weights)
+        if total == -math.inf:
+            return [math.nan] * len(self.log_weights)
+        return [math.exp(w - total) for w in self.log_weights]
+
+
+class ImportanceSampler(object):
+    """
+    Runs likelihood weighting over a generated model in batches of `batch_size` samples.
+
+    The functions to estimate are given as a dictionary, mapping a name to either a function taking the state, or
+    the name of a variable in the state. Without any functions, the sampler estimates the posterior means of all
+    sampled variables (as returned by `gen_vars()`).
+    """
+
+    def __init__(self, model, batch_size: int = 10000):
+        if not hasattr(model, 'gen_weighted_prior_samples'):
+            raise TypeError("the model does not support likelihood weighting: '{}'".format(model))
+        self.model = model
+        self.batch_size = max(1, batch_size)
+
+    def _get_functions(self, functions):
+        if functions is None:
+            functions = {v: v for v in self.model.gen_vars()}
+        result = {}
+        for name in functions:
+            f = functions[name]
+            if type(f) is str:
+                result[name] = (lambda key: lambda state: state[key])(f)
+            elif callable(f):
+                result[name] = f
+            else:
+                raise TypeError("cannot estimate '{}': not a function or variable name".format(name))
+        return result
+
+    def sample_batch(self, size: int):
+        """
+        Draws `size` weighted samples from the model and returns the states and log-weights as two lists.
+        """
+        sample = self.model.gen_weighted_prior_samples
+        states = []
+        log_weights = []
+        for _ in range(size):
+            state, log_weight = sample()
+            states.append(state)
+            log_weights.append(float(log_weight))
+        return states, log_weights
+
+    def run(self, num_samples: int, functions: dict = None, keep_samples: bool = False, keep_weights: bool = True):
+        """
+        Draws `num_samples` weighted samples and returns an `ImportanceResult`.
+
+        :param num_samples:   The total number of samples (particles).
+        :param functions:     A dictionary with the functions to estimate (see class documentation). The functions
+                              may return numbers or vectors (sequences of numbers).
+        :param keep_samples:  If `True`, all states are kept and returned. Note that this requires memory
+                              proportional to the number of samples.
+        :param keep_weights:  If `True`, the log-weights of all samples are kept in a compact array (8 bytes per
+                              sample), so that the result can provide the normalized weights.
+        :return:              An `ImportanceResult`.
+        """
+        functions = self._get_functions(functions)
+        names = list(functions.keys())
+        # The running sums are all relative to `max_w`: sum_w = sum exp(w - max_w), etc.
+        max_w = -math.inf
+        sum_w = 0.0
+        sum_w2 = 0.0
+        # The weighted sums of the functions, which are `None` until the first batch shows their shape
+        sum_wf = {name: None for name in names}
+        all_states = [] if keep_samples else None
+        all_log_weights = array.array('d') if keep_samples or keep_weights else None
+
+        remaining = num_samples
+        while remaining > 0:
+            size = min(self.batch_size, remaining)
+            remaining -= size
+            states, log_weights = self.sample_batch(size)
+            if keep_samples:
+                all_states += states
+            if all_log_weights is not None:
+                all_log_weights.extend(log_weights)
+
+            batch_max = max(log_weights)
+            if batch_max == -math.inf:
+                continue
+            if batch_max > max_w:
+                if max_w > -math.inf:
+                    scale = math.exp(max_w - batch_max)
+                    sum_w *= scale
+                    sum_w2 *= scale * scale
+                    for name in names:
+                        if sum_wf[name] is not None:
+                            sum_wf[name] = _scale(sum_wf[name], scale)
+                max_w = batch_max
+
+            if np is not None:
+                w = np.exp(np.asarray(log_weights) - max_w)
+                sum_w += float(np.sum(w))
+                sum_w2 += float(np.dot(w, w))
+                for name in names:
+                    values = np.tensordot(w, np.asarray([functions[name](state) for state in states], dtype=float),
+                                          axes=1)
+                    sum_wf[name] = values if sum_wf[name] is None else sum_wf[name] + values
+            else:
+                w = [math.exp(lw - max_w) for lw in log_weights]
+                sum_w += math.fsum(w)
+                sum_w2 += math.fsum([x * x for x in w])
+                for name in names:
+                    f = functions[name]
+                    values = _weighted_sum(w, [f(state) for state in states])
+                    sum_wf[name] = values if sum_wf[name] is None else _add(sum_wf[name], values)
+
+        if sum_w > 0:
+            log_evidence = max_w + math.log(sum_w) - math.log(num_samples)
+            ess = sum_w * sum_w / sum_w2
+            estimates = {name: _scale(sum_wf[name], 1.0 / sum_w) for name in names}
+        else:
+            log_evidence = -math.inf
+            ess = 0.0
+            estimates = {name: math.nan for name in names}
+        return ImportanceResult(num_samples, log_evidence, ess, estimates, all_states, all_log_weights)
+
+
+def importance_sampling(model, num_samples: int, functions: dict = None, batch_size: int = 10000,
+                        keep_samples: bool = False, keep_weights: bool = True):
+    """
+    Runs likelihood weighting on the model. See `ImportanceSampler.run` for details.
+    """
+    return ImportanceSampler(model, batch_size).run(num_samples, functions, keep_samples, keep_weights)
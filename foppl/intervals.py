@@ -0,0 +1,281 @@
+#
+# This file is part of PyFOPPL, an implementation of a First Order Probabilistic Programming Language in Python.
+#
+# License: MIT (see LICENSE.txt)
+#
+# 19. Oct 2026
+#
+"""
+Static range analysis (abstract interpretation over intervals).
+
+The analysis computes, for an expression in the AST, an interval which is guaranteed to contain all values the
+expression can take. The ranges of samples are derived from the supports of their distributions: `exponential` and
+`gamma` samples are positive, `beta` samples lie in `(0, 1)`, `uniform a b` is bounded by `a` and `b`, and so on.
+The ranges are then propagated through arithmetic operations, `sqrt`, `exp`, `log`, etc.
+
+The optimizer uses the analysis to decide comparisons such as `(> x 0)` at compile time, if the ranges of both sides
+do not overlap. The unreachable branch of an `if` is then dropped entirely, together with its condition.
+
+An interval is always a safe over-approximation. In particular, it is always correct to treat an open bound as
+closed, which only means that fewer comparisons can be decided.
+"""
+import math
+from .foppl_ast import *
+
+
+class Interval(object):
+    """
+    An interval of real numbers from `lo` to `hi` (both may be infinite). The flags `lo_open` and `hi_open` indicate
+    whether the respective bound itself is excluded.
+    """
+
+    def __init__(self, lo=-math.inf, hi=math.inf, lo_open: bool = False, hi_open: bool = False):
+        self.lo = lo
+        self.hi = hi
+        self.lo_open = lo_open or math.isinf(lo)
+        self.hi_open = hi_open or math.isinf(hi)
+
+    def __repr__(self):
+        return "{}{}, {}{}".format('(' if self.lo_open else '[', self.lo, self.hi, ')' if self.hi_open else ']')
+
+    def __eq__(self, other):
+        return isinstance(other, Interval) and (self.lo, self.hi, self.lo_open, self.hi_open) == \
+               (other.lo, other.hi, other.lo_open, other.hi_open)
+
+    @classmethod
+    def point(cls, value):
+        return cls(value, value)
+
+    @property
+    def is_unbounded(self):
+        return math.isinf(self.lo) and math.isinf(self.hi)
+
+    def contains_zero(self):
+        return (self.lo < 0 or (self.lo == 0 and not self.lo_open)) and \
+               (self.hi > 0 or (self.hi == 0 and not self.hi_open))
+
+    def union(self, other):
+        if self.lo < other.lo:
+            lo, lo_open = self.lo, self.lo_open
+        elif other.lo < self.lo:
+            lo, lo_open = other.lo, other.lo_open
+        else:
+            lo, lo_open = self.lo, self.lo_open and other.lo_open
+        if self.hi > other.hi:
+            hi, hi_open = self.hi, self.hi_open
+        elif other.hi > self.hi:
+            hi, hi_open = other.hi, other.hi_open
+        else:
+            hi, hi_open = self.hi, self.hi_open and other.hi_open
+        return Interval(lo, hi, lo_open, hi_open)
+
+    def __neg__(self):
+        return Interval(-self.hi, -self.lo, self.hi_open, self.lo_open)
+
+    def __add__(self, other):
+        return Interval(self.lo + other.lo, self.hi + other.hi,
+                        self.lo_open or other.lo_open, self.hi_open or other.hi_open)
+
+    def __sub__(self, other):
+        return self + (-other)
+
+    def __mul__(self, other):
+        if other.lo == other.hi and other.lo > 0:
+            c = other.lo
+            return Interval(self.lo * c, self.hi * c, self.lo_open, self.hi_open)
+        if self.lo == self.hi and self.lo > 0:
+            return other * self
+        # By convention, `0 * inf = 0` here: the bounds are only limits
+        products = [a * b if a != 0 and b != 0 else 0.0 for a in [self.lo, self.hi] for b in [other.lo, other.hi]]
+        return Interval(min(products), max(products))
+
+    def reciprocal(self):
+        if self.contains_zero() or (self.lo == 0 and self.hi == 0):
+            return None
+        lo = 1.0 / self.hi if self.hi != 0 else -math.inf
+        hi = 1.0 / self.lo if self.lo != 0 else math.inf
+        return Interval(lo, hi)
+
+    def __truediv__(self, other):
+        r = other.reciprocal()
+        return self * r if r is not None else None
+
+    def apply_monotone(self, f, lo_limit=-math.inf):
+        """
+        Applies a monotonically increasing function to the interval. Bounds beyond the domain of `f` are replaced by
+        `lo_limit`.
+        """
+        def g(x, limit):
+            try:
+                return f(x)
+            except (ValueError, OverflowError):
+                return limit
+        return Interval(g(self.lo, lo_limit), g(self.hi, math.inf), self.lo_open, self.hi_open)
+
+    def compare(self, op: str, other):
+        """
+        Decides the comparison `self op other` for all values in the intervals. Returns `True` or `False` if the
+        result is the same for all values, and `None` otherwise.
+        """
+        d = self - other
+        if op == '>=':
+            if d.lo >= 0:
+                return True
+            if d.hi < 0 or (d.hi == 0 and d.hi_open):
+                return False
+        elif op == '>':
+            if d.lo > 0 or (d.lo == 0 and d.lo_open):
+                return True
+            if d.hi <= 0:
+                return False
+        elif op == '<=':
+            return (-d).compare('>=', Interval.point(0))
+        elif op == '<':
+            return (-d).compare('>', Interval.point(0))
+        elif op == '=':
+            if not d.contains_zero():
+                return False
+        return None
+
+
+_positive = Interval(0, math.inf, lo_open=True)
+_non_negative = Interval(0, math.inf)
+
+
+def _is_number(value):
+    return type(value) in [int, float]
+
+
+class RangeAnalysis(Walker):
+    """
+    Computes the range (an `Interval`) of an expression, or `None` if nothing is known about it. The ranges of
+    symbols are looked up in the compiler's scope, and the ranges of vertices in the compiler's `vertex_ranges`.
+    """
+
+    def __init__(self, compiler=None):
+        self.compiler = compiler
+
+    def range_of_vertex(self, name):
+        if self.compiler is not None and type(name) is str:
+            return self.compiler.vertex_ranges.get(name, None)
+        return None
+
+    def distribution_range(self, node: AstDistribution):
+        name = node.name
+        args = node.args
+        if name in ['Exponential', 'Gamma', 'LogNormal']:
+            return _positive
+        elif name == 'Beta':
+            return Interval(0, 1, True, True)
+        elif name == 'Poisson':
+            return _non_negative
+        elif name == 'Bernoulli':
+            return Interval(0, 1)
+        elif name == 'Categorical':
+            size = getattr(node, 'size', None)
+            if size is not None and size[0] > 0 and size[1] == 0:
+                return Interval(0, size[0] - 1)
+            return _non_negative
+        elif name in ['Normal', 'Cauchy']:
+            return Interval()
+        elif name == 'Uniform' and len(args) == 2:
+            a, b = args[0].walk(self), args[1].walk(self)
+            if a is not None and b is not None:
+                return Interval(a.lo, b.hi)
+            return Interval()
+        return None
+
+    def visit_node(self, node: Node):
+        return None
+
+    def visit_binary(self, node: AstBinary):
+        left = yield node.left
+        right = yield node.right
+        if left is None or right is None:
+            return None
+        if node.op == '+':
+            return left + right
+        elif node.op == '-':
+            return left - right
+        elif node.op == '*':
+            return left * right
+        elif node.op == '/':
+            return left / right
+        return None
+
+    def visit_call_exp(self, node: AstFunctionCall):
+        if len(node.args) == 1:
+            item = yield node.args[0]
+            if item is not None:
+                result = item.apply_monotone(math.exp, 0)
+                return Interval(result.lo, result.hi, True, result.hi_open)
+        return None
+
+    def visit_call_log(self, node: AstFunctionCall):
+        if len(node.args) == 1:
+            item = yield node.args[0]
+            if item is not None and item.lo >= 0:
+                return item.apply_monotone(math.log)
+        return None
+
+    def visit_call_sqrt(self, node: AstFunctionCall):
+        if len(node.args) == 1:
+            return (yield AstSqrt(node.args[0]))
+        return None
+
+    def visit_expr(self, node: AstExpr):
+        return self.range_of_vertex(node.expr)
+
+    def visit_if(self, node: AstIf):
+        if node.else_body is None:
+            return None
+        if_range = yield node.if_body
+        else_range = yield node.else_body
+        if if_range is not None and else_range is not None:
+            return if_range.union(else_range)
+        return None
+
+    def visit_sample(self, node: AstSample):
+        if isinstance(node.distribution, AstDistribution):
+            return self.distribution_range(node.distribution)
+        return None
+
+    def visit_sqrt(self, node: AstSqrt):
+        item = yield node.item
+        if item is not None:
+            return Interval(max(item.lo, 0), item.hi, item.lo_open and item.lo >= 0, item.hi_open).apply_monotone(
+                math.sqrt, 0)
+        return _non_negative
+
+    def visit_symbol(self, node: AstSymbol):
+        if self.compiler is not None:
+            result = self.compiler.scope.find_range(node.name)
+            if result is not None:
+                return result
+            symbol = self.compiler.scope.find_symbol(node.name)
+            if type(symbol) is tuple and len(symbol) == 2:
+                return self.range_of_vertex(symbol[1])
+        return None
+
+    def visit_unary(self, node: AstUnary):
+        if node.op == '-':
+            item = yield node.item
+            return -item if item is not None else None
+        elif node.op == '+':
+            return (yield node.item)
+        return None
+
+    def visit_value(self, node: AstValue):
+        if _is_number(node.value):
+            return Interval.point(node.value)
+        return None
+
+    def compare(self, op: str, left: Node, right: Node):
+        """
+        Tries to decide the comparison `left op right` statically. Returns `True`, `False` or `None`.
+        """
+        left = left.walk(self)
+        right = right.walk(self)
+        if left is None or right is None:
+            return None
+        return left.compare(op, right)
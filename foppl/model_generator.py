@@ -8,23 +8,88 @@
 #
 import datetime
 import importlib
+import re
+import time
 from .graphs import Graph
+from .boundaries import get_function_kinds
+from .conjugacy import find_conjugate_groups
+from .discrete_tables import alias_table, find_constant_categoricals, format_values, log_probability_table
+from .enumeration import plan_enumeration
+from .mvn_factors import find_constant_covariances
+from .factor_batching import batch_observed_factors
+from .gradients import GradientGenerator
+from .hoisting import ConstantHoister, get_names
 from .runtime_functions import runtime_functions
 from . import Options
 
+# Lines of generated code that compute a vertex `v` assign to either `v` or `dist_v`, or use `dist_v` (such as
+# `p10001 = dist_y20002.log_pdf(7.0)`)
+_assignment = re.compile(r'\s*(?:dist_)?([A-Za-z_]\w*)\s*[-+*/]?=(?!=)')
+_dist_reference = re.compile(r'\s*dist_([A-Za-z_]\w*)\.')
+
 class Model_Generator(object):
 
-    def __init__(self, graph: Graph, name: str = 'model'):
+    def __init__(self, graph: Graph, name: str = 'model', context=None):
+        start_time = time.perf_counter()
         self.graph = graph
         self.name = name
-        if Options.model_interface:
-            name, source = Options.model_interface
+        # The options of the compilation context (see `foppl.context`), or the global `Options`
+        self.options = context.options if context is not None else Options
+        if self.options.model_interface:
+            name, source = self.options.model_interface
         else:
             name, source = 'object', ''
         self.interface_name = name
         self.interface_source = source
-        self.imports = Options.model_imports.copy()
+        self.imports = self.options.model_imports.copy()
+        self.required_functions = set()
+        # Values to be computed once when the module is loaded, as a list of tuples `(name, code)`.
+        self.precomputed_values = []
+        # Latent variables, which are integrated out analytically, and their observed children
+        if self.options.marginalize_conjugates:
+            self.conjugate_groups = find_conjugate_groups(graph, self.options.conditional_suffix)
+        else:
+            self.conjugate_groups = []
+        self.collapsed_vars = {g.latent: g for g in self.conjugate_groups}
+        self.collapsed_children = {y: g for g in self.conjugate_groups for y in g.children}
+        if self.options.batch_factors:
+            self.factor_batches = batch_observed_factors(graph, exclude=self.collapsed_children)
+            if len(self.factor_batches) > 0 and 'import numpy as np' not in self.imports:
+                self.imports.append('import numpy as np')
+            for batch in self.factor_batches:
+                self.precomputed_values += batch.constants
+        else:
+            self.factor_batches = []
+        if self.options.enumerate_discrete:
+            self.enumeration_plan = plan_enumeration(graph, self.options.conditional_suffix)
+        else:
+            self.enumeration_plan = None
+        self.hoister = ConstantHoister(graph) if self.options.hoist_constants else None
+        self._hoisted_code = {}
+        self.discrete_tables = find_constant_categoricals(graph) if self.options.discrete_tables else {}
+        for v in self.discrete_tables:
+            ps = self.discrete_tables[v]
+            self.precomputed_values.append(('_logp_' + v, format_values(log_probability_table(ps))))
+            self.required_functions.add('table_log_pdf')
+            if not graph.is_observed_variable(v):
+                prob, alias = alias_table(ps)
+                self.precomputed_values.append(('_alias_' + v, format_values((prob, alias))))
+                self.required_functions.add('alias_sample')
+                if 'import random' not in self.imports:
+                    self.imports.append('import random')
+        self.mvn_factors = find_constant_covariances(graph) if self.options.cache_covariances else {}
+        for v in self.mvn_factors:
+            self.precomputed_values.append(('_mvn_' + v, 'mvn_factor({})'.format(self.mvn_factors[v][1])))
+            self.required_functions.update({'mvn_factor', 'mvn_sample', 'mvn_log_pdf'})
+            if 'import numpy as np' not in self.imports:
+                self.imports.append('import numpy as np')
+        # The keys `(method, name)` of the profiling counters in the generated code (see `_profile_checkpoint`)
+        self.profile_keys = []
+        if self.options.profile_models:
+            self.imports.append('from time import perf_counter as _perf_counter')
         self._output = None
+        if graph.statistics is not None:
+            graph.statistics.add_time('analyze', time.perf_counter() - start_time)
 
     def generate_class(self) -> str:
         """
@@ -34,7 +99,16 @@ class Model_Generator(object):
         """
         # We only generate the output if it has not yet been generated before.
         if self._output is None:
+            start_time = time.perf_counter()
             self.__generate_source()
+            statistics = self.graph.statistics
+            if statistics is not None:
+                statistics.add_time('generate', time.perf_counter() - start_time)
+                statistics.set_count('code_size', len(self._output))
+                # Statistics created by `compile` are reported here, so that the hooks see all the phases
+                if statistics.hooks is not None:
+                    hooks, statistics.hooks = statistics.hooks, None
+                    statistics.report(hooks)
         return self._output
 
     def generate_class_and_import(self, name: str):
@@ -66,16 +140,61 @@ class Model_Generator(object):
         self._output += '# Generated: {}\n'.format(datetime.datetime.now())
         self._output += '#\n'
 
-        # We add the imports, used functions and the header of the class...
+        # The class is generated first, as the methods might require additional runtime functions. We then add the
+        # imports, used functions and the class itself.
+        class_source = self.__generate_class_source()
         self._output += '\n'.join(self.imports)
         if len(self.interface_source) > 0:
             self._output += '\nfrom {} import {}'.format(self.interface_source, self.interface_name)
-        if len(self.graph.used_functions) > 0:
+        used_functions = set.union(self.graph.used_functions, self.required_functions)
+        if any([f in runtime_functions for f in used_functions]):
             self._output += '\n\n#Runtime functions:'
-            for f in self.graph.used_functions:
+            for f in sorted(used_functions):
                 if f in runtime_functions:
                     self._output += '\n' + runtime_functions[f]
-        self._output += '\n\nclass {name}({interface}):\n'.format(
+        # The hoisted constants are computed once, when the module is loaded (see `foppl.hoisting`)
+        precomputed_values = self.precomputed_values + (self.hoister.values if self.hoister is not None else [])
+        if self.options.profile_models:
+            precomputed_values = precomputed_values + [
+                ('_profile_keys', repr(self.profile_keys)),
+                ('_profile_counts', '[0] * {}'.format(len(self.profile_keys))),
+                ('_profile_times', '[0.0] * {}'.format(len(self.profile_keys)))
+            ]
+        if len(precomputed_values) > 0:
+            self._output += '\n\n#Precomputed values:'
+            for (name, code) in precomputed_values:
+                self._output += '\n{} = {}'.format(name, code)
+        self._output += class_source
+
+        # The source map takes the line numbers of the generated code to the lines in the FOPPL-source
+        self._output += '\n#Source map:\n_source_lines = {}\n'.format(self._generate_source_lines(self._output))
+        return self._output
+
+    def _generate_source_lines(self, code: str) -> str:
+        """
+        Returns a dictionary (as code) that maps the lines of the given code, which compute a vertex, to the lines
+        `(first, last)` in the original source the vertex stems from.
+        """
+        spans = self.graph.vertex_spans
+        result = []
+        for number, line in enumerate(code.split('\n'), 1):
+            match = _assignment.match(line)
+            if match:
+                v = match.group(1)
+                if v not in spans:
+                    match = _dist_reference.match(line, match.end())
+                    v = match.group(1) if match else None
+                if v in spans:
+                    result.append("{}: {}".format(number, repr(tuple(spans[v]))))
+        return "{{{}}}".format(', '.join(result))
+
+    def __generate_class_source(self):
+        """
+        Generates the source-code of the model-class itself, i.e. without the imports and runtime functions.
+
+        :return: A string containing the source code of the class.
+        """
+        output = '\n\nclass {name}({interface}):\n'.format(
             name = self.name,
             interface = self.interface_name
         )
@@ -83,7 +202,7 @@ class Model_Generator(object):
         # We add the doc-string, if there is any...
         docstring = self._generate_docstring()
         if docstring is not None and len(docstring) > 0:
-            self._output += '\t"""\n\t{}\n\t"""\n'.format(docstring.replace('\n', '\n\t'))
+            output += '\t"""\n\t{}\n\t"""\n'.format(docstring.replace('\n', '\n\t'))
 
         # We add all the vertices and edges of the graph to our model
         if self.graph:
@@ -98,29 +217,44 @@ class Model_Generator(object):
             #self._output += '\n\tdisc_dists = '
             #self._output += self.graph.get_discrete_distributions().replace('\n', '\n\t')
             #self._output += '\n'
-            self._output += self._format_method(name='get_vertices',
-                                                code='vertices = {}\n'.format(str(self.graph.vertices)) +
-                                                     'return list(vertices)')
-            self._output += self._format_method(name='get_arcs',
-                                                code='arcs = {}\n'.format(str(self.graph.arcs)) +
-                                                     'return list(arcs)')
-            self._output += self._format_method(name='get_discrete_distributions',
-                                                code='disc_dists = {}\n'.format(self.graph.get_discrete_distributions()) +
-                                                     'return disc_dists')
-            self._output += self._format_method(name='get_continuous_distributions',
-                                                code='cont_dists = {}\n'.format(self.graph.get_continuous_distributions()) +
-                                                     'return cont_dists')
-            self._output += self._format_method(name='get_cond_functions',
-                                                code='cond_functions = {}\n'.format(self.graph.get_conditional_functions()) +
-                                                     'return cond_functions')
-            self._output += self._format_method(name='get_dist_parameter_size', args='name',
-                                                code='dist_sizes = {}\n'.format(self.graph.get_distribution_sizes()) +
-                                                     'if name in dist_sizes:\n'
-                                                     '\treturn dist_sizes[name]\n'
-                                                     'else:\n'
-                                                     '\treturn None')
-            self._output += self._format_method(name='get_original_names',
-                                                code='return {}'.format(repr(self.graph.original_names)))
+            output += self._format_method(name='get_vertices',
+                                          code='vertices = {}\n'.format(str(self.graph.vertices)) +
+                                               'return list(vertices)')
+            output += self._format_method(name='get_arcs',
+                                          code='arcs = {}\n'.format(str(self.graph.arcs)) +
+                                               'return list(arcs)')
+            output += self._format_method(name='get_discrete_distributions',
+                                          code='disc_dists = {}\n'.format(
+                                              self.graph.get_discrete_distributions(self.collapsed_vars)) +
+                                               'return disc_dists')
+            output += self._format_method(name='get_continuous_distributions',
+                                          code='cont_dists = {}\n'.format(
+                                              self.graph.get_continuous_distributions(self.collapsed_vars)) +
+                                               'return cont_dists')
+            output += self._format_method(name='get_cond_functions',
+                                          code='cond_functions = {}\n'.format(self.graph.get_conditional_functions()) +
+                                               'return cond_functions')
+            output += self._format_method(name='get_cond_function_kinds',
+                                          code='return {}'.format(repr(get_function_kinds(self.graph))))
+            output += self._format_method(name='get_dist_parameter_size', args='name',
+                                          code='dist_sizes = {}\n'.format(self.graph.get_distribution_sizes()) +
+                                               'if name in dist_sizes:\n'
+                                               '\treturn dist_sizes[name]\n'
+                                               'else:\n'
+                                               '\treturn None')
+            output += self._format_method(name='get_vertex_types',
+                                          code='return {}'.format(self.graph.get_vertex_types()))
+            output += self._format_method(name='get_original_names',
+                                          code='return {}'.format(repr(self.graph.original_names)))
+            output += self._format_method(name='get_vertex_spans',
+                                          code='return {}'.format(self.graph.get_vertex_spans()))
+            output += self._format_method(name='get_source_line', args='line', code=[
+                '\"\"\"',
+                'Returns the lines `(first, last)` in the FOPPL-source, from which the given line of this module stems,',
+                'or `None` if the line cannot be attributed to a specific vertex.',
+                '\"\"\"',
+                'return _source_lines.get(line)'
+            ])
 
             # We go through the class and call each method that starts with '_gen_'. The methods are expected
             # to return a string with the code for a function or method to be included
@@ -134,9 +268,28 @@ class Model_Generator(object):
                             args = None
                             code = result
                         result = self._format_method(name=m[1:], args=args, code=code)
-                        self._output += result
-
-        return self._output
+                        output += result
+
+            if self.options.profile_models:
+                output += self._format_method(name='get_profile', code=[
+                    '"""',
+                    'Returns the number of executions and the cumulative time in seconds for each vertex or factor, as',
+                    'a dictionary `{method: {name: (count, seconds)}}`, where the name is the original name of the vertex',
+                    '(if any). Vertices with the same original name are added up.',
+                    '"""',
+                    'result = {}',
+                    'for (method, name), count, seconds in zip(_profile_keys, _profile_counts, _profile_times):',
+                    '\tc, t = result.setdefault(method, {}).get(name, (0, 0.0))',
+                    '\tresult[method][name] = (c + count, t + seconds)',
+                    'return result'
+                ])
+                output += self._format_method(name='reset_profile', code=[
+                    'for i in range(len(_profile_keys)):',
+                    '\t_profile_counts[i] = 0',
+                    '\t_profile_times[i] = 0.0'
+                ])
+
+        return output
 
     def _generate_docstring(self) -> str:
         """
@@ -183,8 +336,117 @@ class Model_Generator(object):
                 '\tdef {name}({args}):\n\t\t'
                 '{code}\n').format(name=name, args=args, code=code)
 
+    def _profile_start(self):
+        """
+        Returns the lines starting the time measurement at the beginning of a method, if profiling is enabled.
+        """
+        if self.options.profile_models:
+            return ["_pt0 = _perf_counter()"]
+        return []
+
+    def _profile_checkpoint(self, method: str, v: str):
+        """
+        Returns the lines adding the time since the last checkpoint (or the start) to the counters of the vertex or
+        factor `v` in the given method, if profiling is enabled. Otherwise, there is no code at all.
+        """
+        if not self.options.profile_models:
+            return []
+        index = len(self.profile_keys)
+        self.profile_keys.append((method, self.graph.original_names.get(v, v)))
+        return ["_pt1 = _perf_counter()",
+                "_profile_counts[{0}] += 1; _profile_times[{0}] += _pt1 - _pt0; _pt0 = _pt1".format(index)]
+
+    def _get_batched_vertices(self):
+        result = set()
+        for batch in self.factor_batches:
+            result.update(batch.vertices)
+        return result
+
+    def _get_code(self, v):
+        """
+        Returns the code for the vertex `v`, where constant subexpressions have been replaced by module-level
+        variables, if hoisting is enabled.
+        """
+        if self.hoister is None:
+            return self.graph.get_code_for_variable(v)
+        if v not in self._hoisted_code:
+            self._hoisted_code[v] = self.hoister.hoist(self.graph.get_code_for_variable(v))
+        return self._hoisted_code[v]
+
+    def _get_dist_code(self, v):
+        """
+        Returns the code that creates the distribution object `dist_v` for the vertex `v`, or `None` if the
+        distribution object is not needed.
+        """
+        if v in self.discrete_tables or v in self.mvn_factors:
+            return None
+        return "dist_{v} = {code}".format(v=v, code=self._get_code(v))
+
+    def _get_sample_code(self, v):
+        if v in self.discrete_tables:
+            return "alias_sample(*_alias_{})".format(v)
+        elif v in self.mvn_factors:
+            return "mvn_sample({}, _mvn_{})".format(self.mvn_factors[v][0], v)
+        return "dist_{}.sample()".format(v)
+
+    def _get_log_pdf_code(self, v, value):
+        if v in self.discrete_tables:
+            return "table_log_pdf(_logp_{}, {})".format(v, value)
+        elif v in self.mvn_factors:
+            return "mvn_log_pdf({}, {}, _mvn_{})".format(value, self.mvn_factors[v][0], v)
+        return "dist_{}.log_pdf({})".format(v, value)
+
+    def _get_conjugate_code(self, v, p_name=None):
+        """
+        Returns the code for a vertex, which is part of a conjugate group, or `None` otherwise. The latent variable
+        initialises the posterior state. The observations are scored by the posterior predictive density (assigned
+        to `p_name`, if given) and then update the posterior state.
+        """
+        if v in self.collapsed_vars:
+            return self.collapsed_vars[v].get_init_code()
+        elif v in self.collapsed_children:
+            group = self.collapsed_children[v]
+            result = ["{} = {}".format(v, self.graph.observed_values[v])]
+            if p_name is not None:
+                result.append("{} = {}".format(p_name, group.get_predictive_code(v, v)))
+            return result + group.get_update_code(v, v)
+        else:
+            return None
+
+    def _gen_query_samples(self):
+        # The code for each vertex and its parents are stored at module level, so that a sampler for the ancestors of
+        # any set of query vertices can be compiled when it is first needed.
+        graph = self.graph
+        if len(graph.vertices) == 0:
+            return None
+        parents = {v: set() for v in graph.vertices}
+        for (u, v) in graph.arcs:
+            parents[v].add(u)
+        code = []
+        for v in graph.sorted_var_list:
+            lines = self._get_prior_sample_code(v)
+            for line in lines:
+                parents[v].update(get_names(line).intersection(graph.vertices).difference({v}))
+            code.append((v, '\n'.join(lines)))
+        self.precomputed_values += [
+            ('_query_parents', repr({v: sorted(parents[v]) for v in sorted(parents)})),
+            ('_query_code', repr(code)),
+            ('_query_samplers', '{}')
+        ]
+        self.required_functions.add('query_sampler')
+        return 'query', [
+            '"""',
+            'Samples only the given query vertices and their ancestors from the prior, and returns their values as a',
+            'dictionary. The specialized sampler for each set of query vertices is compiled once and then cached.',
+            '"""',
+            'key = frozenset(query)',
+            'if key not in _query_samplers:',
+            '\t_query_samplers[key] = query_sampler(key, _query_parents, _query_code, globals())',
+            'return _query_samplers[key]()'
+        ]
+
     def _gen_vars(self):
-        V = self.graph.sampled_variables
+        V = self.graph.sampled_variables.difference(self.collapsed_vars)
         if len(V) > 0:
             return "return ['{}']".format("', '".join(sorted(list(V))))
         else:
@@ -208,7 +470,7 @@ class Model_Generator(object):
             return "return []"
 
     def _gen_cont_vars(self):
-        vars = self.graph.cont_vars.difference(self.graph.if_vars)
+        vars = self.graph.cont_vars.difference(self.graph.if_vars).difference(self.collapsed_vars)
         if len(vars) > 0:
             return "return ['{}']".format("', '".join(vars))
         else:
@@ -222,7 +484,7 @@ class Model_Generator(object):
             return "return []"
 
     def _gen_if_functions(self):
-        if Options.uniform_conditionals:
+        if self.options.uniform_conditionals:
             vars = [v for v in self.graph.if_vars if v.startswith("f")]
             if len(vars) > 0:
                 return "return ['{}']".format("', '".join(vars))
@@ -231,52 +493,213 @@ class Model_Generator(object):
         else:
             return None
 
+    def _gen_cond_crossing(self):
+        # The crossing times are only supported for conditional functions in the form `f >= 0`.
+        if len(get_function_kinds(self.graph)) == 0:
+            return None
+        self.required_functions.add('cond_crossing')
+        return 'name, state, direction, t_max=math.inf', [
+            '"""',
+            'Returns the smallest time `t` in `(0, t_max]`, at which the conditional function `name` changes its sign',
+            'along `state + t * direction`, or `None` if there is no such crossing. The direction is a dictionary',
+            'with entries for the continuous variables.',
+            '"""',
+            '_, degree = self.get_cond_function_kinds()[name]',
+            'return cond_crossing(self.get_cond_functions()[name], degree, state, direction, t_max)'
+        ]
+
+    def _gen_collapsed_vars(self):
+        if len(self.conjugate_groups) > 0:
+            return "return ['{}']".format("', '".join([g.latent for g in self.conjugate_groups]))
+        else:
+            return None
+
+    def _gen_conjugate_posteriors(self):
+        # Returns the posterior distributions of the collapsed variables, given the observations and the state.
+        if len(self.conjugate_groups) == 0:
+            return None
+        graph = self.graph
+        result = []
+        for v in graph.sorted_var_list:
+            code = graph.get_code_for_variable(v)
+            conjugate_code = self._get_conjugate_code(v)
+            if conjugate_code is not None:
+                result += conjugate_code
+            elif code.startswith('dist.'):
+                result.append("{v} = state['{v}']".format(v=v))
+            else:
+                result.append("{} = {}".format(v, self._get_code(v)))
+        result.append("return {{{}}}".format(', '.join(["'{}': {}".format(g.latent, g.get_posterior_code())
+                                                          for g in self.conjugate_groups])))
+        return 'state', '\n'.join(result)
+
+    def _gen_enumerated_vars(self):
+        plan = self.enumeration_plan
+        if plan is not None:
+            return "return ['{}']".format("', '".join(plan.order))
+        else:
+            return None
+
+    def _gen_marginal_pdf(self):
+        # Sums out all discrete latent variables with finite support by variable elimination. Each factor is
+        # evaluated by a local function taking the values of the enumerated variables in its scope.
+        graph = self.graph
+        plan = self.enumeration_plan
+        if plan is None:
+            return None
+        self.required_functions.add('variable_elimination')
+        result = []
+        factors = []
+        sorted_vars = graph.sorted_var_list
+        position = {v: i for i, v in enumerate(sorted_vars)}
+        for v in sorted_vars:
+            code = graph.get_code_for_variable(v)
+            if v in plan.supports:
+                continue
+            elif code.startswith('dist.'):
+                result.append("{v} = state['{v}']".format(v=v))
+            elif len(plan.scopes[v]) == 0:
+                result.append("{} = {}".format(v, self._get_code(v)))
+
+        for (v, scope) in plan.factors:
+            scope = sorted(scope, key=position.get)
+            value = graph.observed_values[v] if graph.is_observed_variable(v) else v
+            if self._get_dist_code(v) is None:
+                s = "return " + self._get_log_pdf_code(v, value)
+            else:
+                s = "return {}.log_pdf({})".format(self._get_code(v), value)
+            if v in graph.observed_conditions:
+                s += " if {} else 0".format(graph.observed_conditions[v])
+            result.append("def _factor_{}({}):".format(v, ', '.join(scope)))
+            for u in sorted(plan.derived[v], key=position.get):
+                result.append("\t{} = {}".format(u, self._get_code(u)))
+            result.append("\t" + s)
+            factors.append("({}, _factor_{})".format(repr(tuple(scope)), v))
+
+        result.append("factors = [\n\t{}\n]".format(',\n\t'.join(factors)))
+        result.append("supports = {}".format(repr(plan.supports)))
+        result.append("return variable_elimination(factors, supports, {})".format(repr(plan.order)))
+        return 'state', '\n'.join(result)
+
     def _gen_disc_vars(self):
-        vars = self.graph.disc_vars
+        vars = self.graph.disc_vars.difference(self.collapsed_vars)
         if len(vars) > 0:
             return "return ['{}']".format("', '".join(vars))
         else:
             return "return []"
 
-    def _gen_prior_samples(self):
+    def _get_prior_sample_code(self, v):
+        """
+        Returns the list of lines, which compute the vertex `v` when sampling from the prior.
+        """
         graph = self.graph
         result = []
+        if graph.get_code_for_variable(v).startswith('dist.'):
+            dist_code = self._get_dist_code(v)
+            if dist_code is not None:
+                result.append(dist_code)
+            if graph.is_observed_variable(v):
+                result.append("{} = {}".format(v, graph.observed_values[v]))
+            else:
+                result.append("{} = {}".format(v, self._get_sample_code(v)))
+        else:
+            result.append("{} = {}".format(v, self._get_code(v)))
+        return result
+
+    def _gen_prior_samples(self):
+        graph = self.graph
+        result = self._profile_start()
+        for v in graph.sorted_var_list:
+            result += self._get_prior_sample_code(v)
+            result += self._profile_checkpoint('gen_prior_samples', v)
+
+        result += [
+            "state = {}",
+            "for _gv in self.gen_all_keys():",
+            "\tstate[_gv] = locals()[_gv]",
+            "return state  # dictionary"
+        ]
+        return '\n'.join(result)
+
+    def _gen_weighted_prior_samples(self):
+        # Samples the latent variables from the prior and scores the observed values (likelihood weighting).
+        graph = self.graph
+        batched = self._get_batched_vertices()
+        result = self._profile_start()
+        p_vars = []
         for v in graph.sorted_var_list:
             code = graph.get_code_for_variable(v)
-            if code.startswith('dist.'):
-                result.append("dist_{v} = {code}".format(v=v, code=code))
+            conjugate_code = self._get_conjugate_code(v, "p_" + v)
+            if conjugate_code is not None:
+                result += conjugate_code
+                if v in self.collapsed_children:
+                    p_vars.append("p_" + v)
+            elif v in batched:
+                result.append("{} = {}".format(v, graph.observed_values[v]))
+            elif code.startswith('dist.'):
+                dist_code = self._get_dist_code(v)
+                if dist_code is not None:
+                    result.append(dist_code)
                 if graph.is_observed_variable(v):
                     result.append("{} = {}".format(v, graph.observed_values[v]))
+                    s = "p_{} = {}".format(v, self._get_log_pdf_code(v, v))
+                    if v in graph.observed_conditions:
+                        s += " if {} else 0".format(graph.observed_conditions[v])
+                    result.append(s)
+                    p_vars.append("p_" + v)
                 else:
-                    result.append("{v} = dist_{v}.sample()".format(v=v))
+                    result.append("{} = {}".format(v, self._get_sample_code(v)))
 
             else:
-                result.append("{} = {}".format(v, code))
+                result.append("{} = {}".format(v, self._get_code(v)))
+            result += self._profile_checkpoint('gen_weighted_prior_samples', v)
+
+        for batch in self.factor_batches:
+            result.append("p_batch{} = {}".format(batch.index, batch.code))
+            p_vars.append("p_batch{}".format(batch.index))
+            result += self._profile_checkpoint('gen_weighted_prior_samples', "batch{}".format(batch.index))
+
+        # The collapsed variables are sampled from their posterior, given all observations
+        for group in self.conjugate_groups:
+            result.append("{} = {}.sample()".format(group.latent, group.get_posterior_code()))
+            result += self._profile_checkpoint('gen_weighted_prior_samples', group.latent)
 
         result += [
             "state = {}",
             "for _gv in self.gen_all_keys():",
             "\tstate[_gv] = locals()[_gv]",
-            "return state  # dictionary"
+            "log_weight = {}".format(" + ".join(p_vars) if len(p_vars) > 0 else "0.0"),
+            "return state, log_weight"
         ]
         return '\n'.join(result)
 
     def _gen_pdf(self):
         graph = self.graph
+        batched = self._get_batched_vertices()
         p_index = 10000
-        result = []
+        result = self._profile_start()
         p_vars = []
         for v in graph.sorted_var_list:
             code = graph.get_code_for_variable(v)
-            if code.startswith('dist.'):
-                result.append("dist_{v} = {code}".format(v=v, code=code))
+            conjugate_code = self._get_conjugate_code(v, "p{}".format(p_index))
+            if conjugate_code is not None:
+                result += conjugate_code
+                if v in self.collapsed_children:
+                    p_vars.append("p{p_index}".format(p_index=p_index))
+                    p_index += 1
+            elif v in batched:
+                continue
+            elif code.startswith('dist.'):
+                dist_code = self._get_dist_code(v)
+                if dist_code is not None:
+                    result.append(dist_code)
                 if graph.is_observed_variable(v):
                     #result.append("{} = {}".format(v, graph.observed_values[v]))
                     result.append("{v} = state['{v}']".format(v=v))
-                    s = "p{p_index} = dist_{v}.log_pdf({w})".format(p_index=p_index, v=v, w=graph.observed_values[v])
+                    s = "p{} = {}".format(p_index, self._get_log_pdf_code(v, graph.observed_values[v]))
                 else:
                     result.append("{v} = state['{v}']".format(v=v))
-                    s = "p{p_index} = dist_{v}.log_pdf({v})".format(p_index=p_index, v=v)
+                    s = "p{} = {}".format(p_index, self._get_log_pdf_code(v, v))
                 if v in graph.observed_conditions:
                     s += " if {} else 0".format(graph.observed_conditions[v])
                 result.append(s)
@@ -284,7 +707,15 @@ class Model_Generator(object):
                 p_index += 1
 
             else:
-                result.append("{} = {}".format(v, code))
+                result.append("{} = {}".format(v, self._get_code(v)))
+            result += self._profile_checkpoint('gen_pdf', v)
+
+        # The batched factors only depend on vertices, which have all been computed by now
+        for batch in self.factor_batches:
+            result.append("p{p_index} = {code}".format(p_index=p_index, code=batch.code))
+            p_vars.append("p{p_index}".format(p_index=p_index))
+            p_index += 1
+            result += self._profile_checkpoint('gen_pdf', "batch{}".format(batch.index))
 
         # Let's get rid of values, which are computed but never used
         #while len(result) > 0 and not result[-1].startswith('p'):
@@ -298,3 +729,15 @@ class Model_Generator(object):
         else:
             result.append("return 0")
         return 'state', '\n'.join(result)
+
+    def _gen_pdf_grad(self):
+        # The gradient is only available if the entire log-joint can be differentiated.
+        if len(self.conjugate_groups) > 0:
+            return None
+        generator = GradientGenerator(self.graph, self.options.conditional_suffix)
+        try:
+            code = generator.generate()
+        except (NotImplementedError, SyntaxError):
+            return None
+        self.required_functions.update(generator.required_functions)
+        return 'state', '\n'.join(code)
@@ -0,0 +1,39 @@
+#
+# This file is part of PyFOPPL, an implementation of a First Order Probabilistic Programming Language in Python.
+#
+# License: MIT (see LICENSE.txt)
+#
+# 19. Oct 2026
+#
+"""
+Cached factorizations for multivariate normal distributions with a constant covariance matrix.
+
+After the optimizer has folded all constant expressions, the covariance matrix of a `MultivariateNormal` is either a
+literal matrix in the generated code, or depends on other vertices. In the first case, the Cholesky factor `L` (with
+`L L^T = covariance`), its inverse and the log-determinant are computed once when the generated module is loaded.
+Sampling is then `mu + L z` for a standard normal vector `z`, and scoring needs a single matrix-vector product
+`L^(-1) (x - mu)`, instead of a new factorization on every call.
+"""
+import ast as py_ast
+from .gradients import split_distribution, to_source
+
+
+def find_constant_covariances(graph) -> dict:
+    """
+    Returns a dictionary mapping all multivariate normal vertices with a literal covariance matrix to a tuple with
+    the code for the mean and the code for the covariance matrix.
+    """
+    result = {}
+    for v in graph.sorted_var_list:
+        try:
+            name, params = split_distribution(graph.get_code_for_variable(v))
+            if name != 'MultivariateNormal' or 'mu' not in params or 'covariance_matrix' not in params:
+                continue
+            matrix = py_ast.literal_eval(params['covariance_matrix'])
+        except (NotImplementedError, SyntaxError, ValueError):
+            continue
+        if type(matrix) is list and len(matrix) > 0 and \
+                all([type(row) is list and len(row) == len(matrix) for row in matrix]) and \
+                all([type(x) in [int, float] for row in matrix for x in row]):
+            result[v] = (to_source(params['mu']), repr(matrix))
+    return result
@@ -6,6 +6,7 @@
 # 24. Dec 2017, Tobias Kohn
 # 20. Jan 2018, Tobias Kohn
 #
+from types import GeneratorType
 from .foppl_ast import *
 from . import Options
 
@@ -16,12 +17,12 @@ class Scope(object):
         self.values = {}
 
     def find(self, name: str):
-        if name in self.values:
-            return self.values[name]
-        elif self.prev:
-            return self.prev.find(name)
-        else:
-            return None
+        scope = self
+        while scope is not None:
+            if name in scope.values:
+                return scope.values[name]
+            scope = scope.prev
+        return None
 
     def add(self, name: str, value):
         self.values[name] = value
@@ -73,12 +74,28 @@ class Optimizer(Walker):
         else:
             return None
 
+    def run(self, generator):
+        # The optimizer creates new nodes, which should still point to the lines in the source of the original ones
+        return trampoline(generator, self.__optimize, self.__keep_span)
+
+    def __optimize(self, node: Node):
+        result = node.get_handler(self)(self, node)
+        if type(result) is GeneratorType:
+            return result
+        return self.__keep_span(node, result)
+
+    @staticmethod
+    def __keep_span(node, result):
+        if isinstance(result, Node) and result.span is None:
+            result.span = node.span
+        return result
+
     def visit_node(self, node: Node):
         return node
 
     def visit_binary(self, node: AstBinary):
-        left = node.left.walk(self)
-        right = node.right.walk(self)
+        left = yield node.left
+        right = yield node.right
 
         if isinstance(left, AstValue) and isinstance(right, AstValue):
             if node.op in self.__binary_ops:
@@ -97,10 +114,12 @@ class Optimizer(Walker):
                (right.value == 1 and node.op in ['*', '/']):
                 return left
 
-        return node
+        return AstBinary(node.op, left, right)
 
     def visit_body(self, node: AstBody):
-        items = [n.walk(self) for n in node.body]
+        items = []
+        for n in node.body:
+            items.append((yield n))
         if len(items) == 1:
             return items[0]
         else:
@@ -108,8 +127,8 @@ class Optimizer(Walker):
 
     def visit_call_conj(self, node: AstFunctionCall):
         if len(node.args) == 2:
-            vector = node.args[0].walk(self)
-            item = node.args[1].walk(self)
+            vector = yield node.args[0]
+            item = yield node.args[1]
             if isinstance(vector, AstValue) and isinstance(item, AstValue) and type(vector.value) is list:
                 return AstValue(vector.value + [item])
             return AstFunctionCall(node.function, [vector, item])
@@ -117,8 +136,8 @@ class Optimizer(Walker):
 
     def visit_call_get(self, node: AstFunctionCall):
         if len(node.args) == 2:
-            vector = node.args[0].walk(self)
-            index = node.args[1].walk(self)
+            vector = yield node.args[0]
+            index = yield node.args[1]
             if isinstance(vector, AstValue) and isinstance(index, AstValue):
                 return AstValue(vector.value[int(index.value)])
             if isinstance(index, AstValue) and index.value == -1:
@@ -130,26 +149,28 @@ class Optimizer(Walker):
     def visit_call_map(self, node: AstFunctionCall):
         wrap = lambda x: x if isinstance(x, Node) else AstValue(x)
         if len(node.args) >= 2:
-            function = node.args[0].walk(self)
-            vectors = [arg.walk(self) for arg in node.args[1:]]
+            function = yield node.args[0]
+            vectors = []
+            for arg in node.args[1:]:
+                vectors.append((yield arg))
             if all([isinstance(v, AstValue) and type(v.value) is list for v in vectors]):
                 vectors = [[wrap(w) for w in v.value] for v in vectors]
                 vectors = list(zip(*vectors))
                 if all([all([isinstance(v, AstValue) for v in V]) for V in vectors]):
-                    return AstVector([AstFunctionCall(function, list(arg)) for arg in vectors]).walk(self)
+                    return (yield AstVector([AstFunctionCall(function, list(arg)) for arg in vectors]))
         return node
 
     def visit_call_rest(self, node: AstFunctionCall):
         if len(node.args) == 1:
-            vector = node.args[0].walk(self)
+            vector = yield node.args[0]
             if isinstance(vector, AstValue):
                 return AstValue(vector.value[1:])
             return AstFunctionCall(node.function, [vector])
         return node
 
     def visit_compare(self, node: AstCompare):
-        left = node.left.walk(self)
-        right = node.right.walk(self)
+        left = yield node.left
+        right = yield node.right
         if isinstance(left, AstValue) and isinstance(right, AstValue):
             op = node.op
             value_l = left.value
@@ -164,11 +185,19 @@ class Optimizer(Walker):
                 return AstValue(value_l <= value_r)
             elif op == '>=':
                 return AstValue(value_l >= value_r)
+
+        # The comparison might still be decidable from the ranges of the values (e.g., `x >= 0` for a gamma-sample `x`)
+        if self.compiler and self.compiler.range_analysis:
+            result = self.compiler.range_analysis.compare(node.op, left, right)
+            if result is not None:
+                return AstValue(result)
         return AstCompare(node.op, left, right)
 
     def visit_functioncall(self, node: AstFunctionCall):
         function = node.function
-        args = [arg.walk(self) for arg in node.args]
+        args = []
+        for arg in node.args:
+            args.append((yield arg))
         if all([isinstance(arg, AstValue) for arg in args]) and self.compiler:
             if isinstance(function, AstSymbol):
                 f = self.compiler.scope.find_function(function.name)
@@ -190,15 +219,17 @@ class Optimizer(Walker):
             return node
 
     def visit_if(self, node: AstIf):
-        cond = node.cond.walk(self)
-        if_body = node.if_body.walk(self)
-        else_body = node.else_body.walk(self) if node.else_body else None
+        cond = yield node.cond
+        if_body = yield node.if_body
+        else_body = (yield node.else_body) if node.else_body else None
 
         if isinstance(cond, AstValue) and type(cond.value) is bool:
             if cond.value:
                 return if_body
             elif else_body:
                 return else_body
+            else:
+                return AstValue(None)
 
         # We get rid of a `not` in an `if`-`else`-expression by swaping
         # the `if`- and `else`-parts.
@@ -210,19 +241,21 @@ class Optimizer(Walker):
 
     def visit_loop(self, node: AstLoop):
         if node.iter_count == 0:
-            return node.arg.walk(self)
+            return (yield node.arg)
         elif node.iter_count == 1:
             func = node.function.name if isinstance(node.function, AstSymbol) else node.function
             result = AstFunctionCall(func, [AstValue(0), node.arg] + node.args)
-            return result.walk(self)
+            return (yield result)
         else:
-            arg = node.arg.walk(self) if node.arg else None
-            args = [a.walk(self) for a in node.args]
+            arg = (yield node.arg) if node.arg else None
+            args = []
+            for a in node.args:
+                args.append((yield a))
             return AstLoop(node.iter_count, arg, node.function, args)
 
     def visit_sqrt(self, node: AstSqrt):
         from math import sqrt
-        item = node.item.walk(self)
+        item = yield node.item
 
         if isinstance(item, AstValue):
             value = item.value
@@ -233,7 +266,7 @@ class Optimizer(Walker):
 
         if isinstance(item, AstVector):
             node = AstVector([AstSqrt(x) for x in item.items])
-            return node.walk(self)
+            return (yield node)
 
         return AstSqrt(item)
 
@@ -260,9 +293,9 @@ class Optimizer(Walker):
         # reduce two applications of the same unary operation
         if isinstance(node.item, AstUnary) and node.op == node.item.op:
             if node.op in ['+', '-', 'not']:
-                return node.item.item.walk(self)
+                return (yield node.item.item)
 
-        item = node.item.walk(self)
+        item = yield node.item
         # plus-signs are redundant
         if node.op == '+':
             return item
@@ -283,7 +316,8 @@ class Optimizer(Walker):
 
         # simplify the patterns 'NOT COMPARISON', e.g. `not x < 0` to `x >= 0`
         elif isinstance(item, AstCompare) and node.op == 'not':
-            if Options.uniform_conditionals:
+            options = self.compiler.options if self.compiler is not None else Options
+            if options.uniform_conditionals:
                 if item.op == '<':
                     return AstCompare('>=', item.left, item.right)
                 elif item.op == '>':
@@ -295,7 +329,9 @@ class Optimizer(Walker):
         return AstUnary(node.op, item)
 
     def visit_vector(self, node: AstVector):
-        children = [child.walk(self) for child in node.get_children()]
+        children = []
+        for child in node.get_children():
+            children.append((yield child))
         if all(isinstance(child, AstValue) for child in children):
             return AstValue([child.value for child in children])
-        return node
\ No newline at end of file
+        return AstVector(children)
\ No newline at end of file
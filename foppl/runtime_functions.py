@@ -13,5 +13,152 @@ model generator then uses this dictionary to include the implementation for the
 generated.
 """
 runtime_functions = {
-    'conj': 'conj = lambda S, *I: S + list(I)'
-}
\ No newline at end of file
+    'conj': 'conj = lambda S, *I: S + list(I)',
+    'digamma': 'def digamma(x):\n'
+               '\tresult = 0.0\n'
+               '\twhile x < 6.0:\n'
+               '\t\tresult -= 1.0 / x\n'
+               '\t\tx += 1.0\n'
+               '\tf = 1.0 / (x * x)\n'
+               '\treturn result + math.log(x) - 0.5 / x - f * (1/12 - f * (1/120 - f * (1/252 - f * (1/240 - f / 132))))',
+    'cond_crossing': '''def cond_crossing(f, degree, state, direction, t_max=math.inf):
+	"""
+	Returns the smallest time `t` in `(0, t_max]`, at which `f(state + t * direction)` changes its sign, or `None`.
+	For a polynomial of known degree, we interpolate `f` along the line and only evaluate `f` at `degree+1` points.
+	"""
+	def at(t):
+		return f({k: (v + t * direction[k] if k in direction else v) for k, v in state.items()})
+	if degree == 0:
+		return None
+	f0 = at(0.0)
+	if degree == 1:
+		slope = at(1.0) - f0
+		t = -f0 / slope if slope != 0 else -1
+		return t if 0 < t <= t_max else None
+	if degree == 2:
+		f1, f2 = at(1.0), at(2.0)
+		a, b = (f2 - 2 * f1 + f0) / 2, (4 * f1 - 3 * f0 - f2) / 2
+		if a == 0:
+			roots = [-f0 / b] if b != 0 else []
+		else:
+			disc = b * b - 4 * a * f0
+			if disc < 0:
+				return None
+			q = -0.5 * (b + math.copysign(math.sqrt(disc), b))
+			roots = [q / a] + ([f0 / q] if q != 0 else [])
+		roots = [t for t in roots if 0 < t <= t_max]
+		return min(roots) if len(roots) > 0 else None
+	if degree is not None:
+		# Newton's divided differences on the points t = 0, 1, ..., degree
+		coeffs = [at(float(i)) for i in range(degree + 1)]
+		for j in range(1, degree + 1):
+			for i in range(degree, j - 1, -1):
+				coeffs[i] = (coeffs[i] - coeffs[i - 1]) / j
+		def g(t):
+			result = coeffs[-1]
+			for i in range(degree - 1, -1, -1):
+				result = result * (t - i) + coeffs[i]
+			return result
+	else:
+		g = at
+	# Bracket the first sign change with growing steps, then refine with the Illinois method.
+	step = min(t_max, 1.0) / 16
+	lo, g_lo, hi = 0.0, f0, step
+	for _ in range(256):
+		if lo >= t_max:
+			return None
+		hi = min(hi, t_max)
+		g_hi = g(hi)
+		if (g_lo >= 0) != (g_hi >= 0):
+			break
+		lo, g_lo, step = hi, g_hi, step * 2
+		hi = lo + step
+	else:
+		return None
+	side = 0
+	for _ in range(100):
+		t = (lo * g_hi - hi * g_lo) / (g_hi - g_lo)
+		g_t = g(t)
+		if (g_t >= 0) == (g_lo >= 0):
+			lo, g_lo = t, g_t
+			if side == -1:
+				g_hi /= 2
+			side = -1
+		else:
+			hi, g_hi = t, g_t
+			if side == 1:
+				g_lo /= 2
+			side = 1
+		if hi - lo < 1e-12 * max(1.0, hi):
+			break
+	return hi''',
+    'variable_elimination': '''def variable_elimination(factors, supports, order):
+	"""
+	Sums out the variables in `order` from the log-factors and returns the log of the total. Each factor is a tuple
+	`(scope, f)`, where `f` takes the values of the variables in `scope` and returns a log-density.
+	"""
+	def assignments(scope):
+		keys = [()]
+		for u in scope:
+			keys = [k + (x,) for k in keys for x in supports[u]]
+		return keys
+	tables = [(scope, {key: f(*key) for key in assignments(scope)}) for (scope, f) in factors]
+	for var in order:
+		related = [t for t in tables if var in t[0]]
+		tables = [t for t in tables if var not in t[0]]
+		scope = tuple(sorted({u for (s, _) in related for u in s if u != var}))
+		table = {}
+		for key in assignments(scope):
+			values = dict(zip(scope, key))
+			terms = []
+			for x in supports[var]:
+				values[var] = x
+				terms.append(sum([t[tuple([values[u] for u in s])] for (s, t) in related]))
+			m = max(terms)
+			table[key] = m if m == -math.inf else m + math.log(sum([math.exp(t - m) for t in terms]))
+		tables.append((scope, table))
+	return sum([t[()] for (_, t) in tables])''',
+    'alias_sample': '''def alias_sample(prob, alias):
+	u = random.random() * len(prob)
+	i = int(u)
+	return i if u - i < prob[i] else alias[i]''',
+    'table_log_pdf': '''def table_log_pdf(table, x):
+	"""
+	Returns the log-probability of the category `x` from the table, or `-inf` if `x` is not an integer in the support.
+	"""
+	i = int(x) if math.isfinite(x) else -1
+	return table[i] if i == x and 0 <= i < len(table) else -math.inf''',
+    'mvn_factor': '''def mvn_factor(covariance_matrix):
+	"""
+	Returns the Cholesky factor of the covariance matrix, its inverse, and the log-determinant of the covariance.
+	"""
+	chol = np.linalg.cholesky(np.asarray(covariance_matrix, dtype=float))
+	return chol, np.linalg.inv(chol), 2.0 * float(np.sum(np.log(np.diag(chol))))''',
+    'mvn_sample': '''def mvn_sample(mu, factor):
+	return np.asarray(mu, dtype=float) + factor[0].dot(np.random.standard_normal(len(factor[0])))''',
+    'mvn_log_pdf': '''def mvn_log_pdf(x, mu, factor):
+	y = factor[1].dot(np.asarray(x, dtype=float) - np.asarray(mu, dtype=float))
+	return -0.5 * (float(y.dot(y)) + factor[2] + len(y) * math.log(2.0 * math.pi))''',
+    'query_sampler': '''def query_sampler(query, parents, code, namespace):
+	"""
+	Compiles a function, which samples only the query vertices and all their ancestors (in the order given by `code`)
+	and returns their values as a dictionary.
+	"""
+	needed = set()
+	stack = list(query)
+	while len(stack) > 0:
+		v = stack.pop()
+		if v not in needed:
+			if v not in parents:
+				raise KeyError("unknown vertex: '{}'".format(v))
+			needed.add(v)
+			stack += parents[v]
+	lines = ['def _query_sampler():']
+	for (v, c) in code:
+		if v in needed:
+			lines += ['\\t' + line for line in c.split('\\n')]
+	lines.append('\\treturn {' + ', '.join(["'{0}': {0}".format(v) for v in sorted(needed)]) + '}')
+	scope = {}
+	exec('\\n'.join(lines), namespace, scope)
+	return scope['_query_sampler']''',
+}
@@ -0,0 +1,132 @@
+#
+# This file is part of PyFOPPL, an implementation of a First Order Probabilistic Programming Language in Python.
+#
+# License: MIT (see LICENSE.txt)
+#
+# 19. Oct 2026
+#
+"""
+Statistics about the compilation of a model.
+
+`compile` attaches a `CompileStatistics`-object to the graph it returns (`graph.statistics`), and `compile_module`
+(and thus the import hook for `.clj`-files) attaches it to the module (`module.statistics`). The statistics comprise
+the wall-clock time of each phase, counts of AST-nodes, vertices, arcs, graph merges and optimizer invocations, the
+size of the generated code, and the number of vertices created by each expansion of a function (`defn`/`fn`),
+`loop` or `map`.
+
+The phases are:
+    `tokenize`  reading the source into forms,
+    `parse`     parsing the forms into an AST,
+    `compile`   walking the AST with the compiler (this includes `optimize`),
+    `optimize`  the time spent in the optimizer during `compile`,
+    `analyze`   the analyses of the graph done by the `Model_Generator` (conjugacy, hoisting, etc.),
+    `generate`  generating the source code of the model,
+    `exec`      executing the generated code (`compile_module` only).
+
+Each function in `Options.statistics_hooks` is called with the statistics once the model has been generated
+(`Model_Generator.generate_class` for a graph returned by `compile`) or imported (`compile_module`), so that the
+hooks always see all phases, e.g., to export them to a metrics system:
+    ```python
+    Options.statistics_hooks.append(lambda stats: print(stats.as_dict()))
+    ```
+"""
+import time
+from contextlib import contextmanager
+from .foppl_ast import Node
+
+
+class CompileStatistics(object):
+    """
+    `phases` maps the name of each phase to its wall-clock time in seconds, `counters` maps the names of the
+    counters (such as `vertices` or `merges`) to their values, and `expansions` maps each pair `(kind, name)` of an
+    expanded function, `loop` or `map` to a list `[number of expansions, number of vertices created]`.
+
+    `hooks` are the hooks the statistics are still to be passed to once the model has been generated (set by `compile`
+    if it creates the statistics itself), or `None` if the caller reports the statistics.
+    """
+
+    def __init__(self):
+        self.phases = {}
+        self.counters = {}
+        self.expansions = {}
+        self.hooks = None
+
+    def __repr__(self):
+        lines = ["Phases:"]
+        lines += ["  {:<10} {:10.3f} ms".format(name, self.phases[name] * 1000) for name in self.phases]
+        lines.append("Counters:")
+        lines += ["  {:<14} {}".format(name, self.counters[name]) for name in self.counters]
+        if len(self.expansions) > 0:
+            lines.append("Expansions:")
+            lines += ["  {} {}: {} times, {} vertices".format(kind, name, count, vertices)
+                      for (kind, name), (count, vertices) in self.expansions.items()]
+        return '\n'.join(lines)
+
+    @contextmanager
+    def phase(self, name: str):
+        """
+        Measures the time of the code inside the `with`-block and adds it to the phase.
+        """
+        start = time.perf_counter()
+        try:
+            yield self
+        finally:
+            self.add_time(name, time.perf_counter() - start)
+
+    def add_time(self, name: str, seconds: float):
+        self.phases[name] = self.phases.get(name, 0.0) + seconds
+
+    def count(self, name: str, value: int = 1):
+        self.counters[name] = self.counters.get(name, 0) + value
+
+    def set_count(self, name: str, value: int):
+        self.counters[name] = value
+
+    def add_expansion(self, kind: str, name: str, vertices: int):
+        item = self.expansions.setdefault((kind, name), [0, 0])
+        item[0] += 1
+        item[1] += vertices
+
+    @property
+    def total_time(self):
+        # The optimizer runs as part of the compiler and is therefore not counted separately
+        return sum([self.phases[name] for name in self.phases if name != 'optimize'])
+
+    def as_dict(self) -> dict:
+        """
+        Returns the statistics as a (JSON-serializable) dictionary.
+        """
+        return {
+            'phases': dict(self.phases),
+            'total_time': self.total_time,
+            'counters': dict(self.counters),
+            'expansions': [{'kind': kind, 'name': name, 'count': count, 'vertices': vertices}
+                           for (kind, name), (count, vertices) in self.expansions.items()],
+        }
+
+    def report(self, hooks: list):
+        """
+        Passes the statistics to all hooks, i.e. the `statistics_hooks` of the options the model has been compiled with.
+        """
+        for hook in hooks:
+            hook(self)
+
+
+def count_nodes(root) -> int:
+    """
+    Returns the number of nodes in the AST. As not all nodes list all their parts in `get_children` (e.g., samples
+    or functions), we follow all the attributes (slots) of the nodes instead.
+    """
+    result = 0
+    stack = [root]
+    while len(stack) > 0:
+        item = stack.pop()
+        if isinstance(item, Node):
+            result += 1
+            for cls in type(item).__mro__:
+                for name in getattr(cls, '__slots__', ()):
+                    if name not in ('id', 'tag', 'span'):
+                        stack.append(getattr(item, name, None))
+        elif type(item) in (list, tuple):
+            stack.extend(item)
+    return result
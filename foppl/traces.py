@@ -0,0 +1,291 @@
+#
+# This file is part of PyFOPPL, an implementation of a First Order Probabilistic Programming Language in Python.
+#
+# License: MIT (see LICENSE.txt)
+#
+# 19. Oct 2026
+#
+"""
+A compact, column-oriented and memory-mapped store for sampled traces.
+
+Instead of keeping a list of state-dictionaries, the samples are written into a file with one column per variable.
+Each column is a contiguous block of `capacity * width` values (64-bit floats for continuous and 64-bit integers for
+discrete variables), so that writing a sample does not allocate any new objects and reading a column is a zero-copy
+view into the memory-mapped file.
+
+File layout:
+    ```
+    magic 'FOPPLTRC' | version (u32) | header size (u32) | capacity (u64) | count (u64) | schema (JSON) | columns...
+    ```
+
+Example:
+    ```python
+    schema = TraceSchema.from_graph(my_model.graph)
+    with TraceStore.create('trace.bin', schema) as store:
+        for _ in range(10**6):
+            store.append(my_model.model.gen_prior_samples())
+    with TraceStore.open('trace.bin') as store:
+        x = store.column('x20001')
+    ```
+"""
+import ast as py_ast
+import json
+import mmap
+import os
+import struct
+from .gradients import split_distribution
+
+# Try to import `numpy` so that we can return columns as arrays
+try:
+    import numpy as np
+except ModuleNotFoundError:
+    np = None
+
+
+_MAGIC = b'FOPPLTRC'
+_VERSION = 1
+_PREFIX = struct.Struct('<8sIIQQ')
+_COUNT_OFFSET = 24
+
+
+def _value_width(code: str):
+    """
+    Returns the number of values in a sample from the distribution given as `code`. Vector-valued distributions are
+    only supported if their parameter is a literal vector.
+    """
+    try:
+        name, params = split_distribution(code)
+    except (NotImplementedError, SyntaxError):
+        return 1
+    if name in ['Dirichlet', 'MultivariateNormal']:
+        param = params.get('alpha' if name == 'Dirichlet' else 'mu', None)
+        if isinstance(param, py_ast.List):
+            return len(param.elts)
+        raise ValueError("cannot determine the size of the samples from '{}'".format(code))
+    return 1
+
+
+class TraceSchema(object):
+    """
+    The schema is a list of columns, each given by a name, a type-code (`'d'` for float, `'q'` for integer) and the
+    number of values per sample (the width).
+    """
+
+    def __init__(self, columns: list):
+        self.columns = [(name, kind, int(width)) for (name, kind, width) in columns]
+        self.names = [c[0] for c in self.columns]
+        self.index = {c[0]: i for (i, c) in enumerate(self.columns)}
+
+    def __repr__(self):
+        return "TraceSchema({})".format(self.columns)
+
+    @property
+    def row_width(self):
+        return sum([c[2] for c in self.columns])
+
+    @classmethod
+    def from_graph(cls, graph, variables=None):
+        """
+        Creates the schema for all sampled variables of the graph (or the given subset). The width of vector-valued
+        variables is taken from their inferred types (see `foppl.type_inference`) if their length is known at
+        compile time, or else from the literal parameters and from the `distribution_sizes` of the graph.
+        """
+        if variables is None:
+            variables = sorted(graph.sampled_variables)
+        columns = []
+        for v in variables:
+            kind = 'q' if v in graph.disc_vars else 'd'
+            size = graph.distribution_sizes.get(v, None)
+            code = graph.get_code_for_variable(v)
+            value_type = graph.vertex_types.get(v, None)
+            if value_type is not None and value_type.kind == 'vector' and value_type.shape[0] is not None:
+                if value_type.item is not None:
+                    kind = 'q' if value_type.item in ['bool', 'int'] else 'd'
+                width = value_type.shape[0]
+            elif size is not None and size[1] > 0 and kind == 'q':
+                # A categorical with a matrix of probabilities yields one value per row
+                width = size[0]
+            else:
+                width = _value_width(code)
+            columns.append((v, kind, width))
+        return cls(columns)
+
+    def to_json(self):
+        return json.dumps(self.columns)
+
+    @classmethod
+    def from_json(cls, text):
+        return cls(json.loads(text))
+
+
+class TraceStore(object):
+    """
+    An append-only store for samples, backed by a memory-mapped file. Use `TraceStore.create` to create a new file,
+    and `TraceStore.open` to open an existing one.
+    """
+
+    def __init__(self, file, schema: TraceSchema, capacity: int, count: int, header_size: int, writable: bool):
+        self._file = file
+        self.schema = schema
+        self.capacity = capacity
+        self.count = count
+        self.header_size = header_size
+        self.writable = writable
+        self._mmap = None
+        self._views = None
+        self._map()
+
+    @classmethod
+    def create(cls, path: str, schema: TraceSchema, capacity: int = 1024):
+        capacity = max(1, capacity)
+        text = schema.to_json().encode('utf-8')
+        header_size = _PREFIX.size + len(text)
+        header_size += (-header_size) % 8
+        f = open(path, 'w+b')
+        f.write(_PREFIX.pack(_MAGIC, _VERSION, header_size, capacity, 0))
+        f.write(text.ljust(header_size - _PREFIX.size, b' '))
+        f.truncate(header_size + capacity * schema.row_width * 8)
+        f.flush()
+        return cls(f, schema, capacity, 0, header_size, True)
+
+    @classmethod
+    def open(cls, path: str, writable: bool = False):
+        f = open(path, 'r+b' if writable else 'rb')
+        magic, version, header_size, capacity, count = _PREFIX.unpack(f.read(_PREFIX.size))
+        if magic != _MAGIC or version != _VERSION:
+            f.close()
+            raise ValueError("'{}' is not a trace file".format(path))
+        schema = TraceSchema.from_json(f.read(header_size - _PREFIX.size).decode('utf-8'))
+        return cls(f, schema, capacity, count, header_size, writable)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+    def __len__(self):
+        return self.count
+
+    def _map(self):
+        access = mmap.ACCESS_WRITE if self.writable else mmap.ACCESS_READ
+        self._mmap = mmap.mmap(self._file.fileno(), 0, access=access)
+        memory = memoryview(self._mmap)
+        views = []
+        offset = self.header_size
+        for (_, kind, width) in self.schema.columns:
+            size = self.capacity * width * 8
+            views.append(memory[offset:offset+size].cast(kind))
+            offset += size
+        self._views = views
+
+    def _unmap(self):
+        # Arrays returned by `column` might still refer to the memory. In that case, the views and the mapping cannot
+        # be released explicitly; we drop them instead, and the mapping is closed once the last array is collected.
+        if self._views is not None:
+            for view in self._views:
+                try:
+                    view.release()
+                except BufferError:
+                    pass
+            self._views = None
+        if self._mmap is not None:
+            try:
+                self._mmap.close()
+            except BufferError:
+                pass
+            self._mmap = None
+
+    def _grow(self, capacity: int):
+        """
+        Enlarges the file to hold `capacity` samples. The columns are moved towards the end of the file, starting with
+        the last one, so that no column overwrites another one.
+        """
+        self._unmap()
+        old_capacity = self.capacity
+        self._file.truncate(self.header_size + capacity * self.schema.row_width * 8)
+        self.capacity = capacity
+        mm = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_WRITE)
+        try:
+            offsets = []
+            old_offset = new_offset = self.header_size
+            for (_, _, width) in self.schema.columns:
+                offsets.append((old_offset, new_offset, old_capacity * width * 8))
+                old_offset += old_capacity * width * 8
+                new_offset += capacity * width * 8
+            for (old_offset, new_offset, size) in reversed(offsets):
+                if old_offset != new_offset:
+                    mm.move(new_offset, old_offset, size)
+            mm[16:24] = struct.pack('<Q', capacity)
+        finally:
+            mm.close()
+        self._map()
+
+    def append(self, state: dict):
+        """
+        Appends one sample, given as a state-dictionary, to the store.
+        """
+        i = self.count
+        if i >= self.capacity:
+            self._grow(2 * self.capacity)
+        for (view, (name, kind, width)) in zip(self._views, self.schema.columns):
+            value = state[name]
+            if width == 1:
+                view[i] = int(value) if kind == 'q' else float(value)
+            else:
+                base = i * width
+                for j in range(width):
+                    view[base + j] = int(value[j]) if kind == 'q' else float(value[j])
+        self.count = i + 1
+
+    def append_row(self, values):
+        """
+        Appends one sample, given as a sequence of values in the order of the schema's columns (vector-valued
+        columns take a sequence).
+        """
+        self.append(dict(zip(self.schema.names, values)))
+
+    def flush(self):
+        if self.writable:
+            self._mmap[_COUNT_OFFSET:_COUNT_OFFSET+8] = struct.pack('<Q', self.count)
+            self._mmap.flush()
+
+    def close(self):
+        if self._file is not None:
+            self.flush()
+            self._unmap()
+            self._file.close()
+            self._file = None
+
+    def column(self, name: str):
+        """
+        Returns the values of the column `name` without copying: as a numpy-array of shape `(count,)` or
+        `(count, width)` if numpy is available, and as a memoryview otherwise. The view is only valid as long as the
+        store is open and has not grown: closing or growing the store does not fail, but the contents of the view are
+        undefined afterwards.
+        """
+        i = self.schema.index[name]
+        _, kind, width = self.schema.columns[i]
+        view = self._views[i][:self.count * width]
+        if np is not None:
+            array = np.frombuffer(view, dtype=np.float64 if kind == 'd' else np.int64)
+            return array.reshape((self.count, width)) if width > 1 else array
+        return view
+
+    def row(self, index: int) -> dict:
+        """
+        Returns the sample at the given index as a state-dictionary.
+        """
+        if not 0 <= index < self.count:
+            raise IndexError(index)
+        result = {}
+        for (view, (name, kind, width)) in zip(self._views, self.schema.columns):
+            if width == 1:
+                result[name] = view[index]
+            else:
+                result[name] = view[index*width:(index+1)*width].tolist()
+        return result
+
+    @property
+    def file_size(self):
+        return os.fstat(self._file.fileno()).st_size
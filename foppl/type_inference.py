@@ -0,0 +1,263 @@
+#
+# This file is part of PyFOPPL, an implementation of a First Order Probabilistic Programming Language in Python.
+#
+# License: MIT (see LICENSE.txt)
+#
+# 19. Oct 2026
+#
+"""
+Type and shape inference.
+
+The inference labels expressions (and, through the compiler, the vertices of the graph) with one of the types `bool`,
+`int`, `float`, `vector` or `matrix`. Vectors and matrices also carry their shape, as far as it is known at compile
+time, and the type of their elements.
+
+The types of samples are derived from their distributions: `categorical`, `poisson` and `bernoulli` samples are
+integers, `dirichlet` and `mvn` samples are vectors of the same length as their parameters, and so on. The types are
+then propagated through arithmetic operations, comparisons, `get`, `conj`, etc.
+
+If the type of an expression cannot be determined, the result is `None`. The types are metadata about the model
+(`get_vertex_types`), and give the sizes of the columns of a `TraceSchema` (see `foppl.traces`). The generated code
+does not rely on them: at runtime, the values of the vertices are taken from the state, where an `int`-vertex might
+as well hold a float or a tensor.
+"""
+from .foppl_ast import *
+
+
+class ValueType(object):
+    """
+    The type of a value: `kind` is one of `bool`, `int`, `float`, `vector` or `matrix`. For vectors and matrices,
+    `shape` is a tuple with the length of each dimension (`None` if unknown), and `item` is the name of the type of
+    the elements (`None` if unknown).
+    """
+
+    def __init__(self, kind: str, shape: tuple = (), item: str = None):
+        self.kind = kind
+        self.shape = shape
+        self.item = item
+
+    def __repr__(self):
+        if self.is_scalar:
+            return self.kind
+        shape = ', '.join(['?' if s is None else str(s) for s in self.shape])
+        return "{}[{}]{}".format(self.kind, shape, ' of ' + self.item if self.item else '')
+
+    def __eq__(self, other):
+        return isinstance(other, ValueType) and (self.kind, self.shape, self.item) == \
+               (other.kind, other.shape, other.item)
+
+    @property
+    def is_scalar(self):
+        return self.kind in _scalars
+
+    @property
+    def is_integral(self):
+        return self.kind in ['bool', 'int']
+
+    @property
+    def item_type(self):
+        """
+        The type of the value returned by `get` on this value, i.e. of a row for a matrix.
+        """
+        if self.kind == 'vector':
+            return ValueType(self.item) if self.item else None
+        elif self.kind == 'matrix':
+            return ValueType('vector', self.shape[1:], self.item)
+        return None
+
+    def to_tuple(self):
+        return self.kind, self.shape
+
+    def join(self, other):
+        """
+        Returns the most specific type, which comprises both this and the other type, or `None` if there is no
+        such type (e.g., for a scalar and a vector).
+        """
+        if other is None:
+            return None
+        if self == other:
+            return self
+        if self.is_scalar and other.is_scalar:
+            return ValueType(_join_scalars(self.kind, other.kind))
+        if self.kind == other.kind and len(self.shape) == len(other.shape):
+            shape = tuple([a if a == b else None for a, b in zip(self.shape, other.shape)])
+            item = _join_scalars(self.item, other.item) if self.item and other.item else None
+            return ValueType(self.kind, shape, item)
+        return None
+
+
+_scalars = ['bool', 'int', 'float']
+
+
+def _join_scalars(a: str, b: str):
+    return _scalars[max(_scalars.index(a), _scalars.index(b))]
+
+
+def vector_type(items: list):
+    """
+    Returns the type of a vector with elements of the given types. A vector of vectors is a matrix.
+    """
+    result = items[0] if len(items) > 0 else None
+    for t in items[1:]:
+        result = result.join(t) if result is not None and t is not None else None
+    if result is not None and result.is_scalar:
+        return ValueType('vector', (len(items),), result.kind)
+    elif result is not None and result.kind == 'vector':
+        return ValueType('matrix', (len(items),) + result.shape, result.item)
+    return ValueType('vector', (len(items),))
+
+
+def type_of_value(value):
+    """
+    Returns the type of a Python value, or `None` if the value cannot be represented by any `ValueType`.
+    """
+    if type(value) is bool:
+        return ValueType('bool')
+    elif type(value) is int:
+        return ValueType('int')
+    elif type(value) is float:
+        return ValueType('float')
+    elif type(value) in [list, tuple]:
+        return vector_type([type_of_value(v) for v in value])
+    return None
+
+
+class TypeInference(Walker):
+    """
+    Computes the type (a `ValueType`) of an expression, or `None` if it is not known. The types of symbols are
+    looked up in the compiler's scope, and the types of vertices in the graph they are bound to.
+    """
+
+    def __init__(self, compiler=None):
+        self.compiler = compiler
+
+    def distribution_type(self, node: AstDistribution):
+        name = node.name
+        args = node.args
+        if name in ['Bernoulli', 'Poisson', 'Discrete']:
+            return ValueType('int')
+        elif name == 'Categorical':
+            size = getattr(node, 'size', None)
+            if size is not None and size[1] > 0:
+                return ValueType('vector', (size[0],), 'int')
+            return ValueType('int')
+        elif name in ['Dirichlet', 'MultivariateNormal', 'Multinomial'] and len(args) > 0:
+            param = args[0].walk(self)
+            length = param.shape[0] if param is not None and param.kind == 'vector' else None
+            return ValueType('vector', (length,), 'int' if name == 'Multinomial' else 'float')
+        elif name in ['Dirichlet', 'MultivariateNormal', 'Multinomial']:
+            return ValueType('vector', (None,))
+        return ValueType('float')
+
+    def visit_node(self, node: Node):
+        return None
+
+    def visit_binary(self, node: AstBinary):
+        left = yield node.left
+        right = yield node.right
+        if left is None or right is None:
+            return None
+        if node.op in ['and', 'or', 'xor'] and left.kind == right.kind == 'bool':
+            return left
+        if left.is_scalar and right.is_scalar:
+            if node.op == '/':
+                return ValueType('float')
+            elif node.op == '**' and not (isinstance(node.right, AstValue) and node.right.value >= 0):
+                return ValueType('float')
+            return ValueType(_join_scalars(_join_scalars(left.kind, right.kind), 'int'))
+        return None
+
+    def visit_body(self, node: AstBody):
+        if len(node.body) > 0:
+            return (yield node.body[-1])
+        return None
+
+    def visit_call_conj(self, node: AstFunctionCall):
+        if len(node.args) == 2:
+            vector = yield node.args[0]
+            item = yield node.args[1]
+            if vector is not None and vector.kind == 'vector':
+                length = vector.shape[0] + 1 if vector.shape[0] is not None else None
+                if item is not None and item.is_scalar and vector.item:
+                    return ValueType('vector', (length,), _join_scalars(vector.item, item.kind))
+                return ValueType('vector', (length,))
+        return None
+
+    def visit_call_exp(self, node: AstFunctionCall):
+        return ValueType('float')
+
+    def visit_call_get(self, node: AstFunctionCall):
+        if len(node.args) == 2:
+            seq = yield node.args[0]
+            if seq is not None:
+                return seq.item_type
+        return None
+
+    def visit_call_log(self, node: AstFunctionCall):
+        return ValueType('float')
+
+    def visit_call_rest(self, node: AstFunctionCall):
+        if len(node.args) == 1:
+            seq = yield node.args[0]
+            if seq is not None and seq.kind in ['vector', 'matrix']:
+                length = max(seq.shape[0] - 1, 0) if seq.shape[0] is not None else None
+                return ValueType(seq.kind, (length,) + seq.shape[1:], seq.item)
+        return None
+
+    def visit_call_sqrt(self, node: AstFunctionCall):
+        return ValueType('float')
+
+    def visit_compare(self, node: AstCompare):
+        return ValueType('bool')
+
+    def visit_expr(self, node: AstExpr):
+        return node.graph.vertex_types.get(node.expr, None) if node.graph is not None else None
+
+    def visit_if(self, node: AstIf):
+        if node.else_body is None:
+            return None
+        if_type = yield node.if_body
+        else_type = yield node.else_body
+        if if_type is not None:
+            return if_type.join(else_type)
+        return None
+
+    def visit_observe(self, node: AstObserve):
+        if isinstance(node.distribution, AstDistribution):
+            return self.distribution_type(node.distribution)
+        return None
+
+    def visit_sample(self, node: AstSample):
+        if isinstance(node.distribution, AstDistribution):
+            return self.distribution_type(node.distribution)
+        return None
+
+    def visit_sqrt(self, node: AstSqrt):
+        return ValueType('float')
+
+    def visit_symbol(self, node: AstSymbol):
+        if self.compiler is not None:
+            result = self.compiler.scope.find_type(node.name)
+            if result is not None:
+                return result
+            symbol = self.compiler.scope.find_symbol(node.name)
+            if type(symbol) is tuple and len(symbol) == 2 and symbol[0] is not None:
+                return symbol[0].vertex_types.get(symbol[1], None)
+        return None
+
+    def visit_unary(self, node: AstUnary):
+        if node.op == 'not':
+            return ValueType('bool')
+        item = yield node.item
+        if item is not None and item.kind == 'bool':
+            return ValueType('int')
+        return item
+
+    def visit_value(self, node: AstValue):
+        return type_of_value(node.value)
+
+    def visit_vector(self, node: AstVector):
+        items = []
+        for item in node.get_children():
+            items.append((yield item))
+        return vector_type(items)
@@ -0,0 +1,70 @@
+#
+# This file is part of PyFOPPL, an implementation of a First Order Probabilistic Programming Language in Python.
+#
+# License: MIT (see LICENSE.txt)
+#
+# 19. Oct 2026
+#
+import random
+import types
+import unittest
+from foppl.context import CompilationContext
+from foppl.imports import compile_module
+
+# One conditional function of each kind: affine, quadratic, cubic and general (in this order)
+source = """
+(let [x (sample (normal 0.0 1.0))
+      y (sample (normal 0.0 1.0))]
+  (observe (normal (if (> (- (* 2.0 x) y) 1.0) 1.0 0.0) 1.0) 0.3)
+  (observe (normal (if (> (* x y) 0.5) 1.0 0.0) 1.0) 0.3)
+  (observe (normal (if (> (* x x x) 0.2) 1.0 0.0) 1.0) 0.3)
+  (observe (normal (if (> (exp y) 2.0) 1.0 0.0) 1.0) 0.3)
+  x)
+"""
+
+
+def first_sign_change(f, state, direction, t_max, steps=3000):
+    """
+    Scans `f` along the line and returns the interval of the grid, in which the sign first changes.
+    """
+    def at(t):
+        return f({k: v + t * direction.get(k, 0.0) for k, v in state.items()})
+    previous = at(0.0) >= 0
+    for i in range(1, steps + 1):
+        t = t_max * i / steps
+        if (at(t) >= 0) != previous:
+            return t_max * (i - 1) / steps, t
+    return None
+
+
+class TestConditionalCrossings(unittest.TestCase):
+
+    def setUp(self):
+        self.model = compile_module(types.ModuleType('test_model'), source,
+                                    CompilationContext(conditional_suffix='')).model
+        self.kinds = self.model.get_cond_function_kinds()
+        random.seed(5)
+
+    def test_kinds(self):
+        self.assertEqual(sorted(self.kinds.values(), key=lambda k: (k[1] is None, k[1])),
+                         [('affine', 1), ('polynomial', 2), ('polynomial', 3), ('general', None)])
+
+    def test_against_scan(self):
+        functions = self.model.get_cond_functions()
+        x, y = sorted(v for v in self.model.get_vertices() if v.startswith('x'))
+        for _ in range(25):
+            state = {x: random.uniform(-2, 2), y: random.uniform(-2, 2)}
+            direction = {x: random.uniform(-1, 1), y: random.uniform(-1, 1)}
+            for name in self.kinds:
+                t = self.model.gen_cond_crossing(name, state, direction, 3.0)
+                expected = first_sign_change(functions[name], state, direction, 3.0)
+                if expected is None:
+                    self.assertIsNone(t, name)
+                else:
+                    self.assertIsNotNone(t, name)
+                    self.assertGreaterEqual(t, expected[0] - 1e-9, name)
+                    self.assertLessEqual(t, expected[1] + 1e-9, name)
+
+
+if __name__ == '__main__':
+    unittest.main()
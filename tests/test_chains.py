@@ -0,0 +1,56 @@
+#
+# This file is part of PyFOPPL, an implementation of a First Order Probabilistic Programming Language in Python.
+#
+# License: MIT (see LICENSE.txt)
+#
+# 19. Oct 2026
+#
+import unittest
+from foppl import chains
+from foppl.context import CompilationContext
+
+# The model does not need the module `dist`: the multivariate normals use the cached Cholesky factors, and the
+# categorical the precomputed tables
+source = """
+(let [x (sample (mvn [0.0 0.0] [[1.0 0.0] [0.0 1.0]]))
+      k (sample (categorical [0.25 0.75]))]
+  (observe (mvn x [[1.0 0.0] [0.0 1.0]]) [1.0 -1.0])
+  [x k])
+"""
+
+
+@unittest.skipIf(chains.np is None or chains.shared_memory is None, "numpy or shared memory is not available")
+class TestChains(unittest.TestCase):
+
+    def setUp(self):
+        self.context = CompilationContext(cache_covariances=True, discrete_tables=True, conditional_suffix='',
+                                          hoist_constants=False)
+
+    def test_layout_and_round_trip(self):
+        result = chains.run_chains(source, 2, 50, burn_in=10, num_workers=2, seed=1, context=self.context)
+        x, k = result.variables
+        self.assertEqual(result.layout, [(x, 0, 2), (k, 2, 1)])
+        self.assertEqual(result.samples.shape, (2, 50, 3))
+        self.assertEqual(result[x].shape, (2, 50, 2))
+        self.assertEqual(result[k].shape, (2, 50))
+        # The samples written by the workers into the shared memory arrive in the result
+        self.assertTrue((result[x] != 0).all())
+        self.assertTrue(set(result[k].flatten()).issubset({0.0, 1.0}))
+        for rate in result.acceptance:
+            self.assertTrue(0 < rate <= 1)
+        again = chains.run_chains(source, 2, 50, burn_in=10, num_workers=2, seed=1, context=self.context)
+        self.assertTrue((again.samples == result.samples).all())
+
+    def test_options_without_hooks(self):
+        context = CompilationContext(self.context.options, statistics_hooks=[lambda stats: None])
+        options = chains._get_options(context)
+        self.assertNotIn('statistics_hooks', options)
+        self.assertTrue(options['cache_covariances'])
+
+    def test_namespace(self):
+        model, _ = chains._compile_model(source, self.context, {'marker': 42})
+        self.assertEqual(model.gen_pdf.__func__.__globals__['marker'], 42)
+
+
+if __name__ == '__main__':
+    unittest.main()
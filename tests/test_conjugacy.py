@@ -0,0 +1,77 @@
+#
+# This file is part of PyFOPPL, an implementation of a First Order Probabilistic Programming Language in Python.
+#
+# License: MIT (see LICENSE.txt)
+#
+# 19. Oct 2026
+#
+import math
+import types
+import unittest
+from foppl.context import CompilationContext
+from foppl.conjugacy import find_conjugate_groups
+from foppl.imports import compile_module
+
+# Three independent conjugate pairs: Normal-Normal (the normals take the variance as second argument), Gamma-Poisson
+# and Beta-Bernoulli. With all latent variables collapsed, `gen_pdf` is the marginal likelihood of the observations.
+source = """
+(let [z (sample (normal 1.0 4.0))
+      r (sample (gamma 2.0 1.5))
+      p (sample (beta 2.0 3.0))]
+  (observe (normal z 1.0) 0.5)
+  (observe (normal z 1.0) 2.5)
+  (observe (normal z 1.0) 1.7)
+  (observe (poisson r) 3)
+  (observe (poisson r) 1)
+  (observe (bernoulli p) 1)
+  (observe (bernoulli p) 0)
+  (observe (bernoulli p) 1)
+  z)
+"""
+
+
+def integrate(f, a, b, n=4000):
+    """
+    Simpson's rule with `n` (even) intervals.
+    """
+    h = (b - a) / n
+    total = f(a) + f(b)
+    for i in range(1, n):
+        total += (4 if i % 2 == 1 else 2) * f(a + i * h)
+    return total * h / 3
+
+
+def normal_pdf(x, mu, sigma):
+    return math.exp(-0.5 * ((x - mu) / sigma) ** 2) / (sigma * math.sqrt(2 * math.pi))
+
+
+def marginal_likelihood():
+    normal = integrate(lambda z: normal_pdf(z, 1.0, 2.0) * normal_pdf(0.5, z, 1.0) * normal_pdf(2.5, z, 1.0) *
+                       normal_pdf(1.7, z, 1.0), -20.0, 20.0)
+    poisson = integrate(lambda r: 1.5 ** 2 * r * math.exp(-1.5 * r) / math.gamma(2.0) *
+                        r ** 3 * math.exp(-r) / 6 * r * math.exp(-r), 0.0, 40.0)
+    bernoulli = integrate(lambda p: p * (1 - p) ** 2 / (math.gamma(2.0) * math.gamma(3.0) / math.gamma(5.0)) *
+                          p * (1 - p) * p, 0.0, 1.0)
+    return math.log(normal) + math.log(poisson) + math.log(bernoulli)
+
+
+class TestConjugacy(unittest.TestCase):
+
+    def setUp(self):
+        context = CompilationContext(marginalize_conjugates=True, conditional_suffix='')
+        result = compile_module(types.ModuleType('test_model'), source, context)
+        self.model = result.model
+        self.graph = result.graph
+
+    def test_groups(self):
+        groups = find_conjugate_groups(self.graph, '')
+        self.assertEqual(sorted([(g.family.prior, len(g.children)) for g in groups]),
+                         [('Beta', 3), ('Gamma', 2), ('Normal', 3)])
+        self.assertEqual(self.model.gen_vars(), [])
+
+    def test_marginal_against_quadrature(self):
+        self.assertAlmostEqual(self.model.gen_pdf({}), marginal_likelihood(), places=6)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,54 @@
+#
+# This file is part of PyFOPPL, an implementation of a First Order Probabilistic Programming Language in Python.
+#
+# License: MIT (see LICENSE.txt)
+#
+# 19. Oct 2026
+#
+import math
+import types
+import unittest
+from foppl.context import CompilationContext
+from foppl.discrete_tables import alias_table
+from foppl.imports import compile_module
+
+
+def compile_model(source, **options):
+    context = CompilationContext(conditional_suffix='', **options)
+    return compile_module(types.ModuleType('test_model'), source, context).model
+
+
+class TestDiscreteTables(unittest.TestCase):
+
+    def setUp(self):
+        self.model = compile_model("(let [z (sample (categorical [0.5 0.5]))] "
+                                   "(observe (categorical [0.2 0.3 0.5]) z) z)", discrete_tables=True)
+        self.z = self.model.graph.sorted_var_list[0]
+
+    def log_pdf(self, value):
+        state = self.model.gen_prior_samples()
+        state[self.z] = value
+        return self.model.gen_pdf(state)
+
+    def test_log_pdf_in_support(self):
+        self.assertAlmostEqual(self.log_pdf(1), math.log(0.5) + math.log(0.3))
+        self.assertAlmostEqual(self.log_pdf(1.0), math.log(0.5) + math.log(0.3))
+
+    def test_log_pdf_outside_support(self):
+        # The observation has three categories, the latent variable only two
+        for value in [-1, -3, 2, 3, 0.5, math.inf, math.nan]:
+            self.assertEqual(self.log_pdf(value), -math.inf, value)
+
+    def test_alias_table(self):
+        ps = [0.1, 0.0, 0.6, 0.3]
+        prob, alias = alias_table(ps)
+        # Each category gets its probability from its own column and the columns it is the alias of
+        mass = [p / len(ps) for p in prob]
+        for i in range(len(ps)):
+            mass[alias[i]] += (1.0 - prob[i]) / len(ps)
+        for p, q in zip(ps, mass):
+            self.assertAlmostEqual(p, q)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,53 @@
+#
+# This file is part of PyFOPPL, an implementation of a First Order Probabilistic Programming Language in Python.
+#
+# License: MIT (see LICENSE.txt)
+#
+# 19. Oct 2026
+#
+import itertools
+import math
+import types
+import unittest
+from foppl.context import CompilationContext
+from foppl.imports import compile_module
+
+# The first observed value is the latent variable `k` itself, the mean of the second one depends on `k` and `j`
+source = """
+(let [k (sample (categorical [0.2 0.3 0.5]))
+      j (sample (categorical [0.5 0.5]))]
+  (observe (categorical [0.6 0.3 0.1]) k)
+  (observe (mvn [k j] [[1.0 0.0] [0.0 1.0]]) [1.0 2.0])
+  k)
+"""
+
+
+def compile_model(source, **options):
+    context = CompilationContext(discrete_tables=True, cache_covariances=True, conditional_suffix='', **options)
+    return compile_module(types.ModuleType('test_model'), source, context).model
+
+
+def brute_force_marginal():
+    total = 0.0
+    for (k, j) in itertools.product(range(3), range(2)):
+        normal = math.exp(-0.5 * ((1.0 - k) ** 2 + (2.0 - j) ** 2)) / (2 * math.pi)
+        total += [0.2, 0.3, 0.5][k] * 0.5 * [0.6, 0.3, 0.1][k] * normal
+    return math.log(total)
+
+
+class TestEnumeration(unittest.TestCase):
+
+    def test_marginal_against_brute_force(self):
+        model = compile_model(source, enumerate_discrete=True)
+        self.assertEqual(len(model.gen_enumerated_vars()), 2)
+        # The marginal does not depend on the values of the enumerated variables in the state
+        for _ in range(5):
+            self.assertAlmostEqual(model.gen_marginal_pdf(model.gen_prior_samples()), brute_force_marginal())
+
+    def test_disabled_by_default(self):
+        model = compile_model(source)
+        self.assertFalse(hasattr(model, 'gen_marginal_pdf'))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,65 @@
+#
+# This file is part of PyFOPPL, an implementation of a First Order Probabilistic Programming Language in Python.
+#
+# License: MIT (see LICENSE.txt)
+#
+# 19. Oct 2026
+#
+import math
+import random
+import types
+import unittest
+import numpy as np
+from foppl.context import CompilationContext
+from foppl.factor_batching import batch_observed_factors
+from foppl.imports import compile_module
+
+# The multivariate normal uses the cached Cholesky factor, so that `gen_pdf` only consists of the batched factors
+# and does not need any distribution objects. The normals take the variance as their second argument.
+source = """
+(let [x (sample (mvn [0.0 0.0] [[1.0 0.0] [0.0 1.0]]))
+      a (get x 0)
+      b (get x 1)]
+  (observe (normal (* a 0.5) 1.0) 0.1)
+  (observe (normal (* a 1.5) 1.0) -0.4)
+  (observe (normal (* a 2.5) 1.0) 1.2)
+  (observe (normal (+ b 1.0) 2.0) 0.7)
+  (observe (normal (+ b -1.0) 2.0) 0.2)
+  x)
+"""
+
+
+def log_normal(x, mu, sigma):
+    return -0.5 * ((x - mu) / sigma) ** 2 - math.log(sigma) - 0.5 * math.log(2 * math.pi)
+
+
+def log_joint(a, b):
+    result = log_normal(a, 0.0, 1.0) + log_normal(b, 0.0, 1.0)
+    result += sum([log_normal(y, a * c, 1.0) for (y, c) in [(0.1, 0.5), (-0.4, 1.5), (1.2, 2.5)]])
+    result += sum([log_normal(y, b + c, math.sqrt(2.0)) for (y, c) in [(0.7, 1.0), (0.2, -1.0)]])
+    return result
+
+
+class TestFactorBatching(unittest.TestCase):
+
+    def setUp(self):
+        context = CompilationContext(cache_covariances=True, batch_factors=True, conditional_suffix='')
+        result = compile_module(types.ModuleType('test_model'), source, context)
+        self.model = result.model
+        self.graph = result.graph
+        random.seed(7)
+
+    def test_batches(self):
+        batches = batch_observed_factors(self.graph)
+        self.assertEqual(sorted([len(batch.vertices) for batch in batches]), [2, 3])
+
+    def test_against_unbatched_density(self):
+        # `log_joint` scores each observation on its own
+        x = self.model.gen_vars()[0]
+        for _ in range(10):
+            a, b = random.uniform(-2, 2), random.uniform(-2, 2)
+            self.assertAlmostEqual(self.model.gen_pdf({x: np.array([a, b])}), log_joint(a, b))
+
+
+if __name__ == '__main__':
+    unittest.main()
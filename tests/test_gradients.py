@@ -0,0 +1,75 @@
+#
+# This file is part of PyFOPPL, an implementation of a First Order Probabilistic Programming Language in Python.
+#
+# License: MIT (see LICENSE.txt)
+#
+# 19. Oct 2026
+#
+import math
+import random
+import types
+import unittest
+from foppl.context import CompilationContext
+from foppl.imports import compile_module
+
+# The normal takes the variance as its second argument. The second observation has a branch on `x`, and the value
+# of the third observation depends on `x`.
+source = """
+(let [x (sample (normal 0.0 1.0))
+      s (sample (gamma 2.0 1.0))
+      b (sample (beta 2.0 3.0))]
+  (observe (normal (* x b) s) 1.5)
+  (observe (normal (if (> x 0) (exp x) (- x)) 1.0) 0.3)
+  (observe (exponential s) (+ x 2.0))
+  x)
+"""
+
+
+def log_normal(x, mu, sigma):
+    return -0.5 * ((x - mu) / sigma) ** 2 - math.log(sigma) - 0.5 * math.log(2 * math.pi)
+
+
+def log_joint(x, s, b):
+    return (log_normal(x, 0.0, 1.0) + math.log(s) - s +
+            math.log(b) + 2 * math.log(1 - b) - math.lgamma(2.0) - math.lgamma(3.0) + math.lgamma(5.0) +
+            log_normal(1.5, x * b, math.sqrt(s)) +
+            log_normal(0.3, math.exp(x) if x > 0 else -x, 1.0) +
+            math.log(s) - s * (x + 2.0))
+
+
+class TestGradients(unittest.TestCase):
+
+    def setUp(self):
+        # `gen_pdf_grad` expands the densities in closed form and does not need the distribution objects
+        result = compile_module(types.ModuleType('test_model'), source, CompilationContext(conditional_suffix=''))
+        self.model = result.model
+        self.x, self.s, self.b = sorted(result.graph.cont_vars)
+        self.observed = sorted(result.graph.observed_values.keys())
+        random.seed(3)
+
+    def log_pdf_grad(self, x, s, b):
+        state = {self.x: x, self.s: s, self.b: b}
+        for y in self.observed:
+            state[y] = None
+        return self.model.gen_pdf_grad(state)
+
+    def test_against_finite_differences(self):
+        h = 1e-6
+        for _ in range(20):
+            point = [random.uniform(-1.5, 0.5), random.uniform(0.5, 3.0), random.uniform(0.1, 0.9)]
+            logp, grad = self.log_pdf_grad(*point)
+            self.assertAlmostEqual(logp, log_joint(*point))
+            for i, v in enumerate([self.x, self.s, self.b]):
+                upper, lower = list(point), list(point)
+                upper[i] += h
+                lower[i] -= h
+                estimate = (self.log_pdf_grad(*upper)[0] - self.log_pdf_grad(*lower)[0]) / (2 * h)
+                self.assertAlmostEqual(grad[v], estimate, delta=1e-5 * max(1.0, abs(estimate)))
+
+    def test_outside_of_support(self):
+        logp, grad = self.log_pdf_grad(0.5, 1.0, 1.5)
+        self.assertEqual(logp, -math.inf)
+
+
+if __name__ == '__main__':
+    unittest.main()
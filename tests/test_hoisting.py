@@ -0,0 +1,60 @@
+#
+# This file is part of PyFOPPL, an implementation of a First Order Probabilistic Programming Language in Python.
+#
+# License: MIT (see LICENSE.txt)
+#
+# 19. Oct 2026
+#
+import unittest
+from foppl.compiler import compile
+from foppl.context import CompilationContext
+from foppl.hoisting import ConstantHoister
+from foppl.model_generator import Model_Generator
+
+source = "(let [x (sample (normal 1.0 5.0))] (observe (normal x 1.0) 2.0) x)"
+
+
+class TestConstantHoister(unittest.TestCase):
+
+    def setUp(self):
+        self.graph, _ = compile(source)
+        self.x = sorted(self.graph.sampled_variables)[0]
+        self.hoister = ConstantHoister(self.graph)
+
+    def test_pure_calls(self):
+        self.assertEqual(self.hoister.hoist("dist.Normal(mu=1.0, sigma=math.sqrt(5.0))"), "_const0")
+        self.assertEqual(self.hoister.hoist("{} + abs(math.log(0.5))".format(self.x)), "({} + _const1)".format(self.x))
+        self.assertEqual(self.hoister.values, [('_const0', 'dist.Normal(mu=1.0, sigma=math.sqrt(5.0))'),
+                                               ('_const1', 'abs(math.log(0.5))')])
+
+    def test_impure_calls(self):
+        # Sampling, random numbers or unknown functions must be evaluated on each call
+        for code in ["random.random()", "f(1.0)", "np.random.standard_normal(3)"]:
+            self.assertEqual(self.hoister.hoist("{} + {}".format(self.x, code)), "{} + {}".format(self.x, code))
+        self.assertEqual(self.hoister.values, [])
+        # The distribution itself is constant, but drawing a sample from it is not
+        self.assertEqual(self.hoister.hoist("{} + dist.Normal(mu=1.0, sigma=2.0).sample()".format(self.x)),
+                         "({} + _const0.sample())".format(self.x))
+
+    def test_vertices_are_not_constant(self):
+        code = "dist.Normal(mu={}, sigma=1.0)".format(self.x)
+        self.assertEqual(self.hoister.hoist(code), code)
+
+
+class TestHoistedCode(unittest.TestCase):
+
+    def test_constants_at_module_level(self):
+        context = CompilationContext(hoist_constants=True)
+        graph, _ = context.compile(source)
+        code = Model_Generator(graph, context=context).generate_class()
+        # The constants are computed once when the module is loaded, and the methods only refer to them
+        header, _, body = code.partition('class model')
+        x = sorted(graph.sampled_variables)[0]
+        self.assertIn("_const0 = dist.Normal(mu=1.0, sigma=", header)
+        self.assertNotIn("dist_{} = dist.Normal(".format(x), body)
+        self.assertIn("dist_{} = _const0".format(x), body)
+        self.assertNotIn("_init_constants", code)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,71 @@
+#
+# This file is part of PyFOPPL, an implementation of a First Order Probabilistic Programming Language in Python.
+#
+# License: MIT (see LICENSE.txt)
+#
+# 19. Oct 2026
+#
+import math
+import random
+import types
+import unittest
+from foppl import inference
+from foppl.context import CompilationContext
+from foppl.imports import compile_module
+
+# A conjugate model without `dist` (the multivariate normals use the cached Cholesky factors): the posterior of `x`
+# is a normal with mean `y / 2` and the evidence is `N(y; 0, 2 I)`
+source = """
+(let [x (sample (mvn [0.0 0.0] [[1.0 0.0] [0.0 1.0]]))]
+  (observe (mvn x [[1.0 0.0] [0.0 1.0]]) [1.0 -1.0])
+  x)
+"""
+
+
+@unittest.skipIf(inference.np is None, "numpy is not available")
+class TestImportanceSampling(unittest.TestCase):
+
+    def setUp(self):
+        context = CompilationContext(cache_covariances=True, conditional_suffix='')
+        self.model = compile_module(types.ModuleType('test_model'), source, context).model
+        self.x = self.model.gen_vars()[0]
+        random.seed(1)
+        inference.np.random.seed(1)
+
+    def check(self, result, num_samples):
+        self.assertEqual(result.num_samples, num_samples)
+        self.assertAlmostEqual(result.log_evidence, -0.5 - math.log(2 * math.pi) - 0.5 * math.log(4.0), delta=0.05)
+        mean = result.estimates['x']
+        self.assertEqual(len(mean), 2)
+        self.assertAlmostEqual(mean[0], 0.5, delta=0.05)
+        self.assertAlmostEqual(mean[1], -0.5, delta=0.05)
+        self.assertAlmostEqual(result.estimates['x0'], 0.5, delta=0.05)
+        weights = result.weights
+        self.assertEqual(len(weights), num_samples)
+        self.assertAlmostEqual(sum(weights), 1.0)
+        self.assertAlmostEqual(1.0 / sum([w * w for w in weights]), result.ess)
+
+    def test_streamed_run(self):
+        functions = {'x': self.x, 'x0': lambda state: state[self.x][0]}
+        result = inference.importance_sampling(self.model, 20000, functions, batch_size=3000)
+        self.assertIsNone(result.samples)
+        self.check(result, 20000)
+
+    def test_without_numpy(self):
+        functions = {'x': lambda state: list(state[self.x]), 'x0': lambda state: state[self.x][0]}
+        np, inference.np = inference.np, None
+        try:
+            result = inference.importance_sampling(self.model, 20000, functions, batch_size=3000)
+        finally:
+            inference.np = np
+        self.assertEqual(type(result.estimates['x']), list)
+        self.check(result, 20000)
+
+    def test_without_weights(self):
+        result = inference.importance_sampling(self.model, 100, keep_weights=False)
+        self.assertIsNone(result.weights)
+        self.assertEqual(len(result.estimates[self.x]), 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,101 @@
+#
+# This file is part of PyFOPPL, an implementation of a First Order Probabilistic Programming Language in Python.
+#
+# License: MIT (see LICENSE.txt)
+#
+# 19. Oct 2026
+#
+import math
+import random
+import unittest
+from foppl.compiler import compile
+from foppl.intervals import Interval
+
+
+def contains(interval, x):
+    return (interval.lo < x or (interval.lo == x and not interval.lo_open)) and \
+           (x < interval.hi or (x == interval.hi and not interval.hi_open))
+
+
+def random_interval():
+    lo, hi = sorted([random.choice([0.0, 1.0, -1.0, random.uniform(-5, 5)]) for _ in range(2)])
+    if lo == hi:
+        return Interval.point(lo)
+    return Interval(lo, hi, lo_open=random.random() < 0.3, hi_open=random.random() < 0.3)
+
+
+def random_point(interval):
+    # Mostly points inside the interval, and sometimes its closed bounds
+    points = [random.uniform(interval.lo, interval.hi) for _ in range(3)] + [interval.lo, interval.hi]
+    return random.choice([x for x in points if contains(interval, x)] or [0.5 * (interval.lo + interval.hi)])
+
+
+class TestInterval(unittest.TestCase):
+
+    def setUp(self):
+        random.seed(13)
+
+    def test_arithmetic_contains_results(self):
+        operations = [
+            (lambda a, b: a + b, lambda x, y: x + y),
+            (lambda a, b: a - b, lambda x, y: x - y),
+            (lambda a, b: a * b, lambda x, y: x * y),
+            (lambda a, b: a / b, lambda x, y: x / y),
+        ]
+        for _ in range(500):
+            a, b = random_interval(), random_interval()
+            for (f, g) in operations:
+                result = f(a, b)
+                if result is None:
+                    continue
+                x, y = random_point(a), random_point(b)
+                if y == 0 and contains(b, 0):
+                    continue
+                self.assertTrue(contains(result, g(x, y)), (a, b, x, y, result))
+
+    def test_monotone_functions(self):
+        for _ in range(200):
+            a = random_interval()
+            x = random_point(a)
+            self.assertTrue(contains(a.apply_monotone(math.exp), math.exp(x)))
+            if x > 0:
+                self.assertTrue(contains(a.apply_monotone(math.log), math.log(x)))
+
+    def test_decided_comparisons_hold_everywhere(self):
+        compare = {'>=': lambda x, y: x >= y, '>': lambda x, y: x > y,
+                   '<=': lambda x, y: x <= y, '<': lambda x, y: x < y}
+        for _ in range(500):
+            a, b = random_interval(), random_interval()
+            for op in compare:
+                decision = a.compare(op, b)
+                if decision is not None:
+                    for _ in range(10):
+                        x, y = random_point(a), random_point(b)
+                        self.assertEqual(compare[op](x, y), decision, (a, op, b, x, y))
+
+
+class TestBranchPruning(unittest.TestCase):
+
+    def test_decided_branches_are_dropped(self):
+        # `sqrt s` of a gamma sample is positive, so the first condition is always true; the second is undecided
+        graph, _ = compile("""
+            (let [s (sample (gamma 2.0 1.0))
+                  x (sample (normal 0.0 1.0))]
+              (observe (normal (if (> (sqrt s) -0.5) x 0.0) 1.0) 0.2)
+              (observe (normal (if (> x 0.0) 1.0 0.0) 1.0) 0.2)
+              x)""")
+        self.assertEqual(len(graph.cond_vars), 1)
+        x = sorted(graph.cont_vars)[-1]
+        codes = [graph.get_code_for_variable(y) for y in sorted(graph.observed_values)]
+        self.assertEqual(codes[0], "dist.Normal(mu={}, sigma=1.0)".format(x))
+
+    def test_undecided_branches_are_kept(self):
+        graph, _ = compile("""
+            (let [u (sample (uniform -1.0 1.0))]
+              (observe (normal (if (> u 0.5) 1.0 0.0) 1.0) 0.2)
+              u)""")
+        self.assertEqual(len(graph.cond_vars), 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,54 @@
+#
+# This file is part of PyFOPPL, an implementation of a First Order Probabilistic Programming Language in Python.
+#
+# License: MIT (see LICENSE.txt)
+#
+# 19. Oct 2026
+#
+import math
+import types
+import unittest
+import numpy as np
+from foppl.context import CompilationContext
+from foppl.imports import compile_module
+
+source = """
+(let [x (sample (mvn [1.0 -1.0 0.5] [[2.0 0.6 0.2] [0.6 1.0 -0.3] [0.2 -0.3 0.5]]))]
+  (observe (mvn x [[1.0 0.4 0.0] [0.4 1.0 0.4] [0.0 0.4 1.0]]) [0.3 0.2 -0.4])
+  x)
+"""
+
+mu = np.array([1.0, -1.0, 0.5])
+prior_cov = np.array([[2.0, 0.6, 0.2], [0.6, 1.0, -0.3], [0.2, -0.3, 0.5]])
+obs_cov = np.array([[1.0, 0.4, 0.0], [0.4, 1.0, 0.4], [0.0, 0.4, 1.0]])
+observed = np.array([0.3, 0.2, -0.4])
+
+
+def mvn_log_pdf(x, mu, cov):
+    d = x - mu
+    return -0.5 * (d.dot(np.linalg.solve(cov, d)) + np.linalg.slogdet(cov)[1] + len(x) * math.log(2 * math.pi))
+
+
+class TestCachedCovariances(unittest.TestCase):
+
+    def setUp(self):
+        context = CompilationContext(cache_covariances=True, conditional_suffix='')
+        self.model = compile_module(types.ModuleType('test_model'), source, context).model
+        self.x = self.model.gen_vars()[0]
+        np.random.seed(11)
+
+    def test_against_direct_density(self):
+        for _ in range(10):
+            state = self.model.gen_prior_samples()
+            x = state[self.x]
+            expected = mvn_log_pdf(x, mu, prior_cov) + mvn_log_pdf(observed, x, obs_cov)
+            self.assertAlmostEqual(self.model.gen_pdf(state), expected)
+
+    def test_sample_moments(self):
+        samples = np.array([self.model.gen_prior_samples()[self.x] for _ in range(20000)])
+        self.assertTrue(np.allclose(np.mean(samples, axis=0), mu, atol=0.05))
+        self.assertTrue(np.allclose(np.cov(samples, rowvar=False), prior_cov, atol=0.06))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,44 @@
+#
+# This file is part of PyFOPPL, an implementation of a First Order Probabilistic Programming Language in Python.
+#
+# License: MIT (see LICENSE.txt)
+#
+# 19. Oct 2026
+#
+import types
+import unittest
+from foppl import Options
+from foppl.context import CompilationContext
+from foppl.imports import compile_module
+from foppl.model_generator import Model_Generator
+
+source = "(let [x (sample (normal 0.0 1.0))] (observe (normal x 1.0) 0.5) x)"
+
+
+class TestStatisticsHooks(unittest.TestCase):
+
+    def setUp(self):
+        self.global_reports = []
+        self.hooks = Options.statistics_hooks
+        Options.statistics_hooks = [self.global_reports.append]
+
+    def tearDown(self):
+        Options.statistics_hooks = self.hooks
+
+    def test_context_hooks(self):
+        reports = []
+        context = CompilationContext(statistics_hooks=[reports.append])
+        compile_module(types.ModuleType('test_model'), source, context)
+        graph, _ = context.compile(source)
+        Model_Generator(graph, context=context).generate_class()
+        self.assertEqual(len(reports), 2)
+        self.assertEqual(self.global_reports, [])
+        self.assertIn('exec', reports[0].phases)
+
+    def test_global_hooks(self):
+        compile_module(types.ModuleType('test_model'), source)
+        self.assertEqual(len(self.global_reports), 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
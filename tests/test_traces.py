@@ -0,0 +1,60 @@
+#
+# This file is part of PyFOPPL, an implementation of a First Order Probabilistic Programming Language in Python.
+#
+# License: MIT (see LICENSE.txt)
+#
+# 19. Oct 2026
+#
+import os
+import tempfile
+import unittest
+from foppl.compiler import compile
+from foppl.traces import TraceSchema, TraceStore, np
+
+
+class TestTraceStore(unittest.TestCase):
+
+    def setUp(self):
+        directory = tempfile.mkdtemp()
+        self.path = os.path.join(directory, 'trace.bin')
+        self.schema = TraceSchema([('x', 'd', 1), ('k', 'q', 1), ('v', 'd', 2)])
+
+    def tearDown(self):
+        os.remove(self.path)
+        os.rmdir(os.path.dirname(self.path))
+
+    def _sample(self, i):
+        return {'x': i * 0.5, 'k': i, 'v': [i, -i]}
+
+    @unittest.skipIf(np is None, "numpy is not available")
+    def test_column_append_past_capacity_close(self):
+        store = TraceStore.create(self.path, self.schema, capacity=2)
+        store.append(self._sample(0))
+        store.append(self._sample(1))
+        x = store.column('x')
+        self.assertEqual(list(x), [0.0, 0.5])
+        for i in range(2, 5):
+            store.append(self._sample(i))
+        self.assertEqual(store.capacity, 8)
+        self.assertEqual(list(store.column('k')), [0, 1, 2, 3, 4])
+        v = store.column('v')
+        store.close()
+        del x, v
+        with TraceStore.open(self.path) as reader:
+            self.assertEqual(len(reader), 5)
+            self.assertEqual(reader.row(4), self._sample(4))
+            k = reader.column('k')
+        self.assertEqual(len(k), 5)
+
+
+class TestTraceSchema(unittest.TestCase):
+
+    def test_widths_from_vertex_types(self):
+        graph, _ = compile("(let [p (sample (dirichlet [1 1 1])) a (sample (normal 0 1))] "
+                           "(sample (multinomial p 5)) (sample (mvn (conj [a] 1.0) [[1 0] [0 1]])))")
+        schema = TraceSchema.from_graph(graph)
+        self.assertEqual([column[1:] for column in schema.columns], [('d', 3), ('d', 1), ('q', 3), ('d', 2)])
+
+
+if __name__ == '__main__':
+    unittest.main()